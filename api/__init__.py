@@ -6,6 +6,7 @@ def init_app():
     from . import (
         get_drafts_route,
         post_draft_tweet_route,
+        airtable_writes_route,
         post_tweet_route,
         like_tweet_route,
         unlike_tweet_route,
@@ -13,11 +14,15 @@ def init_app():
         unretweet_route,
         pull_mentions_route,
         get_tweet_route,
+        get_tweets_route,
         search_tweets_route,
         get_home_timeline_route,
+        stream_home_timeline_route,
         get_user_profile_route,
         follow_user_route,
-        unfollow_user_route
+        unfollow_user_route,
+        jobs_route,
+        profiler_route
     )
 
 # Ensure routes are registered when this module is imported
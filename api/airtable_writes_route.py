@@ -0,0 +1,22 @@
+from flask import jsonify, current_app
+from api import api_bp
+from auth import token_required
+
+@api_bp.route('/airtable_writes', methods=['GET'])
+@token_required
+def get_airtable_writes():
+    """
+    Status of the Airtable write-back queue.
+
+    Returns:
+    - pending: Number of updates waiting to be written (including ones waiting for a retry)
+    - failed: Updates that ran out of attempts, with their last error
+    """
+    return jsonify(current_app.airtable_service.write_queue.get_status())
+
+@api_bp.route('/airtable_writes/retry', methods=['POST'])
+@token_required
+def retry_airtable_writes():
+    """Put all failed Airtable updates back in the queue."""
+    requeued = current_app.airtable_service.write_queue.retry_failed()
+    return jsonify({'requeued': requeued})
\ No newline at end of file
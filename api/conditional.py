@@ -0,0 +1,29 @@
+from flask import request, jsonify, current_app
+import hashlib
+import json
+
+def make_etag(*parts):
+    """Stable hash of JSON-serializable parts, e.g. a store version and the query arguments."""
+    content = json.dumps(parts, sort_keys=True, default=str)
+    return hashlib.sha256(content.encode()).hexdigest()[:32]
+
+def not_modified(etag):
+    """
+    304 Not Modified response when the request's If-None-Match holds etag, otherwise None.
+
+    ETags are weak: the same one is sent with identity and compressed bodies, and bodies that
+    differ only in timing metadata such as snapshot_age or synced_at share it.
+    """
+    if etag is None or not request.if_none_match.contains_weak(etag):
+        return None
+    response = current_app.response_class(status=304)
+    response.set_etag(etag, weak=True)
+    return response
+
+def conditional_jsonify(data, etag=None):
+    """jsonify(data) with an ETag, hashed from the body when none is given, or a 304 when the client has it."""
+    response = jsonify(data)
+    if etag is None:
+        etag = hashlib.sha256(response.get_data()).hexdigest()[:32]
+    response.set_etag(etag, weak=True)
+    return not_modified(etag) or response
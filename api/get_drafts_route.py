@@ -1,9 +1,34 @@
 from flask import jsonify, current_app
 from api import api_bp
 from auth import token_required
+from api.conditional import make_etag, not_modified
 
 @api_bp.route('/get_drafts', methods=['GET'])
 @token_required
 def get_drafts():
-    drafts = current_app.airtable_service.get_candidate_tweets()
-    return jsonify({'drafts': drafts})
\ No newline at end of file
+    """
+    Get the draft tweets from the last good Airtable snapshot, refreshed in the background.
+
+    Returns:
+    - drafts: The draft tweet records
+    - snapshot_age: Seconds since the snapshot was fetched from Airtable (null if there is none yet)
+    - stale: Whether the snapshot is older than DRAFTS_REFRESH_INTERVAL
+    - refresh_error: The error of the last failed refresh, null once a refresh succeeds
+
+    The ETag follows the snapshot, so a matching If-None-Match gets a 304 without the drafts
+    being serialized.
+    """
+    drafts_cache = current_app.airtable_service.drafts_cache
+    # Read before the snapshot: a refresh in between then costs a full response, never a stale 304
+    version = drafts_cache.version
+    result = drafts_cache.get_drafts()
+    if version is None:
+        return jsonify(result)
+
+    etag = make_etag('drafts', version, result['refresh_error'])
+    response = not_modified(etag)
+    if response:
+        return response
+    response = jsonify(result)
+    response.set_etag(etag, weak=True)
+    return response
\ No newline at end of file
@@ -1,19 +1,39 @@
 from flask import request, jsonify, current_app
 from api import api_bp
 from auth import token_required
+from api.projection import get_projection
+from services.rate_limit_handler import RateLimitExceeded
 
 @api_bp.route('/get_home_timeline', methods=['GET'])
 @token_required
 def get_home_timeline():
     max_results = request.args.get('max_results', default=15, type=int)
     pagination_token = request.args.get('pagination_token', default=None, type=str)
+    prefetch = request.args.get('prefetch', 'false').lower() == 'true'
+    try:
+        projection = get_projection()
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
 
     try:
+        if prefetch:
+            # Paginated mode: return the next_token and start fetching that page in the background
+            timeline, next_token = current_app.x_service.get_home_timeline_page(
+                max_results=max_results,
+                pagination_token=pagination_token,
+                prefetch=True,
+                projection=projection
+            )
+            return jsonify({'tweets': timeline, 'next_token': next_token})
+
         timeline = current_app.x_service.get_home_timeline(
             max_results=max_results,
-            pagination_token=pagination_token
+            pagination_token=pagination_token,
+            projection=projection
         )
         return jsonify(timeline)
+    except RateLimitExceeded:
+        raise
     except Exception as e:
         current_app.logger.error(f"Error retrieving home timeline: {str(e)}", exc_info=True)
-        return jsonify({'error': 'An error occurred while retrieving the home timeline'}), 500
\ No newline at end of file
+        return jsonify({'error': 'An error occurred while retrieving the home timeline'}), 500
@@ -1,6 +1,8 @@
 from flask import request, jsonify, current_app
 from api import api_bp
 from auth import token_required
+from api.conditional import conditional_jsonify
+from api.projection import get_projection
 
 @api_bp.route('/get_tweet', methods=['GET'])
 @token_required
@@ -14,18 +16,33 @@ def get_tweet():
     - ancestor_chain: Chain of tweets from root to the parent of the requested tweet
     - sibling_tweets: Tweets that share the same parent as the requested tweet, ordered from oldest to newest
     - children_tweets: Direct replies to the requested tweet, ordered from oldest to newest
+    - depth: Number of ancestors of the requested tweet found in the conversation
+    - subtree_size: Number of tweets in the reply subtree of the requested tweet, including itself
+    - thread_complete: False when the conversation exceeded the page/tweet budget and was truncated
+    - descendant_tree: Nested replies below the requested tweet (only with include_descendants=true)
+
+    Every tweet is trimmed to the ?fields= / ?expansions= projection when one is given. The
+    response has an ETag hashed from the body; a matching If-None-Match gets a 304 without it.
     """
     tweet_id = request.args.get('tweet_id')
     if not tweet_id:
         return jsonify({'error': 'Missing tweet_id'}), 400
 
+    include_descendants = request.args.get('include_descendants', 'false').lower() == 'true'
+    try:
+        projection = get_projection()
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+
     try:
-        result = current_app.x_service.get_tweet_with_thread(tweet_id)
+        result = current_app.x_service.get_tweet_with_thread(
+            tweet_id, include_descendants=include_descendants, projection=projection
+        )
 
         if not result:
             return jsonify({'error': 'Tweet not found or unable to retrieve thread'}), 404
 
-        return jsonify(result)
+        return conditional_jsonify(result)
 
     except Exception as e:
         # Log the error
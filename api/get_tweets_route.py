@@ -0,0 +1,43 @@
+from flask import request, jsonify, current_app
+from api import api_bp
+from auth import token_required
+from api.projection import get_projection
+import re
+
+@api_bp.route('/get_tweets', methods=['GET'])
+@token_required
+def get_tweets():
+    """
+    Get many tweets by id in one request.
+
+    Query parameters:
+    - ids: Comma-separated tweet ids (up to MAX_BATCH_TWEET_IDS)
+    - fields, expansions: Field projection, a preset (minimal, standard, full) or a list (optional)
+
+    Returns:
+    - tweets: The tweets that were found, in the requested order
+    - not_found: Requested ids that do not exist or are not visible
+    """
+    ids = request.args.get('ids')
+    if not ids:
+        return jsonify({'error': 'Missing ids'}), 400
+
+    tweet_ids = list(dict.fromkeys(tweet_id.strip() for tweet_id in ids.split(',') if tweet_id.strip()))
+    # X fails the whole lookup for one malformed id
+    invalid_ids = [tweet_id for tweet_id in tweet_ids if not re.fullmatch(r'\d{1,19}', tweet_id)]
+    if invalid_ids:
+        return jsonify({'error': f"ids must be tweet ids, got '{invalid_ids[0]}'"}), 400
+    max_ids = current_app.config['MAX_BATCH_TWEET_IDS']
+    if len(tweet_ids) > max_ids:
+        return jsonify({'error': f'Too many ids, at most {max_ids} are allowed'}), 400
+    try:
+        projection = get_projection()
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+
+    tweets = current_app.x_service.get_tweets(tweet_ids, projection=projection)
+    found_ids = {tweet['id'] for tweet in tweets}
+    return jsonify({
+        'tweets': tweets,
+        'not_found': [tweet_id for tweet_id in tweet_ids if tweet_id not in found_ids]
+    })
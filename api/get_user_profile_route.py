@@ -1,6 +1,9 @@
 from flask import request, jsonify, current_app
 from api import api_bp
 from auth import token_required
+from api.conditional import conditional_jsonify
+from api.projection import get_projection
+from services.rate_limit_handler import RateLimitExceeded
 from urllib.parse import unquote_plus
 
 @api_bp.route('/get_user_profile', methods=['GET'])
@@ -14,18 +17,25 @@ def get_user_profile():
 
     if not username and not user_id:
         return jsonify({'error': 'Missing username or user_id'}), 400
+    try:
+        projection = get_projection()
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
 
     try:
         if username:
-            user_profile = current_app.x_service.tweet_service.get_user_by_username(username)
+            user_profile = current_app.x_service.tweet_service.get_user_by_username(username, projection=projection)
         else:
-            user_profile = current_app.x_service.tweet_service.get_user_by_id(user_id)
+            user_profile = current_app.x_service.tweet_service.get_user_by_id(user_id, projection=projection)
 
         if user_profile:
-            return jsonify(user_profile), 200
+            # Cached profiles are served without calling X; the ETag then only saves the transfer
+            return conditional_jsonify(user_profile)
         else:
             return jsonify({'error': 'User not found'}), 404
 
+    except RateLimitExceeded:
+        raise
     except Exception as e:
         current_app.logger.error(f"Error retrieving user profile: {str(e)}", exc_info=True)
         return jsonify({'error': 'An error occurred while retrieving the user profile'}), 500
\ No newline at end of file
@@ -0,0 +1,19 @@
+from flask import jsonify, current_app
+from api import api_bp
+from auth import token_required
+
+@api_bp.route('/jobs/<job_id>', methods=['GET'])
+@token_required
+def get_job(job_id):
+    """
+    Status of a write job queued with ?async=true.
+
+    Returns:
+    - status: queued, running, succeeded or failed
+    - result: What the write returned, once it succeeded
+    - error: Why it failed, or the rate limit it is waiting on while queued
+    """
+    job = current_app.x_service.write_jobs.get_job(job_id)
+    if not job:
+        return jsonify({'error': 'Job not found'}), 404
+    return jsonify(job)
\ No newline at end of file
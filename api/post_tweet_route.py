@@ -1,6 +1,8 @@
 from flask import request, jsonify, current_app
 from api import api_bp
 from auth import token_required
+from api.write_jobs import wants_async, queue_write_job
+from services.media_service import MAX_MEDIA_PER_TWEET
 
 @api_bp.route('/post_tweet', methods=['POST'])
 @token_required
@@ -9,10 +11,28 @@ def post_tweet():
     text = data.get('text')
     in_reply_to_tweet_id = data.get('in_reply_to_tweet_id')
     media_url = data.get('media_url')
+    media_urls = data.get('media_urls') or []
 
     if not text:
         return jsonify({'error': 'Missing text'}), 400
+    if not isinstance(media_urls, list) or not all(isinstance(url, str) for url in media_urls):
+        return jsonify({'error': 'media_urls must be a list of URLs'}), 400
+    if len(media_urls) + bool(media_url) > MAX_MEDIA_PER_TWEET:
+        return jsonify({'error': f'A tweet can have at most {MAX_MEDIA_PER_TWEET} media items'}), 400
 
-    tweet_id = current_app.x_service.post_tweet(text, in_reply_to_tweet_id, media_url)
+    idempotency_key = request.headers.get('Idempotency-Key')
+
+    if wants_async():
+        return queue_write_job(
+            'post_tweet', text=text, in_reply_to_tweet_id=in_reply_to_tweet_id,
+            media_url=media_url, media_urls=media_urls, idempotency_key=idempotency_key
+        )
+
+    tweet_id, replayed = current_app.x_service.post_tweet_once(
+        text, in_reply_to_tweet_id, media_url, media_urls, idempotency_key
+    )
     
-    return jsonify({'tweet_id': tweet_id})
\ No newline at end of file
+    response = jsonify({'tweet_id': tweet_id})
+    if replayed:
+        response.headers['Idempotent-Replayed'] = 'true'
+    return response
\ No newline at end of file
@@ -0,0 +1,49 @@
+from flask import request, jsonify, current_app, Response
+from api import api_bp
+from auth import token_required
+
+@api_bp.route('/profiler', methods=['GET'])
+@token_required
+def get_profiler():
+    """
+    Sampling profiler settings and the slow requests it captured, newest first.
+
+    Returns:
+    - enabled, interval_ms, slow_request_ms: Current settings
+    - profiles: One summary per captured request (id, method, path, status, duration_ms, sample_count)
+    """
+    return jsonify(current_app.profiler.get_status())
+
+@api_bp.route('/profiler', methods=['POST'])
+@token_required
+def configure_profiler():
+    """Switch the sampling profiler on or off and change its interval or slow-request threshold."""
+    data = request.json or {}
+    enabled = data.get('enabled')
+    interval_ms = data.get('interval_ms')
+    slow_request_ms = data.get('slow_request_ms')
+
+    if enabled is not None and not isinstance(enabled, bool):
+        return jsonify({'error': 'enabled must be true or false'}), 400
+    for name, value in (('interval_ms', interval_ms), ('slow_request_ms', slow_request_ms)):
+        if value is not None and (not isinstance(value, (int, float)) or isinstance(value, bool) or value <= 0):
+            return jsonify({'error': f'{name} must be a positive number'}), 400
+
+    current_app.profiler.configure(enabled=enabled, interval_ms=interval_ms, slow_request_ms=slow_request_ms)
+    return jsonify(current_app.profiler.get_status())
+
+@api_bp.route('/profiler/profiles/<profile_id>', methods=['GET'])
+@token_required
+def get_profile(profile_id):
+    """
+    Stacks sampled during one slow request, in the folded format ("root;...;leaf count" per line)
+    read by flamegraph.pl and speedscope. Add format=json for the samples as JSON.
+    """
+    profile = current_app.profiler.get_profile(profile_id)
+    if not profile:
+        return jsonify({'error': 'Profile not found'}), 404
+
+    if request.args.get('format') == 'json':
+        return jsonify(profile)
+    folded = ''.join(f"{stack} {count}\n" for stack, count in sorted(profile['samples'].items()))
+    return Response(folded, mimetype='text/plain')
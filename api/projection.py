@@ -0,0 +1,9 @@
+from flask import request
+from services.field_projection import parse_projection
+
+def get_projection():
+    """
+    Field projection from the ?fields= and ?expansions= query parameters, or None for the
+    full response. Raises ValueError for unknown presets, fields or expansions.
+    """
+    return parse_projection(request.args.get('fields'), request.args.get('expansions'))
@@ -1,9 +1,51 @@
-from flask import jsonify, current_app
+from flask import request, jsonify, current_app
 from api import api_bp
 from auth import token_required
+from api.conditional import make_etag, not_modified
+from api.projection import get_projection
+from services.field_projection import project_tweets
 
 @api_bp.route('/pull_mentions', methods=['GET'])
 @token_required
 def pull_mentions():
-    mentions = current_app.x_service.pull_mentions()
-    return jsonify({'mentions': mentions})
\ No newline at end of file
+    """
+    Get mentions from the local mentions store, which is kept up to date in the background.
+
+    Query parameters:
+    - since: Only return mentions newer than this tweet id (optional)
+    - limit: Maximum number of mentions to return (default: 10)
+    - fields, expansions: Field projection, a preset (minimal, standard, full) or a list (optional)
+
+    The ETag follows the store and the query, so a matching If-None-Match gets a 304 without
+    the mentions being read or serialized.
+    """
+    since = request.args.get('since', default=None, type=str)
+    limit = request.args.get('limit', default=10, type=int)
+
+    if since and not since.isdigit():
+        return jsonify({'error': 'since must be a tweet id'}), 400
+    if limit < 1:
+        return jsonify({'error': 'limit must be at least 1'}), 400
+    try:
+        projection = get_projection()
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+
+    ingester = current_app.x_service.mentions_ingester
+    etag = None
+    # The store's version changes whenever mentions are added. Until the first sync the read
+    # below calls X, so there is nothing to compare against yet.
+    if ingester.last_synced_at is not None:
+        etag = make_etag('mentions', ingester.version, since, limit, projection.key if projection else None)
+        response = not_modified(etag)
+        if response:
+            return response
+
+    mentions = current_app.x_service.pull_mentions(since=since, limit=limit)
+    if projection:
+        # Stored mentions are full tweets, so the projection only trims the response
+        mentions = dict(mentions, mentions=project_tweets(mentions['mentions'], projection))
+    response = jsonify(mentions)
+    if etag:
+        response.set_etag(etag, weak=True)
+    return response
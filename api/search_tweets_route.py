@@ -1,6 +1,7 @@
 from flask import request, jsonify, current_app
 from api import api_bp
 from auth import token_required
+from api.projection import get_projection
 
 @api_bp.route('/search_tweets', methods=['GET'])
 @token_required
@@ -8,5 +9,9 @@ def search_tweets():
     query = request.args.get('query')
     if not query:
         return jsonify({'error': 'Missing query'}), 400
-    tweets = current_app.x_service.search_recent_tweets(query)
+    try:
+        projection = get_projection()
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    tweets = current_app.x_service.search_recent_tweets(query, projection=projection)
     return jsonify({'tweets': tweets})
\ No newline at end of file
@@ -0,0 +1,80 @@
+from flask import Response, request, jsonify, current_app, stream_with_context
+from api import api_bp
+from auth import token_required
+from api.projection import get_projection
+from json_provider import COMPACT_SEPARATORS
+import time
+
+@api_bp.route('/stream_home_timeline', methods=['GET'])
+@token_required
+def stream_home_timeline():
+    """
+    Stream the home timeline as newline-delimited JSON, one processed tweet per line,
+    walking next_token until the item or time budget is spent. Each next page is
+    fetched in the background while the current one is being streamed.
+
+    The last line is a status object with "stream_end": true, the number of items sent and
+    "truncated", which is false only when the end of the timeline was reached. A stream cut
+    short resumes from next_token, skipping page_offset tweets of that page (with the same
+    page_size), and carries an "error" if an error cut it.
+    """
+    page_size = request.args.get('page_size', default=100, type=int)
+    max_items = request.args.get('max_items', default=500, type=int)
+    max_seconds = request.args.get('max_seconds', default=current_app.config['TIMELINE_STREAM_MAX_SECONDS'], type=int)
+    pagination_token = request.args.get('pagination_token', default=None, type=str)
+    page_offset = request.args.get('page_offset', default=0, type=int)
+
+    if not 5 <= page_size <= 100:
+        return jsonify({'error': 'page_size must be between 5 and 100'}), 400
+    if max_items < 1:
+        return jsonify({'error': 'max_items must be at least 1'}), 400
+    if not 0 <= page_offset < page_size:
+        return jsonify({'error': 'page_offset must be between 0 and page_size - 1'}), 400
+    try:
+        projection = get_projection()
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+
+    x_service = current_app.x_service
+
+    def generate():
+        deadline = time.monotonic() + max_seconds
+        token, offset = pagination_token, page_offset
+        sent = 0
+        status = {'stream_end': True}
+        try:
+            while True:
+                tweets, next_token = x_service.get_home_timeline_page(
+                    max_results=page_size,
+                    pagination_token=token,
+                    prefetch=True,
+                    projection=projection,
+                    # Fetch the next page ahead only if the item budget reaches past this one
+                    prefetch_next=max_items - sent > page_size - offset
+                )
+                tweets = (tweets or [])[offset:]
+                for index, tweet in enumerate(tweets):
+                    if sent >= max_items:
+                        # Cut mid-page: resume from this page, past the tweets already sent
+                        next_token, offset = token, offset + index
+                        break
+                    yield current_app.json.encode(tweet, separators=COMPACT_SEPARATORS) + b'\n'
+                    sent += 1
+                else:
+                    offset = 0
+                if not next_token or offset or sent >= max_items or time.monotonic() >= deadline:
+                    break
+                token = next_token
+            status['next_token'] = next_token
+            status['truncated'] = bool(next_token or offset)
+        except Exception as e:
+            current_app.logger.error(f"Error streaming home timeline: {str(e)}", exc_info=True)
+            status['next_token'] = token
+            status['truncated'] = True
+            status['error'] = str(e)
+        if offset:
+            status['page_offset'] = offset
+        status['items'] = sent
+        yield current_app.json.encode(status, separators=COMPACT_SEPARATORS) + b'\n'
+
+    return Response(stream_with_context(generate()), mimetype='application/x-ndjson')
@@ -1,6 +1,8 @@
 from flask import request, jsonify, current_app
 from api import api_bp
 from auth import token_required
+from api.write_jobs import wants_async, queue_write_job
+from services.rate_limit_handler import RateLimitExceeded
 
 @api_bp.route('/unfollow_user', methods=['POST'])
 @token_required
@@ -11,6 +13,9 @@ def unfollow_user():
     if not username:
         return jsonify({'error': 'Missing username'}), 400
 
+    if wants_async():
+        return queue_write_job('unfollow_user', username=username)
+
     try:
         result = current_app.x_service.unfollow_user(username)
 
@@ -31,6 +36,8 @@ def unfollow_user():
             'error': 'User not found',
             'message': str(ve)
         }), 404
+    except RateLimitExceeded:
+        raise
     except Exception as e:
         current_app.logger.error(f"Error unfollowing user @{username}: {str(e)}", exc_info=True)
         return jsonify({
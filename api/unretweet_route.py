@@ -1,6 +1,8 @@
 from flask import request, jsonify, current_app
 from api import api_bp
 from auth import token_required
+from api.write_jobs import wants_async, queue_write_job
+from services.rate_limit_handler import RateLimitExceeded
 
 @api_bp.route('/unretweet', methods=['POST'])
 @token_required
@@ -11,6 +13,9 @@ def unretweet():
     if not source_tweet_id:
         return jsonify({'error': 'Missing source_tweet_id'}), 400
 
+    if wants_async():
+        return queue_write_job('unretweet', source_tweet_id=source_tweet_id)
+
     try:
         result = current_app.x_service.unretweet(source_tweet_id)
 
@@ -33,6 +38,8 @@ def unretweet():
             'error': 'Tweet not found',
             'message': str(ve)
         }), 404
+    except RateLimitExceeded:
+        raise
     except Exception as e:
         current_app.logger.error(f"Error unretweeting tweet {source_tweet_id}: {str(e)}", exc_info=True)
         return jsonify({
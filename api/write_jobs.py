@@ -0,0 +1,11 @@
+from flask import request, jsonify, current_app, url_for
+
+def wants_async():
+    """Writes run as background jobs when the client asks with ?async=true or `Prefer: respond-async`."""
+    return request.args.get('async', '').lower() == 'true' or 'respond-async' in request.headers.get('Prefer', '')
+
+def queue_write_job(operation, **params):
+    job_id = current_app.x_service.write_jobs.enqueue(operation, **params)
+    response = jsonify({'job_id': job_id, 'status': 'queued'})
+    response.headers['Location'] = url_for('api.get_job', job_id=job_id)
+    return response, 202
\ No newline at end of file
@@ -0,0 +1,11 @@
+"""
+ASGI entry point for the async serving mode, e.g. `uvicorn asgi:app --port 5000`.
+
+Routes still run as regular Flask views on a bounded thread pool, while every upstream
+X API call runs on one shared event loop through tweepy's AsyncClient.
+"""
+from a2wsgi import WSGIMiddleware
+from config import Config
+from main import create_app
+
+app = WSGIMiddleware(create_app(async_mode=True), workers=Config.ASGI_THREADS)
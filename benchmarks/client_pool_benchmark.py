@@ -0,0 +1,50 @@
+"""
+Compares per-call latency of a fresh HTTP session per upstream call (what building a
+new tweepy.Client per call costs) against the shared keep-alive session used by OAuth2Handler.
+
+Usage: python -m benchmarks.client_pool_benchmark [--url URL] [--requests N]
+"""
+import argparse
+import statistics
+import time
+import requests
+from services.oauth2_handler import build_http_session
+
+DEFAULT_URL = 'https://api.twitter.com/2/openapi.json'
+
+def time_calls(get_session, url, count):
+    latencies = []
+    for _ in range(count):
+        session = get_session()
+        start = time.perf_counter()
+        session.get(url).close()
+        latencies.append((time.perf_counter() - start) * 1000)
+    return latencies
+
+def summarize(name, latencies):
+    latencies = sorted(latencies)
+    p95 = latencies[min(len(latencies) - 1, int(len(latencies) * 0.95))]
+    print(f"{name:<20} mean {statistics.mean(latencies):8.1f} ms   "
+          f"p50 {statistics.median(latencies):8.1f} ms   p95 {p95:8.1f} ms")
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--url', default=DEFAULT_URL)
+    parser.add_argument('--requests', type=int, default=20)
+    args = parser.parse_args()
+
+    pooled_session = build_http_session()
+    # Warm the pool so the first TLS handshake is not counted against the pooled run
+    pooled_session.get(args.url).close()
+
+    fresh = time_calls(requests.Session, args.url, args.requests)
+    pooled = time_calls(lambda: pooled_session, args.url, args.requests)
+
+    print(f"{args.requests} sequential GET {args.url}")
+    summarize('session per call', fresh)
+    summarize('pooled session', pooled)
+    print(f"mean latency drop per upstream call: "
+          f"{statistics.mean(fresh) - statistics.mean(pooled):.1f} ms")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,181 @@
+"""
+Micro-benchmarks for the CPU-bound response-shaping paths of a request: process_x_response,
+TweetService.process_user_response, field projection, the thread assembly of
+XService.get_tweet_with_thread, JSON serialization and response compression of large payloads,
+over synthetic payloads at several scales.
+
+Results are written as JSON (--output) and compared against a stored baseline: cases whose
+median is more than --threshold slower than the baseline are reported and fail the run, so
+the suite can gate changes in CI. Baselines are machine specific; record one with
+--save-baseline on the machine that runs the comparison.
+
+Usage: python -m benchmarks.hot_paths_benchmark [--repeat N] [--filter TEXT] [--output PATH]
+       [--baseline PATH] [--save-baseline] [--threshold RATIO]
+"""
+import argparse
+import gc
+import json
+import os
+import platform
+import statistics
+import sys
+import time
+from types import SimpleNamespace
+
+# Config is imported by the services but only needs placeholder credentials here
+os.environ.setdefault('OFFLINE_MODE', 'true')
+
+from flask import Flask, jsonify
+from compression import available_encoders
+from benchmarks.synthetic import (conversation_payload, parse_tweets_response, parse_user_response,
+                                  single_tweet_payload, user_profile_payload)
+from monitoring import TimedJSONProvider
+from services.field_projection import PRESETS
+from services.process_x_response import process_x_response
+from services.tweet_service import TweetService
+from services.x_service import XService
+
+DEFAULT_BASELINE = os.path.join(os.path.dirname(__file__), 'baselines', 'hot_paths.json')
+
+def fresh_responses(payload, parse=parse_tweets_response):
+    # process_x_response enriches the response in place, so every call gets a freshly parsed one
+    return lambda: parse(payload)
+
+def same_input(value):
+    return lambda: value
+
+def thread_assembler(n_tweets):
+    """get_tweet_with_thread on an XService whose conversation fetch returns a prepared thread."""
+    tweets = process_x_response(parse_tweets_response(conversation_payload(n_tweets)))
+    root = process_x_response(parse_tweets_response({'data': conversation_payload(1)['includes']['tweets'][0]}))
+    conversation = {'tweets': sorted([root] + tweets, key=lambda x: x['created_at']), 'complete': True}
+    x_service = SimpleNamespace(tweet_service=SimpleNamespace(get_conversation_thread=lambda tweet_id, projection=None: conversation))
+    # A tweet deep in the tree, with ancestors, siblings and replies
+    tweet_id = tweets[len(tweets) // 2]['id']
+    return lambda _: XService.get_tweet_with_thread(x_service, tweet_id, include_descendants=True)
+
+def build_cases():
+    """(name, make_input, func, calls per timed batch)"""
+    app = Flask(__name__)
+    app.json = TimedJSONProvider(app)
+
+    def serialize(data):
+        with app.app_context():
+            return jsonify(data).get_data()
+
+    page_100 = conversation_payload(100)
+    conversation_1000 = conversation_payload(1000)
+    heavy_includes = conversation_payload(100, n_users=100, quote_ratio=1.0, media_ratio=1.0)
+    return [
+        ('process_x_response/single', fresh_responses(single_tweet_payload()), process_x_response, 200),
+        ('process_x_response/page_100', fresh_responses(page_100), process_x_response, 20),
+        ('process_x_response/conversation_1000', fresh_responses(conversation_1000), process_x_response, 10),
+        ('process_x_response/heavy_includes', fresh_responses(heavy_includes), process_x_response, 20),
+        ('process_user_response/single',
+         same_input(parse_user_response(user_profile_payload(1))), lambda r: TweetService.process_user_response(None, r), 500),
+        ('process_user_response/heavy_includes',
+         same_input(parse_user_response(user_profile_payload(1000))), lambda r: TweetService.process_user_response(None, r), 20),
+        ('projection/page_100_standard',
+         same_input(process_x_response(parse_tweets_response(page_100))), PRESETS['standard'].project_tweets, 50),
+        ('thread_assembly/conversation_100', same_input(None), thread_assembler(100), 50),
+        ('thread_assembly/conversation_1000', same_input(None), thread_assembler(1000), 10),
+        ('jsonify/single', same_input(process_x_response(parse_tweets_response(single_tweet_payload()))), serialize, 200),
+        ('jsonify/page_100', same_input(process_x_response(parse_tweets_response(page_100))), serialize, 10),
+        ('jsonify/conversation_1000',
+         same_input(process_x_response(parse_tweets_response(conversation_1000))), serialize, 5),
+        ('jsonify/heavy_includes', same_input(process_x_response(parse_tweets_response(heavy_includes))), serialize, 10),
+    ] + [
+        # Only the codings whose optional modules are installed
+        (f'compress/conversation_1000_{encoding}', same_input(serialized_1000), encoder, 5)
+        for serialized_1000 in [serialize(process_x_response(parse_tweets_response(conversation_1000)))]
+        for encoding, encoder in available_encoders().items()
+    ]
+
+def run_case(make_input, func, number, repeat):
+    """Per-call milliseconds of each of `repeat` batches of `number` calls; inputs are built outside the timing."""
+    timings = []
+    for _ in range(repeat):
+        inputs = [make_input() for _ in range(number)]
+        # As timeit does, keep collector pauses out of the timings
+        gc.collect()
+        gc.disable()
+        try:
+            started = time.perf_counter()
+            for value in inputs:
+                func(value)
+            timings.append((time.perf_counter() - started) * 1000 / number)
+        finally:
+            gc.enable()
+    return timings
+
+def run(repeat, name_filter=None):
+    results = {}
+    for name, make_input, func, number in build_cases():
+        if name_filter and name_filter not in name:
+            continue
+        func(make_input())  # warm up
+        timings = run_case(make_input, func, number, repeat)
+        results[name] = {
+            'median_ms': round(statistics.median(timings), 4),
+            'min_ms': round(min(timings), 4),
+            'number': number,
+            'repeat': repeat
+        }
+    return {
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'created_at': time.strftime('%Y-%m-%dT%H:%M:%SZ', time.gmtime()),
+        'cases': results
+    }
+
+def compare(report, baseline, threshold):
+    """Print each case against the baseline. Returns the names of cases that regressed."""
+    regressions = []
+    print(f"{'case':<40} {'median ms':>10} {'min ms':>10} {'baseline':>10} {'change':>8}")
+    for name, result in report['cases'].items():
+        previous = baseline['cases'].get(name) if baseline else None
+        if previous:
+            change = result['median_ms'] / previous['median_ms'] - 1
+            flag = '  REGRESSION' if change > threshold else ''
+            if flag:
+                regressions.append(name)
+            print(f"{name:<40} {result['median_ms']:>10.3f} {result['min_ms']:>10.3f} "
+                  f"{previous['median_ms']:>10.3f} {change:>+7.0%}{flag}")
+        else:
+            print(f"{name:<40} {result['median_ms']:>10.3f} {result['min_ms']:>10.3f} {'-':>10} {'-':>8}")
+    return regressions
+
+def write_json(path, data):
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    with open(path, 'w') as f:
+        json.dump(data, f, indent=2)
+        f.write('\n')
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--repeat', type=int, default=7, help='timed batches per case')
+    parser.add_argument('--filter', help='only run cases whose name contains this text')
+    parser.add_argument('--output', help='write the results as JSON to this path')
+    parser.add_argument('--baseline', default=DEFAULT_BASELINE, help='baseline results to compare against')
+    parser.add_argument('--save-baseline', action='store_true', help='store these results as the baseline')
+    parser.add_argument('--threshold', type=float, default=0.25, help='allowed median slowdown, as a ratio')
+    args = parser.parse_args()
+
+    report = run(args.repeat, args.filter)
+    baseline = None
+    if not args.save_baseline and os.path.exists(args.baseline):
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+    regressions = compare(report, baseline, args.threshold)
+
+    if args.output:
+        write_json(args.output, report)
+    if args.save_baseline:
+        write_json(args.baseline, report)
+        print(f"Baseline saved to {args.baseline}")
+    if regressions:
+        print(f"{len(regressions)} case(s) more than {args.threshold:.0%} slower than the baseline")
+        sys.exit(1)
+
+if __name__ == '__main__':
+    main()
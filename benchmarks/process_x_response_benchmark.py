@@ -0,0 +1,86 @@
+"""
+Compares the indexed includes join in process_x_response against the previous
+linear-scan implementation over synthetic 10/100/1000-tweet conversation pages.
+
+Usage: python -m benchmarks.process_x_response_benchmark [--repeat N]
+"""
+import argparse
+import timeit
+from benchmarks.synthetic import conversation_payload, parse_tweets_response
+from services.process_x_response import process_x_response
+
+SIZES = [10, 100, 1000]
+
+def legacy_process_x_response(response):
+    # The implementation before includes were indexed, kept here as the baseline
+    if not response or not response.data:
+        return None
+
+    if not hasattr(response, 'includes'):
+        return response.data
+
+    includes = response.includes
+
+    def process_single_tweet(tweet):
+        if not tweet or not hasattr(tweet, 'data'):
+            return None
+
+        processed_tweet = tweet.data.copy()
+
+        if 'users' in includes:
+            author = next((user for user in includes['users'] if user.id == tweet.author_id), None)
+            if author:
+                processed_tweet['author'] = author.data
+
+        if 'tweets' in includes and 'referenced_tweets' in tweet.data:
+            # list() and int(): the original compared the string id with Tweet.id, so it never matched
+            # and never noticed it appended to the list it was walking (the copy above is shallow)
+            for ref in list(tweet.data['referenced_tweets']):
+                referenced_tweet = next((t for t in includes['tweets'] if t.id == int(ref['id'])), None)
+                if referenced_tweet:
+                    if 'referenced_tweets' not in processed_tweet:
+                        processed_tweet['referenced_tweets'] = []
+                    processed_tweet['referenced_tweets'].append(referenced_tweet.data)
+
+        if 'media' in includes and 'attachments' in tweet.data and 'media_keys' in tweet.data['attachments']:
+            media_items = [m.data for m in includes['media'] if m.media_key in tweet.data['attachments']['media_keys']]
+            if media_items:
+                processed_tweet['media'] = media_items
+
+        return processed_tweet
+
+    if isinstance(response.data, list):
+        return [process_single_tweet(tweet) for tweet in response.data if tweet]
+    else:
+        return process_single_tweet(response.data)
+
+def expanded_references(tweets):
+    # Expanded tweets are appended after the {type, id} references and are the ones with text
+    return sum('text' in ref for tweet in tweets for ref in tweet.get('referenced_tweets', []))
+
+def best_time(func, payload, repeat):
+    # process_x_response enriches the response in place, so every run gets a freshly parsed one
+    timings = []
+    for _ in range(repeat):
+        response = parse_tweets_response(payload)
+        timings.append(timeit.timeit(lambda response=response: func(response), number=1))
+    return min(timings) * 1000
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--repeat', type=int, default=5)
+    args = parser.parse_args()
+
+    print(f"{'tweets':>7} {'legacy ms':>11} {'indexed ms':>11} {'speedup':>8}")
+    for size in SIZES:
+        payload = conversation_payload(size)
+        processed = process_x_response(parse_tweets_response(payload))
+        assert processed == legacy_process_x_response(parse_tweets_response(payload))
+        # Equal output alone would also pass with a join that never matches
+        assert expanded_references(processed) > 0, "no referenced tweet was expanded from the includes"
+        legacy = best_time(legacy_process_x_response, payload, args.repeat)
+        indexed = best_time(process_x_response, payload, args.repeat)
+        print(f"{size:>7} {legacy:>11.3f} {indexed:>11.3f} {legacy / indexed:>7.1f}x")
+
+if __name__ == '__main__':
+    main()
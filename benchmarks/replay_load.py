@@ -0,0 +1,178 @@
+"""
+Replays a recorded request mix against the proxy and reports throughput and p50/p99 latency per
+route. By default the proxy runs offline against the local X API and Airtable stub, so no
+quota is spent; pass --base-url to load an already running proxy instead.
+
+The mix is a JSON lines file with one request per line:
+    {"method": "GET", "path": "/api/get_tweet", "query": {"tweet_id": "1800000000000000001"}}
+    {"method": "POST", "path": "/api/like_tweet", "json": {"tweet_id": "1800000000000000001"}}
+A proxy started with REQUEST_RECORD_PATH writes live traffic in this format. In offline runs,
+"{stub_url}" in a request is replaced with the stub's URL, e.g. for media to post. Requests are sent
+by --concurrency workers, cycling through the mix until --requests have been sent. With
+--paced, the mix plays once at its recorded times instead; its lines need a "time".
+
+Usage: python -m benchmarks.replay_load [MIX] [--requests N] [--concurrency N] [--paced] [--speed X]
+       [--base-url URL --api-key KEY] [--latency-ms MS] [--jitter-ms MS] [--rate-limit N]
+       [--error-rate-429 RATIO] [--async-mode]
+"""
+import argparse
+import itertools
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+import requests
+from benchmarks.serving_mode_benchmark import free_port, wait_until_up
+from benchmarks.x_api_stub import RATE_LIMIT, start_stub
+
+DEFAULT_MIX = os.path.join(os.path.dirname(__file__), 'request_mix.jsonl')
+API_SECRET_KEY = 'replay-secret'
+
+def load_mix(path):
+    with open(path) as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+def serve(port, async_mode):
+    """Run the proxy in offline mode. Runs in a child process."""
+    from werkzeug.serving import run_simple
+    from main import create_app
+    app = create_app(async_mode=async_mode)
+    run_simple('127.0.0.1', port, app, threaded=True)
+
+def start_proxy(args, workdir):
+    """Start the stub in this process and an offline proxy pointed at it in a child process."""
+    stub = start_stub(latency_ms=args.latency_ms, jitter_ms=args.jitter_ms,
+                      rate_limit=args.rate_limit, error_rate_429=args.error_rate_429)
+    stub_url = f'http://127.0.0.1:{stub.server_port}'
+    port = free_port()
+    env = dict(
+        os.environ,
+        OFFLINE_MODE='true',
+        X_API_BASE_URL=stub_url,
+        AIRTABLE_API_URL=stub_url,
+        API_SECRET_KEY=API_SECRET_KEY,
+        MENTIONS_STORE_PATH=os.path.join(workdir, 'mentions.json'),
+        USER_ID_INDEX_PATH=os.path.join(workdir, 'user_ids.db'),
+        AIRTABLE_WRITE_QUEUE_PATH=os.path.join(workdir, 'airtable_writes.db'),
+        WRITE_JOB_QUEUE_PATH=os.path.join(workdir, 'write_jobs.db'),
+    )
+    command = [sys.executable, '-m', 'benchmarks.replay_load', '--serve', str(port)]
+    if args.async_mode:
+        command.append('--async-mode')
+    server = subprocess.Popen(command, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    base_url = f'http://127.0.0.1:{port}'
+    wait_until_up(base_url)
+    return server, base_url, stub_url
+
+def replay(base_url, api_key, mix, total_requests, concurrency, paced=False, speed=1.0):
+    """Returns (elapsed seconds, {route: [(status, latency_ms), ...]})."""
+    session = requests.Session()
+    session.mount('http://', requests.adapters.HTTPAdapter(pool_maxsize=concurrency))
+    headers = {'Authorization': f'Bearer {api_key}'}
+    results = defaultdict(list)
+    results_lock = threading.Lock()
+
+    def send(entry):
+        started = time.perf_counter()
+        try:
+            response = session.request(
+                entry.get('method', 'GET'), base_url + entry['path'],
+                params=entry.get('query'), json=entry.get('json'), headers=headers
+            )
+            status = response.status_code
+        except requests.RequestException:
+            status = 'error'
+        latency_ms = (time.perf_counter() - started) * 1000
+        with results_lock:
+            results[f"{entry.get('method', 'GET')} {entry['path']}"].append((status, latency_ms))
+
+    if paced:
+        # A recording plays once, in order; cycling would repeat its timestamps
+        entries = sorted(mix, key=lambda entry: entry['time'])[:total_requests]
+    else:
+        entries = list(itertools.islice(itertools.cycle(mix), total_requests))
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        if paced:
+            first_time = entries[0]['time']
+            for entry in entries:
+                # Send at the recorded offset, scaled by speed
+                delay = (entry['time'] - first_time) / speed - (time.perf_counter() - started)
+                if delay > 0:
+                    time.sleep(delay)
+                pool.submit(send, entry)
+        else:
+            list(pool.map(send, entries))
+    return time.perf_counter() - started, results
+
+def percentile(sorted_values, fraction):
+    return sorted_values[min(len(sorted_values) - 1, int(len(sorted_values) * fraction))]
+
+def report(elapsed, results):
+    print(f"{'route':<34} {'requests':>8} {'errors':>7} {'req/s':>8} {'p50 ms':>9} {'p99 ms':>9}")
+    all_latencies = []
+    for route, samples in sorted(results.items()):
+        latencies = sorted(latency for _, latency in samples)
+        errors = sum(1 for status, _ in samples if status == 'error' or status >= 400)
+        all_latencies.extend(latencies)
+        print(f"{route:<34} {len(samples):>8} {errors:>7} {len(samples) / elapsed:>8.1f} "
+              f"{statistics.median(latencies):>9.1f} {percentile(latencies, 0.99):>9.1f}")
+        statuses = defaultdict(int)
+        for status, _ in samples:
+            statuses[status] += 1
+        if errors:
+            print(f"{'':<34} statuses: {dict(sorted(statuses.items(), key=str))}")
+    all_latencies.sort()
+    print(f"{'total':<34} {len(all_latencies):>8} {'':>7} {len(all_latencies) / elapsed:>8.1f} "
+          f"{statistics.median(all_latencies):>9.1f} {percentile(all_latencies, 0.99):>9.1f}")
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('mix', nargs='?', default=DEFAULT_MIX)
+    parser.add_argument('--requests', type=int, help='requests to send (default: one pass over the mix)')
+    parser.add_argument('--concurrency', type=int, default=16)
+    parser.add_argument('--paced', action='store_true', help='send requests at their recorded times')
+    parser.add_argument('--speed', type=float, default=1.0, help='time compression for --paced')
+    parser.add_argument('--base-url', help='load a running proxy instead of an offline one')
+    parser.add_argument('--api-key', default=os.environ.get('API_SECRET_KEY', API_SECRET_KEY))
+    parser.add_argument('--latency-ms', type=int, default=50, help='stub latency')
+    parser.add_argument('--jitter-ms', type=int, default=0, help='random extra stub latency')
+    parser.add_argument('--rate-limit', type=int, default=RATE_LIMIT, help='stub budget per endpoint per 15 minutes')
+    parser.add_argument('--error-rate-429', type=float, default=0.0, help='share of stub responses that are 429s')
+    parser.add_argument('--async-mode', action='store_true', help='run the offline proxy in the async serving mode')
+    parser.add_argument('--serve', type=int, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.serve:
+        serve(args.serve, args.async_mode)
+        return
+
+    mix = load_mix(args.mix)
+    total_requests = args.requests or len(mix)
+
+    with tempfile.TemporaryDirectory() as workdir:
+        server = None
+        base_url, api_key = args.base_url, args.api_key
+        if not base_url:
+            server, base_url, stub_url = start_proxy(args, workdir)
+            api_key = API_SECRET_KEY
+            mix = [json.loads(json.dumps(entry).replace('{stub_url}', stub_url)) for entry in mix]
+        try:
+            print(f"Replaying {total_requests} requests from {args.mix} against {base_url}, "
+                  f"concurrency {args.concurrency}" + (f", paced at {args.speed}x" if args.paced else ''))
+            elapsed, results = replay(base_url, api_key, mix, total_requests, args.concurrency, args.paced, args.speed)
+        finally:
+            if server:
+                server.terminate()
+                server.wait()
+
+    report(elapsed, results)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,159 @@
+"""
+Compares concurrent-request throughput of the sync (threaded WSGI) and async (ASGI) serving
+modes against a local X API stub. Each request is a /api/get_tweets call for distinct ids, so
+every request fans out into several upstream lookups and nothing is served from cache.
+
+Both modes get the same number of route threads (--threads), so the difference comes from
+where the upstream waits happen: on pool threads in sync mode, on one event loop in async mode.
+
+Usage: python -m benchmarks.serving_mode_benchmark [--concurrency N] [--requests N] [--threads N]
+       [--ids-per-request N] [--latency-ms MS]
+"""
+import argparse
+import os
+import socket
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+import requests
+from benchmarks.synthetic import BASE_TWEET_ID
+from benchmarks.x_api_stub import start_stub
+
+API_SECRET_KEY = 'benchmark-secret'
+# Config requires these; the stub never checks them
+PLACEHOLDER_ENV = {name: 'benchmark' for name in (
+    'CLIENT_ID', 'CLIENT_SECRET', 'REDIRECT_URI', 'CONSUMER_KEY', 'CONSUMER_SECRET',
+    'ACCESS_TOKEN', 'ACCESS_TOKEN_SECRET', 'AIRTABLE_API_KEY', 'AIRTABLE_BASE_ID',
+    'AIRTABLE_CANDIDATE_TWEETS_TABLE_ID', 'AIRTABLE_EXOS_DRAFT_TWEETS_VIEW_ID'
+)}
+
+def serve(mode, port, threads):
+    """Run the proxy in the given mode with a preset OAuth2 token. Runs in a child process."""
+    from concurrent.futures import ThreadPoolExecutor as Pool
+    from werkzeug.serving import ThreadedWSGIServer
+    from config import Config
+    from main import create_app
+    from services.oauth1_handler import OAuth1Handler
+    from services.oauth2_handler import OAuth2Handler
+
+    oauth2_handler = OAuth2Handler(Config.CLIENT_ID, Config.CLIENT_SECRET, Config.REDIRECT_URI,
+                                   api_base_url=Config.X_API_BASE_URL)
+    oauth2_handler.oauth2_token = {'access_token': 'benchmark-token', 'expires_at': time.time() + 86400}
+    oauth1_handler = OAuth1Handler(Config.CONSUMER_KEY, Config.CONSUMER_SECRET,
+                                   Config.ACCESS_TOKEN, Config.ACCESS_TOKEN_SECRET)
+    app = create_app(async_mode=mode == 'async', oauth_handlers=(oauth2_handler, oauth1_handler))
+
+    if mode == 'async':
+        import uvicorn
+        from a2wsgi import WSGIMiddleware
+        uvicorn.run(WSGIMiddleware(app, workers=threads), host='127.0.0.1', port=port,
+                    log_level='warning', backlog=4096)
+        return
+
+    class PooledWSGIServer(ThreadedWSGIServer):
+        """Werkzeug's threaded server with a fixed-size thread pool instead of a thread per request."""
+        request_queue_size = 4096
+        pool = Pool(max_workers=threads)
+
+        def process_request(self, request, client_address):
+            self.pool.submit(self.process_request_thread, request, client_address)
+
+    PooledWSGIServer('127.0.0.1', port, app).serve_forever()
+
+def free_port():
+    with socket.socket() as s:
+        s.bind(('127.0.0.1', 0))
+        return s.getsockname()[1]
+
+def wait_until_up(url, timeout=30):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            requests.get(url, timeout=1)
+            return
+        except requests.ConnectionError:
+            time.sleep(0.2)
+    raise RuntimeError(f'Server at {url} did not start')
+
+def run_load(base_url, concurrency, total_requests, ids_per_request, id_offset):
+    session = requests.Session()
+    session.mount('http://', requests.adapters.HTTPAdapter(pool_maxsize=concurrency))
+    headers = {'Authorization': f'Bearer {API_SECRET_KEY}'}
+
+    def one_request(n):
+        first_id = BASE_TWEET_ID + id_offset + n * ids_per_request
+        ids = ','.join(str(first_id + i) for i in range(ids_per_request))
+        start = time.perf_counter()
+        response = session.get(f'{base_url}/api/get_tweets', params={'ids': ids}, headers=headers)
+        response.raise_for_status()
+        return (time.perf_counter() - start) * 1000
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        latencies = sorted(pool.map(one_request, range(total_requests)))
+    elapsed = time.perf_counter() - start
+    return total_requests / elapsed, latencies
+
+def benchmark_mode(mode, args, stub_url, workdir):
+    port = free_port()
+    env = dict(
+        PLACEHOLDER_ENV,
+        **os.environ,
+        TWITTER_USER_ID='1',
+        X_API_BASE_URL=stub_url,
+        API_SECRET_KEY=API_SECRET_KEY,
+        TWEET_CACHE_TTL='0',
+        MAX_BATCH_TWEET_IDS=str(args.ids_per_request),
+        MENTIONS_POLL_INTERVAL='3600',
+        MENTIONS_STORE_PATH=os.path.join(workdir, f'{mode}_mentions.json'),
+        USER_ID_INDEX_PATH=os.path.join(workdir, f'{mode}_user_ids.db'),
+    )
+    server = subprocess.Popen(
+        [sys.executable, '-m', 'benchmarks.serving_mode_benchmark', '--serve', mode,
+         '--port', str(port), '--threads', str(args.threads)],
+        env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL
+    )
+    try:
+        base_url = f'http://127.0.0.1:{port}'
+        wait_until_up(base_url)
+        # Warm up connections and clients; the measured run uses ids that were never requested
+        run_load(base_url, args.concurrency, args.concurrency, args.ids_per_request, 0)
+        return run_load(base_url, args.concurrency, args.requests, args.ids_per_request, 10_000_000)
+    finally:
+        server.terminate()
+        server.wait()
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--concurrency', type=int, default=64)
+    parser.add_argument('--requests', type=int, default=512)
+    parser.add_argument('--threads', type=int, default=16)
+    parser.add_argument('--ids-per-request', type=int, default=300)
+    parser.add_argument('--latency-ms', type=int, default=100)
+    parser.add_argument('--serve', choices=['sync', 'async'], help=argparse.SUPPRESS)
+    parser.add_argument('--port', type=int, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.serve:
+        serve(args.serve, args.port, args.threads)
+        return
+
+    stub = start_stub(latency_ms=args.latency_ms)
+    stub_url = f'http://127.0.0.1:{stub.server_port}'
+    print(f"{args.requests} GET /api/get_tweets ({args.ids_per_request} ids each), "
+          f"concurrency {args.concurrency}, {args.threads} route threads, "
+          f"upstream latency {args.latency_ms} ms")
+
+    with tempfile.TemporaryDirectory() as workdir:
+        results = {mode: benchmark_mode(mode, args, stub_url, workdir) for mode in ('sync', 'async')}
+
+    for mode, (throughput, latencies) in results.items():
+        p99 = latencies[min(len(latencies) - 1, int(len(latencies) * 0.99))]
+        print(f"{mode:<6} {throughput:8.1f} req/s   p50 {statistics.median(latencies):8.1f} ms   p99 {p99:8.1f} ms")
+    print(f"async/sync throughput: {results['async'][0] / results['sync'][0]:.2f}x")
+
+if __name__ == '__main__':
+    main()
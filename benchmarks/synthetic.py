@@ -0,0 +1,99 @@
+"""Synthetic X API v2 payloads for benchmarks, parsed through tweepy exactly like live responses."""
+import json
+import random
+import tweepy
+
+BASE_TWEET_ID = 1800000000000000000
+BASE_USER_ID = 100000000
+
+def _created_at(i):
+    return f"2024-07-{1 + i // 86400 % 28:02d}T{i // 3600 % 24:02d}:{i // 60 % 60:02d}:{i % 60:02d}.000Z"
+
+def user_payload(i):
+    return {
+        'id': str(BASE_USER_ID + i),
+        'name': f'User {i}',
+        'username': f'user_{i}',
+        'created_at': _created_at(i),
+        'description': 'Synthetic account used for benchmarking. ' * 3,
+        'location': 'Nowhere',
+        'profile_image_url': f'https://pbs.twimg.com/profile_images/{i}/avatar_normal.jpg',
+        'protected': False,
+        'verified': False,
+        'verified_type': 'none',
+        'public_metrics': {'followers_count': i * 7, 'following_count': i * 3, 'tweet_count': i * 11, 'listed_count': i},
+    }
+
+def tweet_payload(i, author_id, conversation_id, parent_id=None, quoted_id=None, media_keys=()):
+    tweet = {
+        'id': str(BASE_TWEET_ID + i),
+        'text': f'Synthetic tweet number {i} with enough text to look like a real post. ' * 2,
+        'author_id': str(author_id),
+        'conversation_id': str(conversation_id),
+        'created_at': _created_at(i),
+        'edit_history_tweet_ids': [str(BASE_TWEET_ID + i)],
+        'public_metrics': {'retweet_count': i % 13, 'reply_count': i % 7, 'like_count': i % 101, 'quote_count': i % 3},
+    }
+    references = []
+    if parent_id is not None:
+        references.append({'type': 'replied_to', 'id': str(parent_id)})
+    if quoted_id is not None:
+        references.append({'type': 'quoted', 'id': str(quoted_id)})
+    if references:
+        tweet['referenced_tweets'] = references
+    if media_keys:
+        tweet['attachments'] = {'media_keys': list(media_keys)}
+    return tweet
+
+def conversation_payload(n_tweets, n_users=None, quote_ratio=0.2, media_ratio=0.2, seed=42):
+    """A conversation page: n_tweets replies in one tree, with quoted tweets and media in the includes."""
+    rng = random.Random(seed)
+    n_users = n_users or max(1, n_tweets // 3)
+    root_id = BASE_TWEET_ID
+    tweets, quoted, media = [], [], []
+    for i in range(1, n_tweets + 1):
+        parent_id = BASE_TWEET_ID + rng.randrange(0, i)
+        quoted_id = None
+        if rng.random() < quote_ratio:
+            quoted_id = BASE_TWEET_ID + 10_000_000 + i
+            quoted.append(tweet_payload(10_000_000 + i, BASE_USER_ID + rng.randrange(n_users), quoted_id))
+        media_keys = []
+        if rng.random() < media_ratio:
+            media_keys = [f'3_{i}_{n}' for n in range(rng.randint(1, 4))]
+            media.extend({'media_key': key, 'type': 'photo', 'url': f'https://pbs.twimg.com/media/{key}.jpg'}
+                         for key in media_keys)
+        tweets.append(tweet_payload(i, BASE_USER_ID + rng.randrange(n_users), root_id,
+                                    parent_id=parent_id, quoted_id=quoted_id, media_keys=media_keys))
+    root = tweet_payload(0, BASE_USER_ID, root_id)
+    return {
+        'data': tweets,
+        'includes': {
+            'users': [user_payload(i) for i in range(n_users)],
+            'tweets': [root] + quoted,
+            'media': media,
+        },
+        'meta': {'result_count': n_tweets},
+    }
+
+def single_tweet_payload():
+    """A single tweet lookup: one reply that quotes a tweet and carries two photos."""
+    page = conversation_payload(1, quote_ratio=1.0, media_ratio=0.0)
+    tweet = dict(page['data'][0], attachments={'media_keys': ['3_1_0', '3_1_1']})
+    page['includes']['media'] = [{'media_key': key, 'type': 'photo', 'url': f'https://pbs.twimg.com/media/{key}.jpg'}
+                                 for key in tweet['attachments']['media_keys']]
+    return {'data': tweet, 'includes': page['includes']}
+
+def user_profile_payload(n_included_tweets=1):
+    """A user lookup whose includes carry n tweets, with the pinned and most recent tweet last."""
+    user = dict(user_payload(1), pinned_tweet_id=str(BASE_TWEET_ID + n_included_tweets - 1),
+                most_recent_tweet_id=str(BASE_TWEET_ID + n_included_tweets - 1))
+    tweets = [tweet_payload(i, user['id'], BASE_TWEET_ID + i) for i in range(n_included_tweets)]
+    return {'data': user, 'includes': {'tweets': tweets}}
+
+def parse_user_response(payload):
+    return tweepy.Client()._construct_response(json.loads(json.dumps(payload)), data_type=tweepy.User)
+
+def parse_tweets_response(payload):
+    """Turn a raw payload into the tweepy.Response a tweepy.Client call would return."""
+    # tweepy parses the includes in place, so always start from a fresh decode
+    return tweepy.Client()._construct_response(json.loads(json.dumps(payload)), data_type=tweepy.Tweet)
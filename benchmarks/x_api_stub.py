@@ -0,0 +1,409 @@
+"""
+Local stand-in for the X API and the Airtable table API, so the proxy can run and be load
+tested without credentials or quota. Point the proxy at it with X_API_BASE_URL and
+AIRTABLE_API_URL, or start the proxy with OFFLINE_MODE=true to get one in-process.
+
+Covers what the proxy uses:
+- X v2: tweets, search, mentions, home timeline, users, likes, retweets and follows.
+- X v1.1: media upload (simple and chunked) and verify_credentials.
+- Airtable: list, get and update of records, including batch updates.
+- /media/<name>: synthetic media files to post.
+
+Reads answer with only the requested tweet.fields, user.fields and expansions, like X does.
+Every endpoint answers after a configurable latency with x-rate-limit-* headers. Each X
+endpoint has a budget of --rate-limit requests per 15-minute window and answers 429 once it
+is spent. With --error-rate-429, a share of requests gets a 429 regardless.
+
+Usage: python -m benchmarks.x_api_stub [--port PORT] [--latency-ms MS] [--jitter-ms MS]
+       [--rate-limit N] [--error-rate-429 RATIO] [--drafts N]
+"""
+import argparse
+import itertools
+import json
+import random
+import re
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+from benchmarks.synthetic import BASE_TWEET_ID, BASE_USER_ID, conversation_payload, tweet_payload, user_payload
+from services.rate_limit_handler import RateLimitTracker
+
+RATE_LIMIT = 1_000_000  # default budget per endpoint, high enough that benchmarks never hit it
+RATE_LIMIT_WINDOW = 15 * 60  # seconds
+TIMELINE_PAGES = 5
+MEDIA_EXPIRY = 24 * 3600
+
+def tweets_payload(tweet_ids):
+    tweets = []
+    author_ids = set()
+    for tweet_id in tweet_ids:
+        i = int(tweet_id) - BASE_TWEET_ID
+        author_id = BASE_USER_ID + i % 50
+        author_ids.add(author_id)
+        tweets.append(tweet_payload(i, author_id, tweet_id))
+    return {
+        'data': tweets,
+        'includes': {'users': [user_payload(author_id - BASE_USER_ID) for author_id in sorted(author_ids)]},
+        'meta': {'result_count': len(tweets)}
+    }
+
+# Keys X returns whatever fields are requested, and the includes each expansion adds
+DEFAULT_TWEET_KEYS = {'id', 'text', 'edit_history_tweet_ids'}
+DEFAULT_USER_KEYS = {'id', 'name', 'username'}
+EXPANSION_INCLUDES = {
+    'author_id': 'users', 'referenced_tweets.id.author_id': 'users', 'in_reply_to_user_id': 'users',
+    'entities.mentions.username': 'users', 'referenced_tweets.id': 'tweets', 'attachments.media_keys': 'media',
+    'pinned_tweet_id': 'tweets', 'most_recent_tweet_id': 'tweets'
+}
+
+def apply_fields(payload, query):
+    """Trim a read payload to the tweet.fields, user.fields and expansions of the request."""
+    tweet_keys = DEFAULT_TWEET_KEYS | set(filter(None, query.get('tweet.fields', '').split(',')))
+    user_keys = DEFAULT_USER_KEYS | set(filter(None, query.get('user.fields', '').split(',')))
+    included = {EXPANSION_INCLUDES.get(expansion) for expansion in query.get('expansions', '').split(',')}
+
+    def trim(item, keys):
+        return {key: value for key, value in item.items() if key in keys}
+
+    data = payload['data']
+    first = data if isinstance(data, dict) else (data[0] if data else {})
+    keys = user_keys if 'username' in first else tweet_keys
+    trimmed = {name: value for name, value in payload.items() if name != 'includes'}
+    trimmed['data'] = trim(data, keys) if isinstance(data, dict) else [trim(item, keys) for item in data]
+
+    item_keys = {'users': user_keys, 'tweets': tweet_keys}
+    includes = {
+        name: [trim(item, item_keys[name]) if name in item_keys else item for item in items]
+        for name, items in payload.get('includes', {}).items() if name in included
+    }
+    if includes:
+        trimmed['includes'] = includes
+    return trimmed
+
+def user_index(user_id=None, username=None):
+    """Synthetic users are user_<i> with id BASE_USER_ID + i; unknown names map onto a stable index."""
+    if username is not None:
+        match = re.fullmatch(r'user_(\d+)', username.lower())
+        return int(match.group(1)) if match else sum(username.lower().encode()) % 1000
+    return max(int(user_id) - BASE_USER_ID, 0)
+
+def draft_record(i):
+    return {
+        'id': f'recDraft{i:09d}',
+        'createdTime': '2024-07-01T00:00:00.000Z',
+        'fields': {
+            'id': i,
+            'content': f'Draft tweet number {i}, waiting to be posted.',
+            'content_cleaned': f'Draft tweet number {i}, waiting to be posted.'
+        }
+    }
+
+class StubState:
+    """Everything the stub remembers between requests: rate limit windows, media uploads and Airtable records."""
+
+    def __init__(self, rate_limit, drafts):
+        self.lock = threading.Lock()
+        self.rate_limit = rate_limit
+        self.windows = {}  # endpoint -> (reset, remaining)
+        self.ids = itertools.count(1)
+        self.media = {}  # media_id -> media category
+        self.records = {record['id']: record for record in map(draft_record, range(drafts))}
+
+    def next_id(self):
+        with self.lock:
+            return next(self.ids)
+
+    def take_budget(self, endpoint):
+        """Spend one request of the endpoint's window. Returns (limit, remaining, reset); remaining < 0 when spent."""
+        now = int(time.time())
+        with self.lock:
+            reset, remaining = self.windows.get(endpoint, (0, 0))
+            if reset <= now:
+                reset, remaining = now + RATE_LIMIT_WINDOW, self.rate_limit
+            remaining -= 1
+            self.windows[endpoint] = (reset, max(remaining, 0))
+        return self.rate_limit, remaining, reset
+
+class XApiStubHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+    latency = 0.05
+    jitter = 0.0
+    error_rate_429 = 0.0
+
+    def do_GET(self):
+        self.handle_request('GET')
+
+    def do_POST(self):
+        self.handle_request('POST')
+
+    def do_PATCH(self):
+        self.handle_request('PATCH')
+
+    def do_DELETE(self):
+        self.handle_request('DELETE')
+
+    def handle_request(self, method):
+        url = urlparse(self.path)
+        self.query = {name: values[0] for name, values in parse_qs(url.query).items()}
+        length = int(self.headers.get('Content-Length') or 0)
+        self.body = self.rfile.read(length) if length else b''
+        time.sleep(self.latency + random.random() * self.jitter)
+
+        rate_limit_headers = {}
+        if not url.path.startswith(('/v0/', '/media/')):
+            endpoint = RateLimitTracker.endpoint_key(method, url.path)
+            limit, remaining, reset = self.server.state.take_budget(endpoint)
+            rate_limit_headers = {
+                'x-rate-limit-limit': str(limit),
+                'x-rate-limit-remaining': str(max(remaining, 0)),
+                'x-rate-limit-reset': str(reset)
+            }
+            if remaining < 0:
+                self.send_json(429, {'title': 'Too Many Requests', 'detail': 'Too Many Requests'}, rate_limit_headers)
+                return
+        if random.random() < self.error_rate_429:
+            retry_headers = dict(rate_limit_headers, **{'x-rate-limit-remaining': '0', 'Retry-After': '1'})
+            retry_headers['x-rate-limit-reset'] = str(int(time.time()) + 1)
+            self.send_json(429, {'title': 'Too Many Requests', 'detail': 'Injected 429'}, retry_headers)
+            return
+
+        for route_method, pattern, handler_name in ROUTES:
+            match = re.fullmatch(pattern, url.path)
+            if route_method == method and match:
+                status, payload = getattr(self, handler_name)(*match.groups())
+                break
+        else:
+            status, payload = 404, {'title': 'Not Found Error', 'detail': f'No stub for {method} {url.path}'}
+
+        if isinstance(payload, bytes):
+            self.send_body(status, payload, 'application/octet-stream', rate_limit_headers)
+        elif payload is None:
+            self.send_body(status, b'', None, rate_limit_headers)
+        else:
+            self.send_json(status, payload, rate_limit_headers)
+
+    def json_body(self):
+        return json.loads(self.body or b'{}')
+
+    # X API v2 reads
+
+    def get_tweets(self):
+        return 200, apply_fields(tweets_payload(self.query['ids'].split(',')), self.query)
+
+    def get_tweet(self, tweet_id):
+        payload = tweets_payload([tweet_id])
+        payload['data'] = payload['data'][0]
+        return 200, apply_fields(payload, self.query)
+
+    def search_recent(self):
+        return 200, apply_fields(conversation_payload(int(self.query.get('max_results', '10'))), self.query)
+
+    def get_mentions(self, user_id):
+        since_id = int(self.query.get('since_id') or 0)
+        ids = [BASE_TWEET_ID + i for i in range(int(self.query.get('max_results', '10')))]
+        return 200, apply_fields(tweets_payload([str(tweet_id) for tweet_id in ids if tweet_id > since_id]), self.query)
+
+    def get_home_timeline(self, user_id):
+        page = int(self.query.get('pagination_token') or 0)
+        max_results = int(self.query.get('max_results', '15'))
+        first = 100_000 + page * max_results
+        payload = tweets_payload([str(BASE_TWEET_ID + first + i) for i in range(max_results)])
+        if page + 1 < TIMELINE_PAGES:
+            payload['meta']['next_token'] = str(page + 1)
+        return 200, apply_fields(payload, self.query)
+
+    def get_me(self):
+        return 200, apply_fields({'data': user_payload(0)}, self.query)
+
+    def get_user(self, user_id):
+        return 200, apply_fields({'data': user_payload(user_index(user_id=user_id))}, self.query)
+
+    def get_user_by_username(self, username):
+        return 200, apply_fields({'data': user_payload(user_index(username=username))}, self.query)
+
+    def get_users_by_username(self):
+        usernames = self.query['usernames'].split(',')
+        return 200, apply_fields({'data': [user_payload(user_index(username=username)) for username in usernames]}, self.query)
+
+    # X API v2 writes
+
+    def create_tweet(self):
+        tweet_id = str(BASE_TWEET_ID + 50_000_000 + self.server.state.next_id())
+        text = self.json_body().get('text', '')
+        return 201, {'data': {'id': tweet_id, 'text': text, 'edit_history_tweet_ids': [tweet_id]}}
+
+    def like(self, user_id):
+        return 200, {'data': {'liked': True}}
+
+    def unlike(self, user_id, tweet_id):
+        return 200, {'data': {'liked': False}}
+
+    def retweet(self, user_id):
+        return 200, {'data': {'retweeted': True}}
+
+    def unretweet(self, user_id, tweet_id):
+        return 200, {'data': {'retweeted': False}}
+
+    def follow(self, user_id):
+        return 200, {'data': {'following': True, 'pending_follow': False}}
+
+    def unfollow(self, user_id, target_user_id):
+        return 200, {'data': {'following': False}}
+
+    # X API v1.1
+
+    def verify_credentials(self):
+        user = user_payload(0)
+        return 200, {'id': int(user['id']), 'id_str': user['id'], 'name': user['name'], 'screen_name': user['username']}
+
+    def media_upload(self):
+        state = self.server.state
+        if self.headers.get('Content-Type', '').startswith('application/x-www-form-urlencoded'):
+            form = {name: values[0] for name, values in parse_qs(self.body.decode()).items()}
+        else:
+            match = re.search(rb'name="command"\r\n\r\n(\w+)', self.body)
+            form = {'command': match.group(1).decode()} if match else {}
+        command = form.get('command') or self.query.get('command')
+
+        if command == 'APPEND':
+            return 204, None
+        if command == 'STATUS':
+            media_id = self.query['media_id']
+            return 200, {'media_id': int(media_id), 'media_id_string': media_id,
+                         'processing_info': {'state': 'succeeded', 'progress_percent': 100}}
+
+        if command == 'FINALIZE':
+            media_id = form['media_id']
+        else:
+            # INIT, or a simple upload in one request
+            media_id = str(state.next_id())
+            with state.lock:
+                state.media[media_id] = form.get('media_category', 'tweet_image')
+        payload = {'media_id': int(media_id), 'media_id_string': media_id, 'expires_after_secs': MEDIA_EXPIRY}
+        if command == 'FINALIZE' and state.media.get(media_id) != 'tweet_image':
+            payload['processing_info'] = {'state': 'pending', 'check_after_secs': 1}
+        return (202 if command == 'INIT' else 200), payload
+
+    def get_media_file(self, name):
+        """Deterministic media content; ?size= sets the size in bytes."""
+        size = int(self.query.get('size', 64 * 1024))
+        return 200, (name.encode() * (size // max(len(name), 1) + 1))[:size]
+
+    # Airtable
+
+    def list_records(self, base_id, table_id):
+        options = self.json_body() if self.command == 'POST' else self.query
+        records = sorted(self.server.state.records.values(), key=lambda record: record['id'])
+        max_records = int(options.get('maxRecords') or len(records))
+        records = records[:max_records]
+        offset = int(options.get('offset') or 0)
+        page_size = int(options.get('pageSize') or 100)
+        payload = {'records': records[offset:offset + page_size]}
+        if offset + page_size < len(records):
+            payload['offset'] = str(offset + page_size)
+        return 200, payload
+
+    def get_record(self, base_id, table_id, record_id):
+        record = self.server.state.records.get(record_id)
+        if not record:
+            return 404, {'error': 'NOT_FOUND'}
+        return 200, record
+
+    def update_record(self, base_id, table_id, record_id):
+        updated = self.update_records([{'id': record_id, 'fields': self.json_body().get('fields', {})}])
+        if not updated:
+            return 404, {'error': 'NOT_FOUND'}
+        return 200, updated[0]
+
+    def batch_update_records(self, base_id, table_id):
+        records = self.json_body().get('records', [])
+        updated = self.update_records(records)
+        if len(updated) < len(records):
+            return 422, {'error': {'type': 'ROW_DOES_NOT_EXIST', 'message': 'Record not found'}}
+        return 200, {'records': updated}
+
+    def update_records(self, updates):
+        state = self.server.state
+        updated = []
+        with state.lock:
+            for update in updates:
+                record = state.records.get(update['id'])
+                if record:
+                    record = state.records[update['id']] = dict(record, fields={**record['fields'], **update['fields']})
+                    updated.append(record)
+        return updated
+
+    def send_json(self, status, payload, headers=None):
+        self.send_body(status, json.dumps(payload).encode(), 'application/json', headers)
+
+    def send_body(self, status, body, content_type, headers=None):
+        self.send_response(status)
+        if content_type:
+            self.send_header('Content-Type', content_type)
+        self.send_header('Content-Length', str(len(body)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+ROUTES = [
+    ('GET', r'/2/tweets', 'get_tweets'),
+    ('GET', r'/2/tweets/(\d+)', 'get_tweet'),
+    ('GET', r'/2/tweets/search/recent', 'search_recent'),
+    ('POST', r'/2/tweets', 'create_tweet'),
+    ('GET', r'/2/users/me', 'get_me'),
+    ('GET', r'/2/users/by', 'get_users_by_username'),
+    ('GET', r'/2/users/by/username/(\w+)', 'get_user_by_username'),
+    ('GET', r'/2/users/(\d+)', 'get_user'),
+    ('GET', r'/2/users/(\d+)/mentions', 'get_mentions'),
+    ('GET', r'/2/users/(\d+)/timelines/reverse_chronological', 'get_home_timeline'),
+    ('POST', r'/2/users/(\d+)/likes', 'like'),
+    ('DELETE', r'/2/users/(\d+)/likes/(\d+)', 'unlike'),
+    ('POST', r'/2/users/(\d+)/retweets', 'retweet'),
+    ('DELETE', r'/2/users/(\d+)/retweets/(\d+)', 'unretweet'),
+    ('POST', r'/2/users/(\d+)/following', 'follow'),
+    ('DELETE', r'/2/users/(\d+)/following/(\d+)', 'unfollow'),
+    ('GET', r'/1\.1/account/verify_credentials\.json', 'verify_credentials'),
+    ('GET', r'/1\.1/media/upload\.json', 'media_upload'),
+    ('POST', r'/1\.1/media/upload\.json', 'media_upload'),
+    ('GET', r'/media/([\w.-]+)', 'get_media_file'),
+    ('GET', r'/v0/(\w+)/(\w+)', 'list_records'),
+    ('POST', r'/v0/(\w+)/(\w+)/listRecords', 'list_records'),
+    ('GET', r'/v0/(\w+)/(\w+)/(rec\w+)', 'get_record'),
+    ('PATCH', r'/v0/(\w+)/(\w+)/(rec\w+)', 'update_record'),
+    ('PATCH', r'/v0/(\w+)/(\w+)', 'batch_update_records'),
+]
+
+def start_stub(port=0, latency_ms=50, jitter_ms=0, rate_limit=RATE_LIMIT, error_rate_429=0.0, drafts=50):
+    """Start the stub in a daemon thread. Returns the server; its base URL is http://127.0.0.1:<server_port>."""
+    handler = type('Handler', (XApiStubHandler,), {
+        'latency': latency_ms / 1000,
+        'jitter': jitter_ms / 1000,
+        'error_rate_429': error_rate_429
+    })
+    server = ThreadingHTTPServer(('127.0.0.1', port), handler)
+    server.daemon_threads = True
+    server.state = StubState(rate_limit, drafts)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--port', type=int, default=8081)
+    parser.add_argument('--latency-ms', type=int, default=50)
+    parser.add_argument('--jitter-ms', type=int, default=0, help='random extra latency of up to this many ms')
+    parser.add_argument('--rate-limit', type=int, default=RATE_LIMIT, help='requests per endpoint per 15 minutes')
+    parser.add_argument('--error-rate-429', type=float, default=0.0, help='share of requests answered with a 429')
+    parser.add_argument('--drafts', type=int, default=50, help='draft records in the Airtable table')
+    args = parser.parse_args()
+
+    server = start_stub(args.port, args.latency_ms, args.jitter_ms, args.rate_limit, args.error_rate_429, args.drafts)
+    print(f"X API and Airtable stub listening on http://127.0.0.1:{server.server_port}")
+    threading.Event().wait()
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,72 @@
+from flask import request
+import gzip
+from services.metrics import metrics
+
+try:
+    import brotli
+except ImportError:  # Optional, installed with the "speedups" extra
+    brotli = None
+
+try:
+    import zstandard
+except ImportError:  # Optional, installed with the "speedups" extra
+    zstandard = None
+
+# Levels that favour speed: responses are compressed on every request, not once for storage
+GZIP_LEVEL = 5
+BROTLI_QUALITY = 5
+ZSTD_LEVEL = 3
+
+def available_encoders():
+    """Content codings this process can produce, in server preference order."""
+    encoders = {}
+    if zstandard is not None:
+        compressor = zstandard.ZstdCompressor(level=ZSTD_LEVEL)
+        encoders['zstd'] = compressor.compress
+    if brotli is not None:
+        encoders['br'] = lambda data: brotli.compress(data, quality=BROTLI_QUALITY)
+    encoders['gzip'] = lambda data: gzip.compress(data, compresslevel=GZIP_LEVEL)
+    return encoders
+
+def choose_encoding(accept_encodings, encoders):
+    """The coding the client weights highest, ties going to the server's preference; None for none acceptable."""
+    best, best_quality = None, 0
+    for encoding in encoders:
+        quality = accept_encodings.quality(encoding)
+        if quality > best_quality:
+            best, best_quality = encoding, quality
+    return best
+
+def is_compressible(response):
+    return response.mimetype.startswith('text/') or response.mimetype.endswith('json')
+
+def register_compression(app):
+    """Compress JSON and text responses with the best coding the client accepts. Streamed responses are left as is."""
+    encoders = available_encoders()
+    min_size = app.config['COMPRESSION_MIN_SIZE']
+
+    @app.after_request
+    def compress_response(response):
+        if not app.config['COMPRESSION_ENABLED'] or not is_compressible(response):
+            return response
+        response.vary.add('Accept-Encoding')
+        if (response.is_streamed or response.direct_passthrough or 'Content-Encoding' in response.headers
+                or response.status_code < 200 or response.status_code in (204, 304)):
+            return response
+
+        encoding = choose_encoding(request.accept_encodings, encoders)
+        if encoding is None:
+            return response
+        data = response.get_data()
+        if len(data) < min_size:
+            return response
+        compressed = encoders[encoding](data)
+        if len(compressed) >= len(data):
+            return response
+
+        response.set_data(compressed)
+        response.headers['Content-Encoding'] = encoding
+        labels = (('encoding', encoding),)
+        metrics.inc('xproxy_compressed_responses_total', labels)
+        metrics.inc('xproxy_compression_saved_bytes_total', labels, len(data) - len(compressed))
+        return response
@@ -4,25 +4,117 @@ from dotenv import load_dotenv
 # Load environment variables from .env file if it exists, otherwise Replit should still load its secrets
 load_dotenv()
 
+# Offline mode serves X and Airtable from a local stub that never checks credentials
+OFFLINE_MODE = os.environ.get('OFFLINE_MODE', 'false').lower() == 'true'
+
+def required_env(name, offline_default='offline'):
+    if OFFLINE_MODE:
+        return os.environ.setdefault(name, offline_default)
+    return os.environ[name]
+
 
 class Config:
     # OAuth 2.0 credentials
-    CLIENT_ID = os.environ['CLIENT_ID']
-    CLIENT_SECRET = os.environ['CLIENT_SECRET']
-    REDIRECT_URI = os.environ['REDIRECT_URI']
+    CLIENT_ID = required_env('CLIENT_ID')
+    CLIENT_SECRET = required_env('CLIENT_SECRET')
+    REDIRECT_URI = required_env('REDIRECT_URI')
 
     # OAuth 1.0a credentials
-    CONSUMER_KEY = os.environ['CONSUMER_KEY']
-    CONSUMER_SECRET = os.environ['CONSUMER_SECRET']
-    ACCESS_TOKEN = os.environ['ACCESS_TOKEN']
-    ACCESS_TOKEN_SECRET = os.environ['ACCESS_TOKEN_SECRET']
+    CONSUMER_KEY = required_env('CONSUMER_KEY')
+    CONSUMER_SECRET = required_env('CONSUMER_SECRET')
+    ACCESS_TOKEN = required_env('ACCESS_TOKEN')
+    ACCESS_TOKEN_SECRET = required_env('ACCESS_TOKEN_SECRET')
 
     # Other configurations
-    API_SECRET_KEY = os.environ['API_SECRET_KEY']
-    TWITTER_USER_ID = os.environ['TWITTER_USER_ID']
+    API_SECRET_KEY = required_env('API_SECRET_KEY')
+    TWITTER_USER_ID = required_env('TWITTER_USER_ID', '1')
 
     # Airtable configurations
-    AIRTABLE_API_KEY = os.environ['AIRTABLE_API_KEY']
-    AIRTABLE_BASE_ID = os.environ['AIRTABLE_BASE_ID']
-    AIRTABLE_CANDIDATE_TWEETS_TABLE_ID = os.environ['AIRTABLE_CANDIDATE_TWEETS_TABLE_ID']
-    AIRTABLE_EXOS_DRAFT_TWEETS_VIEW_ID = os.environ['AIRTABLE_EXOS_DRAFT_TWEETS_VIEW_ID']
+    AIRTABLE_API_KEY = required_env('AIRTABLE_API_KEY')
+    AIRTABLE_BASE_ID = required_env('AIRTABLE_BASE_ID')
+    AIRTABLE_CANDIDATE_TWEETS_TABLE_ID = required_env('AIRTABLE_CANDIDATE_TWEETS_TABLE_ID')
+    AIRTABLE_EXOS_DRAFT_TWEETS_VIEW_ID = required_env('AIRTABLE_EXOS_DRAFT_TWEETS_VIEW_ID')
+
+    # Object cache configurations (TTLs in seconds, 0 disables caching for that type)
+    TWEET_CACHE_TTL = int(os.environ.get('TWEET_CACHE_TTL', 60))
+    USER_CACHE_TTL = int(os.environ.get('USER_CACHE_TTL', 300))
+    OBJECT_CACHE_MAX_ENTRIES = int(os.environ.get('OBJECT_CACHE_MAX_ENTRIES', 2000))
+
+    # Username -> user id index (SQLite file, max entry age in seconds before a background refresh)
+    USER_ID_INDEX_PATH = os.environ.get('USER_ID_INDEX_PATH', 'user_id_index.db')
+    USER_ID_INDEX_MAX_AGE = int(os.environ.get('USER_ID_INDEX_MAX_AGE', 7 * 24 * 3600))
+
+    # Upstream concurrency and conversation fetch budget
+    UPSTREAM_MAX_WORKERS = int(os.environ.get('UPSTREAM_MAX_WORKERS', 8))
+    CONVERSATION_MAX_PAGES = int(os.environ.get('CONVERSATION_MAX_PAGES', 5))
+    CONVERSATION_MAX_TWEETS = int(os.environ.get('CONVERSATION_MAX_TWEETS', 500))
+
+    # Batched tweet lookups (window in milliseconds, 0 disables merging of single-tweet lookups)
+    TWEET_BATCH_WINDOW_MS = int(os.environ.get('TWEET_BATCH_WINDOW_MS', 0))
+    MAX_BATCH_TWEET_IDS = int(os.environ.get('MAX_BATCH_TWEET_IDS', 500))
+
+    # Mentions ingestion (poll interval in seconds)
+    MENTIONS_STORE_PATH = os.environ.get('MENTIONS_STORE_PATH', 'mentions_store.json')
+    MENTIONS_POLL_INTERVAL = int(os.environ.get('MENTIONS_POLL_INTERVAL', 60))
+    MENTIONS_MAX_STORED = int(os.environ.get('MENTIONS_MAX_STORED', 1000))
+
+    # Home timeline prefetching and streaming (seconds)
+    TIMELINE_PREFETCH_TTL = int(os.environ.get('TIMELINE_PREFETCH_TTL', 60))
+    TIMELINE_STREAM_MAX_SECONDS = int(os.environ.get('TIMELINE_STREAM_MAX_SECONDS', 60))
+
+    # X and Airtable API base URLs, only changed to point the proxy at a local stand-in of the APIs
+    X_API_BASE_URL = os.environ.get('X_API_BASE_URL', 'https://api.twitter.com')
+    AIRTABLE_API_URL = os.environ.get('AIRTABLE_API_URL', 'https://api.airtable.com')
+
+    # Offline mode: skip OAuth validation and serve X and Airtable from benchmarks/x_api_stub.py,
+    # started in-process unless X_API_BASE_URL and AIRTABLE_API_URL already point at one
+    OFFLINE_MODE = OFFLINE_MODE
+    OFFLINE_STUB_LATENCY_MS = int(os.environ.get('OFFLINE_STUB_LATENCY_MS', 50))
+
+    # Async serving mode (asgi.py): route worker threads, upstream connections and timeout in seconds
+    ASGI_THREADS = int(os.environ.get('ASGI_THREADS', 64))
+    ASYNC_MAX_CONNECTIONS = int(os.environ.get('ASYNC_MAX_CONNECTIONS', 100))
+    UPSTREAM_TIMEOUT = int(os.environ.get('UPSTREAM_TIMEOUT', 30))
+
+    # Media pipeline: download limits (bytes, seconds) and cache of uploaded media ids
+    MEDIA_MAX_BYTES = int(os.environ.get('MEDIA_MAX_BYTES', 512 * 1024 * 1024))
+    MEDIA_SPOOL_MAX_BYTES = int(os.environ.get('MEDIA_SPOOL_MAX_BYTES', 5 * 1024 * 1024))
+    MEDIA_DOWNLOAD_TIMEOUT = int(os.environ.get('MEDIA_DOWNLOAD_TIMEOUT', 30))
+    MEDIA_ID_CACHE_MAX_ENTRIES = int(os.environ.get('MEDIA_ID_CACHE_MAX_ENTRIES', 500))
+
+    # Chunked media upload (chunk size in bytes, concurrent APPENDs per upload, processing timeout in seconds)
+    MEDIA_CHUNK_SIZE = int(os.environ.get('MEDIA_CHUNK_SIZE', 4 * 1024 * 1024))
+    MEDIA_UPLOAD_CONCURRENCY = int(os.environ.get('MEDIA_UPLOAD_CONCURRENCY', 4))
+    MEDIA_PROCESSING_TIMEOUT = int(os.environ.get('MEDIA_PROCESSING_TIMEOUT', 300))
+
+    # Airtable drafts snapshot refresh interval (seconds)
+    DRAFTS_REFRESH_INTERVAL = int(os.environ.get('DRAFTS_REFRESH_INTERVAL', 60))
+
+    # Airtable write-back queue (SQLite file, attempts before an update is marked failed, base retry delay in seconds)
+    AIRTABLE_WRITE_QUEUE_PATH = os.environ.get('AIRTABLE_WRITE_QUEUE_PATH', 'airtable_write_queue.db')
+    AIRTABLE_WRITE_MAX_ATTEMPTS = int(os.environ.get('AIRTABLE_WRITE_MAX_ATTEMPTS', 8))
+    AIRTABLE_WRITE_RETRY_DELAY = int(os.environ.get('AIRTABLE_WRITE_RETRY_DELAY', 5))
+
+    # Asynchronous write jobs (SQLite file, worker threads, seconds finished jobs are kept)
+    WRITE_JOB_QUEUE_PATH = os.environ.get('WRITE_JOB_QUEUE_PATH', 'write_jobs.db')
+    WRITE_JOB_WORKERS = int(os.environ.get('WRITE_JOB_WORKERS', 4))
+    WRITE_JOB_RETENTION = int(os.environ.get('WRITE_JOB_RETENTION', 7 * 24 * 3600))
+
+    # post_tweet idempotency (seconds a key is remembered, keys kept, derive keys from the tweet content)
+    IDEMPOTENCY_KEY_TTL = int(os.environ.get('IDEMPOTENCY_KEY_TTL', 24 * 3600))
+    IDEMPOTENCY_MAX_KEYS = int(os.environ.get('IDEMPOTENCY_MAX_KEYS', 10000))
+    POST_TWEET_AUTO_IDEMPOTENCY = os.environ.get('POST_TWEET_AUTO_IDEMPOTENCY', 'false').lower() == 'true'
+
+    # Request phase timing (Server-Timing header) and sampling profiler for slow requests (milliseconds)
+    SERVER_TIMING_ENABLED = os.environ.get('SERVER_TIMING_ENABLED', 'true').lower() == 'true'
+    PROFILER_ENABLED = os.environ.get('PROFILER_ENABLED', 'false').lower() == 'true'
+    PROFILER_INTERVAL_MS = int(os.environ.get('PROFILER_INTERVAL_MS', 10))
+    PROFILER_SLOW_REQUEST_MS = int(os.environ.get('PROFILER_SLOW_REQUEST_MS', 1000))
+    PROFILER_MAX_PROFILES = int(os.environ.get('PROFILER_MAX_PROFILES', 20))
+
+    # Response compression (zstd, br or gzip, as the client accepts) for bodies of at least this many bytes
+    COMPRESSION_ENABLED = os.environ.get('COMPRESSION_ENABLED', 'true').lower() == 'true'
+    COMPRESSION_MIN_SIZE = int(os.environ.get('COMPRESSION_MIN_SIZE', 1024))
+
+    # Append every API request to this JSON lines file, for replay with benchmarks/replay_load.py (empty disables)
+    REQUEST_RECORD_PATH = os.environ.get('REQUEST_RECORD_PATH', '')
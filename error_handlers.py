@@ -1,4 +1,5 @@
 from flask import jsonify
+from services.idempotency_store import IdempotencyKeyReused
 from services.rate_limit_handler import RateLimitExceeded
 
 def register_error_handlers(app):
@@ -11,6 +12,13 @@ def register_error_handlers(app):
             'retry_after': error.retry_after
         }), 429
 
+    @app.errorhandler(IdempotencyKeyReused)
+    def handle_idempotency_key_reused(error):
+        return jsonify({
+            'error': 'Idempotency key reused',
+            'message': str(error)
+        }), 422
+
     @app.errorhandler(Exception)
     def handle_generic_error(error):
         app.logger.error(f"An unexpected error occurred: {error}", exc_info=True)
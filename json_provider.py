@@ -0,0 +1,61 @@
+from flask.json.provider import DefaultJSONProvider
+
+try:
+    import orjson
+except ImportError:  # Optional, installed with the "speedups" extra
+    orjson = None
+
+COMPACT_SEPARATORS = (',', ':')
+INDENT_SEPARATORS = (',', ': ')  # what json.dumps uses with an indent
+
+class FastJSONProvider(DefaultJSONProvider):
+    """
+    Flask's JSON provider with orjson doing the encoding and decoding when it is installed.
+
+    orjson only takes the calls whose output it can reproduce: the compact and indented
+    responses Flask builds, with sorted keys and dates as HTTP dates through the same default
+    hook. Everything else, including dumps() with the json module's spaced default separators
+    and integers wider than 64 bits, goes through the json module. What still differs is that
+    non-ASCII text is written as UTF-8 instead of \\u escapes, and NaN and Infinity as null.
+    Every encode goes through encode(), which returns bytes, so responses skip the str round trip.
+    """
+
+    def orjson_option(self, kwargs):
+        """orjson options that reproduce json.dumps with these arguments, or None when there are none."""
+        if orjson is None or set(kwargs) - {'indent', 'separators'}:
+            return None
+        indent, separators = kwargs.get('indent'), kwargs.get('separators')
+        if indent is None and separators == COMPACT_SEPARATORS:
+            option = orjson.OPT_NON_STR_KEYS | orjson.OPT_PASSTHROUGH_DATETIME
+        elif indent == 2 and separators in (None, INDENT_SEPARATORS):
+            option = orjson.OPT_NON_STR_KEYS | orjson.OPT_PASSTHROUGH_DATETIME | orjson.OPT_INDENT_2
+        else:
+            return None
+        if self.sort_keys:
+            option |= orjson.OPT_SORT_KEYS
+        return option
+
+    def encode(self, obj, **kwargs):
+        option = self.orjson_option(kwargs)
+        if option is not None:
+            try:
+                return orjson.dumps(obj, default=self.default, option=option)
+            except TypeError:
+                pass  # e.g. an int wider than 64 bits, which the json module can write
+        return super().dumps(obj, **kwargs).encode()
+
+    def dumps(self, obj, **kwargs):
+        return self.encode(obj, **kwargs).decode()
+
+    def loads(self, s, **kwargs):
+        if orjson is None or kwargs:
+            return super().loads(s, **kwargs)
+        return orjson.loads(s)
+
+    def response(self, *args, **kwargs):
+        obj = self._prepare_response_obj(args, kwargs)
+        if (self.compact is None and self._app.debug) or self.compact is False:
+            dump_args = {'indent': 2}
+        else:
+            dump_args = {'separators': COMPACT_SEPARATORS}
+        return self._app.response_class(self.encode(obj, **dump_args) + b'\n', mimetype=self.mimetype)
@@ -2,23 +2,42 @@ from flask import Flask
 from api import api_bp
 from config import Config
 from services.x_service import XService
-from services.oauth_setup import setup_and_validate_oauth
+from services.oauth2_handler import X_API_URL
+from services.oauth_setup import setup_and_validate_oauth, setup_offline_oauth
 from services.airtable_service import AirtableService
 from services.combined_services import CombinedServices
 from error_handlers import register_error_handlers
+from monitoring import register_monitoring
+from compression import register_compression
 
-def create_app(config_class=Config):
+def create_app(config_class=Config, async_mode=False, oauth_handlers=None):
     app = Flask(__name__)
     app.config.from_object(config_class)
 
-    oauth2_handler, oauth1_handler = setup_and_validate_oauth(app.config)
+    if app.config['OFFLINE_MODE']:
+        # Without a stub of its own (X_API_BASE_URL left at X), one is started in-process
+        if app.config['X_API_BASE_URL'] == X_API_URL:
+            # Imported lazily; the stub is only needed offline
+            from benchmarks.x_api_stub import start_stub
+            stub = start_stub(latency_ms=app.config['OFFLINE_STUB_LATENCY_MS'])
+            stub_url = f"http://127.0.0.1:{stub.server_port}"
+            app.config.update(X_API_BASE_URL=stub_url, AIRTABLE_API_URL=stub_url)
+        print(f"Offline mode: X and Airtable are served by the stub at {app.config['X_API_BASE_URL']}")
+        oauth_handlers = oauth_handlers or setup_offline_oauth(app.config)
+
+    # Pre-built (oauth2_handler, oauth1_handler) skip validation, e.g. for benchmarks against a stub
+    oauth2_handler, oauth1_handler = oauth_handlers or setup_and_validate_oauth(app.config)
 
     oauth2_handler.start_refresh_thread()
 
-    x_service = XService(oauth2_handler, oauth1_handler.api)
+    x_service = XService(oauth2_handler, oauth1_handler.api, async_mode=async_mode)
+    x_service.mentions_ingester.start()
+    x_service.write_jobs.start()
     app.x_service = x_service
 
     airtable_service = AirtableService(app.config)
+    airtable_service.drafts_cache.start()
+    airtable_service.write_queue.start()
     app.airtable_service = airtable_service
 
     combined_services = CombinedServices(airtable_service, x_service)
@@ -29,6 +48,12 @@ def create_app(config_class=Config):
     # Register error handlers
     register_error_handlers(app)
 
+    # Response compression; registered first so its hook runs after the others have set the body
+    register_compression(app)
+
+    # Request metrics and timing, the sampling profiler and the Prometheus /metrics endpoint
+    register_monitoring(app)
+
     @app.route('/')
     def hello():
         return "Greetings, your pseudo-X-API is up and running!"
@@ -0,0 +1,143 @@
+from flask import Response, current_app, g, request
+import json
+import threading
+import time
+from auth import token_required
+from json_provider import COMPACT_SEPARATORS, FastJSONProvider
+from services.metrics import metrics
+from services.request_timing import end_request, span, start_request
+from services.sampling_profiler import SamplingProfiler
+
+class TimedJSONProvider(FastJSONProvider):
+    """The app's JSON provider, with serialization recorded as a span of the request."""
+
+    def encode(self, obj, **kwargs):
+        with span('serialize'):
+            return super().encode(obj, **kwargs)
+
+def collect_service_samples(x_service, airtable_service):
+    """Gauges and cumulative counts the services already keep, read at scrape time as (name, labels, value)."""
+    samples = []
+    now = time.time()
+
+    oauth2_handler = x_service.oauth2_handler
+    for endpoint, bucket in sorted(oauth2_handler.rate_limit_tracker.snapshot().items()):
+        labels = (('endpoint', endpoint),)
+        samples.append(('xproxy_rate_limit_remaining', labels, bucket['remaining']))
+        samples.append(('xproxy_rate_limit_limit', labels, bucket['limit']))
+        samples.append(('xproxy_rate_limit_reset_seconds', labels, max(bucket['reset'] - now, 0)))
+    if oauth2_handler.oauth2_token:
+        samples.append(('xproxy_token_expires_in_seconds', (), oauth2_handler.oauth2_token.get('expires_at', 0) - now))
+
+    caches = {
+        'object': x_service.object_cache,
+        'media_id': x_service.media_service.media_id_cache,
+        'idempotency': x_service.idempotency_store.results
+    }
+    for cache_name, cache in caches.items():
+        stats = cache.stats()
+        labels = (('cache', cache_name),)
+        samples.append(('xproxy_cache_entries', labels, stats['entries']))
+        samples.append(('xproxy_cache_hits_total', labels, stats['hits']))
+        samples.append(('xproxy_cache_misses_total', labels, stats['misses']))
+        samples.append(('xproxy_cache_evictions_total', labels, stats['evictions']))
+        samples.append(('xproxy_cache_hit_ratio', labels, stats['hit_ratio']))
+
+    coalescers = {'reads': x_service.singleflight, 'post_tweet': x_service.idempotency_store.singleflight}
+    for coalescer_name, singleflight in coalescers.items():
+        stats = singleflight.stats()
+        labels = (('coalescer', coalescer_name),)
+        samples.append(('xproxy_coalesced_calls_total', labels, stats['calls']))
+        samples.append(('xproxy_coalesced_saved_calls_total', labels, stats['saved_calls']))
+        samples.append(('xproxy_coalesced_in_flight', labels, stats['in_flight']))
+
+    prefetch_stats = x_service.tweet_service.home_timeline_prefetcher.stats()
+    samples.append(('xproxy_prefetch_hits_total', (), prefetch_stats['hits']))
+    samples.append(('xproxy_prefetch_misses_total', (), prefetch_stats['misses']))
+
+    fetched_at = airtable_service.drafts_cache.fetched_at
+    if fetched_at:
+        samples.append(('xproxy_drafts_snapshot_age_seconds', (), now - fetched_at))
+    for status, count in sorted(airtable_service.write_queue.count_by_status().items()):
+        samples.append(('xproxy_airtable_writes', (('status', status),), count))
+    for status, count in sorted(x_service.write_jobs.count_by_status().items()):
+        samples.append(('xproxy_write_jobs', (('status', status),), count))
+
+    return samples
+
+def wants_debug_timing():
+    return request.args.get('debug_timing', 'false').lower() == 'true' or request.headers.get('X-Debug-Timing') == '1'
+
+def add_debug_timing(response, timer):
+    """Add the spans to a JSON object response as a "_timing" block."""
+    if response.is_streamed or not response.is_json:
+        return
+    data = response.get_json(silent=True)
+    if isinstance(data, dict):
+        data['_timing'] = timer.to_dict()
+        response.set_data(current_app.json.encode(data, separators=COMPACT_SEPARATORS) + b'\n')
+
+class RequestRecorder:
+    """Appends API requests to a JSON lines file in the format benchmarks/replay_load.py replays."""
+
+    def __init__(self, path):
+        self.path = path
+        self.lock = threading.Lock()
+
+    def record(self):
+        entry = {
+            'time': time.time(),
+            'method': request.method,
+            'path': request.path,
+            'query': request.args.to_dict(),
+            'json': request.get_json(silent=True)
+        }
+        with self.lock, open(self.path, 'a') as f:
+            f.write(json.dumps(entry) + '\n')
+
+def register_monitoring(app):
+    app.json = TimedJSONProvider(app)
+    app.profiler = SamplingProfiler(
+        enabled=app.config['PROFILER_ENABLED'],
+        interval_ms=app.config['PROFILER_INTERVAL_MS'],
+        slow_request_ms=app.config['PROFILER_SLOW_REQUEST_MS'],
+        max_profiles=app.config['PROFILER_MAX_PROFILES']
+    )
+    app.profiler.start()
+    recorder = RequestRecorder(app.config['REQUEST_RECORD_PATH']) if app.config['REQUEST_RECORD_PATH'] else None
+
+    @app.before_request
+    def start_request_timer():
+        g.request_timer = start_request()
+        if recorder and request.blueprint == 'api':
+            recorder.record()
+
+    @app.after_request
+    def record_request_metrics(response):
+        timer = g.get('request_timer')
+        if timer is None:
+            return response
+
+        # Labelled by URL rule, not path, so ids in the path don't create new series
+        route = request.url_rule.rule if request.url_rule else 'unmatched'
+        metrics.observe('xproxy_http_request_duration_seconds', timer.elapsed(), (('route', route),))
+        metrics.inc('xproxy_http_requests_total', (('route', route), ('status', response.status_code)))
+
+        if wants_debug_timing():
+            add_debug_timing(response, timer)
+        if app.config['SERVER_TIMING_ENABLED']:
+            response.headers['Server-Timing'] = timer.server_timing()
+        profile_id = app.profiler.finish_request(timer, request.method, request.path, response.status_code)
+        if profile_id:
+            response.headers['X-Profile-Id'] = profile_id
+        return response
+
+    @app.teardown_request
+    def stop_request_timer(_):
+        end_request()
+
+    @app.route('/metrics')
+    @token_required
+    def get_metrics():
+        samples = collect_service_samples(current_app.x_service, current_app.airtable_service)
+        return Response(metrics.render(samples), mimetype='text/plain; version=0.0.4')
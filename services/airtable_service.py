@@ -1,13 +1,33 @@
 from pyairtable import Api
 from datetime import datetime
+from .airtable_write_queue import AirtableWriteQueue
+from .drafts_cache import DraftsCache
+from .metrics import metrics
+
+class MeteredApi(Api):
+    """pyairtable Api that records every request in the metrics registry, e.g. as PATCH /v0/:base/:table."""
+
+    def request(self, method, url, *args, **kwargs):
+        # Paths are /v0/<base>/<table>[/<record>]; ids are left out so the endpoints stay few
+        depth = len(str(url).split('?')[0].split('/v0/', 1)[-1].split('/'))
+        endpoint = '/'.join(['/v0', ':base', ':table', ':record'][:depth + 1])
+        with metrics.time_upstream('airtable', f"{method.upper()} {endpoint}"):
+            return super().request(method, url, *args, **kwargs)
 
 class AirtableService:
     def __init__(self, config):
-        self.api = Api(config['AIRTABLE_API_KEY'])
+        self.api = MeteredApi(config['AIRTABLE_API_KEY'], endpoint_url=config['AIRTABLE_API_URL'])
         self.base_id = config['AIRTABLE_BASE_ID']
         self.candidate_tweets_table_id = config['AIRTABLE_CANDIDATE_TWEETS_TABLE_ID']
         self.draft_tweets_view_id = config['AIRTABLE_EXOS_DRAFT_TWEETS_VIEW_ID']
         self.tables = {}
+        self.drafts_cache = DraftsCache(self, refresh_interval=config['DRAFTS_REFRESH_INTERVAL'])
+        self.write_queue = AirtableWriteQueue(
+            self,
+            config['AIRTABLE_WRITE_QUEUE_PATH'],
+            max_attempts=config['AIRTABLE_WRITE_MAX_ATTEMPTS'],
+            retry_delay=config['AIRTABLE_WRITE_RETRY_DELAY']
+        )
 
     def get_table(self, table_id):
         if table_id not in self.tables:
@@ -15,23 +35,27 @@ class AirtableService:
         return self.tables[table_id]
 
     def get_records(self, table_id, view_id=None, filter_by_formula=None, sort=None, max_records=None):
-        table = self.get_table(table_id)
         try:
-            params = {}
-            if view_id:
-                params['view'] = view_id
-            if filter_by_formula:
-                params['filter_by_formula'] = filter_by_formula
-            if sort:
-                params['sort'] = sort
-            if max_records:
-                params['max_records'] = max_records
-            records = table.all(**params)
-            return self._process_records(records)
+            return self.fetch_records(table_id, view_id, filter_by_formula, sort, max_records)
         except Exception as e:
             print(f"Error fetching records from Airtable: {e}")
             return []
 
+    def fetch_records(self, table_id, view_id=None, filter_by_formula=None, sort=None, max_records=None):
+        """Like get_records, but raises on Airtable errors instead of returning an empty list."""
+        table = self.get_table(table_id)
+        params = {}
+        if view_id:
+            params['view'] = view_id
+        if filter_by_formula:
+            params['filter_by_formula'] = filter_by_formula
+        if sort:
+            params['sort'] = sort
+        if max_records:
+            params['max_records'] = max_records
+        records = table.all(**params)
+        return self._process_records(records)
+
     def _process_records(self, records):
         return [{'id': record['id'], 'fields': record['fields']} for record in records]
 
@@ -60,4 +84,12 @@ class AirtableService:
             sort=['id'],
             max_records=50
         )
-        return candidate_tweets
\ No newline at end of file
+        return candidate_tweets
+
+    def fetch_candidate_tweets(self):
+        return self.fetch_records(
+            table_id=self.candidate_tweets_table_id,
+            view_id=self.draft_tweets_view_id,
+            sort=['id'],
+            max_records=50
+        )
\ No newline at end of file
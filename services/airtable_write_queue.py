@@ -0,0 +1,168 @@
+import json
+import sqlite3
+import threading
+import time
+
+MAX_RECORDS_PER_BATCH = 10  # limit of Airtable's batch update endpoint
+MAX_RETRY_DELAY = 15 * 60  # seconds
+# Client errors that say nothing about the records themselves, e.g. a bad API key or the rate limit
+RETRYABLE_CLIENT_ERRORS = {401, 403, 408, 429}
+
+def is_record_error(error):
+    """Whether Airtable rejected the request's content, e.g. an unknown field or a deleted record."""
+    status = getattr(getattr(error, 'response', None), 'status_code', None)
+    return status is not None and 400 <= status < 500 and status not in RETRYABLE_CLIENT_ERRORS
+
+class AirtableWriteQueue:
+    """
+    Durable queue of Airtable record updates backed by SQLite, flushed by a background worker.
+
+    Updates are written with batch_update in groups of up to 10 records per table. Failed
+    batches are retried with exponential backoff; after max_attempts the updates are kept
+    with status 'failed' so they stay visible instead of being lost. A batch Airtable rejects
+    for its content is split until the offending records are found, and only those fail,
+    right away, since retrying them cannot succeed.
+    """
+
+    def __init__(self, airtable_service, path, max_attempts=8, retry_delay=5):
+        self.airtable_service = airtable_service
+        self.max_attempts = max_attempts
+        self.retry_delay = retry_delay
+        self.lock = threading.Lock()
+        self.wakeup = threading.Event()
+        self.connection = sqlite3.connect(path, check_same_thread=False)
+        with self.lock, self.connection:
+            self.connection.execute(
+                'CREATE TABLE IF NOT EXISTS writes ('
+                'id INTEGER PRIMARY KEY AUTOINCREMENT, table_id TEXT NOT NULL, record_id TEXT NOT NULL, '
+                'fields TEXT NOT NULL, status TEXT NOT NULL, attempts INTEGER NOT NULL, '
+                'next_attempt_at REAL NOT NULL, last_error TEXT, created_at REAL NOT NULL)'
+            )
+        self.flush_thread = None
+
+    def enqueue(self, table_id, record_id, fields):
+        now = time.time()
+        with self.lock, self.connection:
+            cursor = self.connection.execute(
+                'INSERT INTO writes (table_id, record_id, fields, status, attempts, next_attempt_at, created_at) '
+                "VALUES (?, ?, ?, 'pending', 0, ?, ?)",
+                (table_id, record_id, json.dumps(fields), now, now)
+            )
+        self.wakeup.set()
+        return cursor.lastrowid
+
+    def flush(self):
+        """Write every update that is due. Returns the number of updates written."""
+        with self.lock:
+            rows = self.connection.execute(
+                "SELECT id, table_id, record_id, fields, attempts FROM writes "
+                "WHERE status = 'pending' AND next_attempt_at <= ? ORDER BY id",
+                (time.time(),)
+            ).fetchall()
+
+        # Later updates of the same record are merged into one, since a batch may not repeat a record
+        records_by_table = {}
+        for write_id, table_id, record_id, fields, attempts in rows:
+            record = records_by_table.setdefault(table_id, {}).setdefault(
+                record_id, {'write_ids': [], 'fields': {}, 'attempts': 0}
+            )
+            record['write_ids'].append(write_id)
+            record['fields'].update(json.loads(fields))
+            record['attempts'] = max(record['attempts'], attempts)
+
+        written = 0
+        for table_id, records in records_by_table.items():
+            record_items = list(records.items())
+            for i in range(0, len(record_items), MAX_RECORDS_PER_BATCH):
+                written += self.write_batch(table_id, record_items[i:i + MAX_RECORDS_PER_BATCH])
+        return written
+
+    def write_batch(self, table_id, batch):
+        """batch_update a list of (record_id, record). Returns the number of updates written."""
+        write_ids = [write_id for _, record in batch for write_id in record['write_ids']]
+        try:
+            self.airtable_service.get_table(table_id).batch_update(
+                [{'id': record_id, 'fields': record['fields']} for record_id, record in batch]
+            )
+        except Exception as e:
+            record_error = is_record_error(e)
+            if record_error and len(batch) > 1:
+                # One invalid record fails the whole request, so the halves are tried on their own
+                half = len(batch) // 2
+                return self.write_batch(table_id, batch[:half]) + self.write_batch(table_id, batch[half:])
+            print(f"Error writing {len(batch)} records to Airtable: {e}")
+            attempts = max(record['attempts'] for _, record in batch) + 1
+            self.record_failure(write_ids, attempts, str(e), permanent=record_error)
+            return 0
+        with self.lock, self.connection:
+            self.connection.executemany('DELETE FROM writes WHERE id = ?', [(write_id,) for write_id in write_ids])
+        return len(write_ids)
+
+    def record_failure(self, write_ids, attempts, error, permanent=False):
+        status = 'failed' if permanent or attempts >= self.max_attempts else 'pending'
+        next_attempt_at = time.time() + min(self.retry_delay * (2 ** (attempts - 1)), MAX_RETRY_DELAY)
+        with self.lock, self.connection:
+            self.connection.executemany(
+                'UPDATE writes SET status = ?, attempts = ?, next_attempt_at = ?, last_error = ? WHERE id = ?',
+                [(status, attempts, next_attempt_at, error, write_id) for write_id in write_ids]
+            )
+
+    def retry_failed(self):
+        """Put failed updates back in the queue. Returns how many were requeued."""
+        with self.lock, self.connection:
+            cursor = self.connection.execute(
+                "UPDATE writes SET status = 'pending', attempts = 0, next_attempt_at = ? WHERE status = 'failed'",
+                (time.time(),)
+            )
+        self.wakeup.set()
+        return cursor.rowcount
+
+    def get_status(self):
+        with self.lock:
+            pending = self.connection.execute("SELECT COUNT(*) FROM writes WHERE status = 'pending'").fetchone()[0]
+            failed_rows = self.connection.execute(
+                "SELECT id, table_id, record_id, fields, attempts, last_error, created_at "
+                "FROM writes WHERE status = 'failed' ORDER BY id"
+            ).fetchall()
+        return {
+            'pending': pending,
+            'failed': [
+                {
+                    'id': write_id,
+                    'table_id': table_id,
+                    'record_id': record_id,
+                    'fields': json.loads(fields),
+                    'attempts': attempts,
+                    'last_error': last_error,
+                    'created_at': created_at
+                }
+                for write_id, table_id, record_id, fields, attempts, last_error, created_at in failed_rows
+            ]
+        }
+
+    def count_by_status(self):
+        with self.lock:
+            return dict(self.connection.execute('SELECT status, COUNT(*) FROM writes GROUP BY status').fetchall())
+
+    def next_attempt_in(self):
+        with self.lock:
+            next_attempt_at = self.connection.execute(
+                "SELECT MIN(next_attempt_at) FROM writes WHERE status = 'pending'"
+            ).fetchone()[0]
+        if next_attempt_at is None:
+            return None
+        return max(next_attempt_at - time.time(), 0)
+
+    def start(self):
+        def flush_loop():
+            while True:
+                self.wakeup.clear()
+                try:
+                    self.flush()
+                except Exception as e:
+                    print(f"Error flushing Airtable write queue: {e}")
+                # Sleep until the next retry is due or a new update is queued
+                self.wakeup.wait(self.next_attempt_in())
+
+        self.flush_thread = threading.Thread(target=flush_loop, daemon=True)
+        self.flush_thread.start()
@@ -0,0 +1,83 @@
+import asyncio
+import inspect
+import threading
+from config import Config
+from .async_tweet_service import AsyncTweetService
+from .page_prefetcher import PagePrefetcher
+from .request_timing import current_timer
+from .singleflight import coalesce
+from .tweet_service import TweetService
+
+class AsyncBridge:
+    """Runs one asyncio event loop in a daemon thread and lets synchronous code wait on coroutines in it."""
+
+    def __init__(self):
+        self.loop = asyncio.new_event_loop()
+        self.thread = threading.Thread(target=self.loop.run_forever, daemon=True)
+        self.thread.start()
+
+    def run(self, coro):
+        timer = current_timer.get()
+        if timer is not None:
+            coro = self.with_timer(coro, timer)
+        return asyncio.run_coroutine_threadsafe(coro, self.loop).result()
+
+    @staticmethod
+    async def with_timer(coro, timer):
+        # Tasks on the loop do not inherit the caller's context, so spans need the timer passed along
+        current_timer.set(timer)
+        return await coro
+
+class BridgedTweetService:
+    """
+    Synchronous TweetService facade for the async serving mode.
+
+    Upstream calls run as coroutines of an AsyncTweetService on a single shared event loop,
+    so a request waiting on X only blocks its own route thread; fan-outs, retries and
+    backoff sleeps cost no threads at all. Anything the async twin does not implement
+    falls through to the synchronous TweetService.
+    """
+
+    def __init__(self, tweet_service, bridge=None):
+        self.tweet_service = tweet_service
+        self.bridge = bridge or AsyncBridge()
+        self.async_service = AsyncTweetService(tweet_service)
+        self.singleflight = tweet_service.singleflight
+        self.home_timeline_prefetcher = PagePrefetcher(
+            self.fetch_home_timeline_page, tweet_service.executor, ttl=Config.TIMELINE_PREFETCH_TTL
+        )
+
+    # Same idempotency handling as the sync service, with the post itself sent on the event loop
+    post_tweet = TweetService.post_tweet
+    post_tweet_once = TweetService.post_tweet_once
+
+    def send_tweet(self, text, in_reply_to_tweet_id=None, media_url=None, media_urls=None):
+        return self.bridge.run(self.async_service.post_tweet(text, in_reply_to_tweet_id, media_url, media_urls))
+
+    @coalesce
+    def get_tweet(self, tweet_id, projection=None):
+        return self.bridge.run(self.async_service.get_tweet(tweet_id, projection))
+
+    @coalesce
+    def search_recent_tweets(self, query, projection=None):
+        return self.bridge.run(self.async_service.search_recent_tweets(query, projection))
+
+    @coalesce
+    def fetch_home_timeline_page(self, max_results, pagination_token, projection=None):
+        return self.bridge.run(self.async_service.fetch_home_timeline_page(max_results, pagination_token, projection))
+
+    def get_home_timeline(self, max_results=15, pagination_token=None, projection=None):
+        tweets, _ = self.get_home_timeline_page(max_results, pagination_token, projection=projection)
+        return tweets
+
+    def get_home_timeline_page(self, max_results=15, pagination_token=None, prefetch=False, projection=None,
+                               prefetch_next=True):
+        if prefetch:
+            return self.home_timeline_prefetcher.get_page(max_results, pagination_token, projection, prefetch_next)
+        return self.fetch_home_timeline_page(max_results, pagination_token, projection)
+
+    def __getattr__(self, name):
+        method = getattr(self.async_service, name, None)
+        if inspect.iscoroutinefunction(method):
+            return lambda *args, **kwargs: self.bridge.run(method(*args, **kwargs))
+        return getattr(self.tweet_service, name)
@@ -0,0 +1,289 @@
+import asyncio
+import aiohttp
+from contextvars import copy_context
+from tweepy.asynchronous import AsyncClient
+from tweepy.errors import HTTPException
+from config import Config
+from .metrics import metrics
+from .oauth2_handler import X_API_URL
+from .process_x_response import process_x_response
+from .rate_limit_handler import RateLimitTracker, handle_rate_limit_async
+from .tweet_service import (conversation_search_params, create_tweet_params, get_media_urls, home_timeline_params,
+                            mentions_page_params, shape_mentions_page, shape_timeline_page, shape_tweet_lookup,
+                            shape_tweets, tweet_action_result, tweet_request_params)
+
+class RateLimitedAsyncClient(AsyncClient):
+    """AsyncClient twin of RateLimitedClient, sharing the same RateLimitTracker."""
+
+    def __init__(self, *args, rate_limit_tracker=None, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.rate_limit_tracker = rate_limit_tracker or RateLimitTracker()
+        self.authenticating_user_ids = {}
+
+    async def _get_oauth_2_authenticating_user_id(self, access_token):
+        # As in RateLimitedClient: tweepy's lookup swaps return_type on the shared client
+        if access_token not in self.authenticating_user_ids:
+            response = await self.request('GET', '/2/users/me')
+            self.authenticating_user_ids[access_token] = (await response.json())['data']['id']
+        return self.authenticating_user_ids[access_token]
+
+    async def request(self, method, route, params=None, json=None, user_auth=False):
+        self.rate_limit_tracker.check(method, route)
+        try:
+            with metrics.time_upstream('x', self.rate_limit_tracker.endpoint_key(method, route)):
+                response = await super().request(method, route, params=params, json=json, user_auth=user_auth)
+        except HTTPException as e:
+            self.rate_limit_tracker.update(method, route, e.response.headers)
+            raise
+        self.rate_limit_tracker.update(method, route, response.headers)
+        return response
+
+class XApiClientSession:
+    """Wraps an aiohttp.ClientSession so tweepy's X API requests can go to another base URL."""
+
+    def __init__(self, session, base_url=X_API_URL):
+        self.session = session
+        self.base_url = base_url.rstrip('/')
+
+    def request(self, method, url, **kwargs):
+        url = str(url)
+        if self.base_url != X_API_URL and url.startswith(X_API_URL):
+            url = self.base_url + url[len(X_API_URL):]
+        return self.session.request(method, url, **kwargs)
+
+    async def close(self):
+        await self.session.close()
+
+class AsyncTweetService:
+    """
+    Async twin of TweetService built on tweepy's AsyncClient, used by the async serving mode.
+
+    Only the transport is its own: requests are built, responses shaped and the object cache,
+    user id index and tweet batcher used through the sync TweetService's helpers, so both modes
+    see the same state and return the same shapes. Must only be used from a single event loop.
+    """
+
+    def __init__(self, tweet_service):
+        self.tweet_service = tweet_service
+        self.oauth2_handler = tweet_service.oauth2_handler
+        self.media_service = tweet_service.media_service
+        self.object_cache = tweet_service.object_cache
+        self.user_id_index = tweet_service.user_id_index
+        self.session = None
+        self.client = None
+        self.token_lock = asyncio.Lock()
+
+    async def get_client(self):
+        if self.oauth2_handler.token_needs_refresh():
+            # A refresh is a blocking HTTP call, and a failed one falls back to the interactive setup:
+            # run it off the loop, once for all the coroutines that find the token expiring. The copied
+            # context keeps its oauth_token span on this request
+            async with self.token_lock:
+                if self.oauth2_handler.token_needs_refresh():
+                    await asyncio.get_running_loop().run_in_executor(
+                        None, copy_context().run, self.oauth2_handler.ensure_oauth2_token)
+        access_token = self.oauth2_handler.oauth2_token['access_token']
+        if self.session is None:
+            # One keep-alive connection pool for every upstream call on this loop
+            self.session = XApiClientSession(
+                aiohttp.ClientSession(
+                    connector=aiohttp.TCPConnector(limit=Config.ASYNC_MAX_CONNECTIONS),
+                    timeout=aiohttp.ClientTimeout(total=Config.UPSTREAM_TIMEOUT)
+                ),
+                base_url=self.oauth2_handler.api_base_url
+            )
+        if self.client is None or self.client.bearer_token != access_token:
+            self.client = RateLimitedAsyncClient(
+                access_token,
+                rate_limit_tracker=self.oauth2_handler.rate_limit_tracker
+            )
+            self.client.session = self.session
+        return self.client
+
+    @handle_rate_limit_async
+    async def post_tweet(self, text, in_reply_to_tweet_id=None, media_url=None, media_urls=None):
+        # Uploads and processing polls run on the media service's own threads; the loop only awaits them
+        media_futures = [
+            asyncio.wrap_future(self.media_service.start_media_upload(url))
+            for url in get_media_urls(media_url, media_urls)
+        ]
+        client = await self.get_client()
+        media_ids = await asyncio.gather(*media_futures)
+
+        response = await client.create_tweet(**create_tweet_params(text, in_reply_to_tweet_id, media_ids))
+        return response.data['id']
+
+    @handle_rate_limit_async
+    async def post_reply(self, tweet_id, text):
+        client = await self.get_client()
+        response = await client.create_tweet(**create_tweet_params(text, in_reply_to_tweet_id=tweet_id))
+        return response.data['id']
+
+    @handle_rate_limit_async
+    async def like_tweet(self, tweet_id):
+        client = await self.get_client()
+        response = await client.like(tweet_id=tweet_id, user_auth=False)
+        self.object_cache.invalidate('tweet', tweet_id)
+        return tweet_action_result(response)
+
+    @handle_rate_limit_async
+    async def unlike_tweet(self, tweet_id):
+        client = await self.get_client()
+        response = await client.unlike(tweet_id=tweet_id, user_auth=False)
+        self.object_cache.invalidate('tweet', tweet_id)
+        return tweet_action_result(response)
+
+    @handle_rate_limit_async
+    async def retweet(self, tweet_id):
+        client = await self.get_client()
+        response = await client.retweet(tweet_id=tweet_id, user_auth=False)
+        self.object_cache.invalidate('tweet', tweet_id)
+        return tweet_action_result(response)
+
+    @handle_rate_limit_async
+    async def unretweet(self, source_tweet_id):
+        client = await self.get_client()
+        response = await client.unretweet(source_tweet_id=source_tweet_id, user_auth=False)
+        self.object_cache.invalidate('tweet', source_tweet_id)
+        return tweet_action_result(response)
+
+    @handle_rate_limit_async
+    async def get_mentions_page(self, since_id=None, pagination_token=None, max_results=100):
+        client = await self.get_client()
+        response = await client.get_users_mentions(**mentions_page_params(since_id, pagination_token, max_results))
+        return shape_mentions_page(response)
+
+    @handle_rate_limit_async
+    async def get_tweet(self, tweet_id, projection=None):
+        cached_tweet = self.tweet_service.cached_tweet(tweet_id, projection)
+        if cached_tweet:
+            return cached_tweet
+
+        tweet_batcher = self.tweet_service.tweet_batcher
+        if tweet_batcher and not projection:
+            # Shares the sync service's batching window; the batch is sent from the batcher's thread
+            tweet = await asyncio.wrap_future(tweet_batcher.submit(tweet_id))
+            return self.tweet_service.store_tweet(tweet_id, tweet)
+
+        client = await self.get_client()
+        response = await client.get_tweet(id=tweet_id, **tweet_request_params(projection))
+        return self.tweet_service.store_tweet(tweet_id, process_x_response(response), projection)
+
+    @handle_rate_limit_async
+    async def get_tweets(self, tweet_ids, projection=None):
+        tweet_ids, tweets, batches = self.tweet_service.plan_tweet_lookups(tweet_ids, projection)
+        fetched = await asyncio.gather(*(self.lookup_tweets(batch, projection) for batch in batches))
+        return self.tweet_service.merge_tweet_lookups(tweet_ids, tweets, fetched, projection)
+
+    async def lookup_tweets(self, tweet_ids, projection=None):
+        client = await self.get_client()
+        response = await client.get_tweets(ids=tweet_ids, **tweet_request_params(projection))
+        return shape_tweet_lookup(response, projection)
+
+    @handle_rate_limit_async
+    async def search_recent_tweets(self, query, projection=None):
+        client = await self.get_client()
+        response = await client.search_recent_tweets(query, **tweet_request_params(projection))
+        return shape_tweets(response, projection)
+
+    @handle_rate_limit_async
+    async def get_conversation_thread(self, tweet_id, projection=None):
+        requested_tweet = await self.get_tweet(tweet_id, projection)
+        if not requested_tweet:
+            return None
+
+        conversation_id = requested_tweet.get('conversation_id')
+        if not conversation_id:
+            return {'tweets': [requested_tweet], 'complete': True}
+
+        # Root lookup and conversation search run concurrently on the loop
+        if conversation_id != requested_tweet['id']:
+            root_tweet, (thread, complete) = await asyncio.gather(
+                self.get_tweet(conversation_id, projection),
+                self.search_conversation(conversation_id, projection)
+            )
+        else:
+            root_tweet = requested_tweet
+            thread, complete = await self.search_conversation(conversation_id, projection)
+        return self.tweet_service.assemble_thread(requested_tweet, root_tweet, thread, complete)
+
+    async def search_conversation(self, conversation_id, projection=None):
+        client = await self.get_client()
+        thread = []
+        next_token = None
+
+        for _ in range(Config.CONVERSATION_MAX_PAGES):
+            response = await client.search_recent_tweets(**conversation_search_params(conversation_id, next_token, projection))
+            thread.extend(shape_tweets(response, projection) or [])
+            next_token = response.meta.get('next_token')
+            if not next_token or len(thread) >= Config.CONVERSATION_MAX_TWEETS:
+                break
+
+        return thread, next_token is None
+
+    @handle_rate_limit_async
+    async def fetch_home_timeline_page(self, max_results, pagination_token, projection=None):
+        client = await self.get_client()
+        response = await client.get_home_timeline(**home_timeline_params(max_results, pagination_token, projection))
+        return shape_timeline_page(response, projection)
+
+    @handle_rate_limit_async
+    async def get_user_by_username(self, username, projection=None):
+        username = username.lstrip('@')
+        cached_user = self.tweet_service.cached_user('username', username.lower(), projection)
+        if cached_user:
+            return cached_user
+
+        client = await self.get_client()
+        response = await client.get_user(
+            username=username, user_auth=False, **self.tweet_service.user_request_params(projection)
+        )
+        return self.tweet_service.store_user_response(response, projection)
+
+    @handle_rate_limit_async
+    async def get_user_by_id(self, user_id, projection=None):
+        cached_user = self.tweet_service.cached_user('user', user_id, projection)
+        if cached_user:
+            return cached_user
+
+        client = await self.get_client()
+        response = await client.get_user(
+            id=user_id, user_auth=False, **self.tweet_service.user_request_params(projection)
+        )
+        return self.tweet_service.store_user_response(response, projection)
+
+    @handle_rate_limit_async
+    async def lookup_user_ids(self, usernames):
+        client = await self.get_client()
+        response = await client.get_users(usernames=usernames, user_auth=False)
+        return {user.username.lower(): str(user.id) for user in response.data or []}
+
+    async def resolve_user_id(self, username):
+        user_id = self.user_id_index.lookup(username)
+        if user_id:
+            return user_id
+        found = await self.lookup_user_ids([self.user_id_index.normalize(username)])
+        self.user_id_index.store_many(found)
+        return found.get(self.user_id_index.normalize(username))
+
+    @handle_rate_limit_async
+    async def follow_user(self, username):
+        client = await self.get_client()
+        user_id = await self.resolve_user_id(username)
+        if not user_id:
+            raise ValueError(f"User with username {username} not found")
+
+        response = await client.follow_user(user_id, user_auth=False)
+        self.tweet_service.invalidate_user(user_id, username)
+        return response.data
+
+    @handle_rate_limit_async
+    async def unfollow_user(self, username):
+        client = await self.get_client()
+        user_id = await self.resolve_user_id(username)
+        if not user_id:
+            raise ValueError(f"User with username {username} not found")
+
+        response = await client.unfollow_user(user_id, user_auth=False)
+        self.tweet_service.invalidate_user(user_id, username)
+        return response.data
@@ -21,20 +21,21 @@ class CombinedServices:
         if not tweet_content:
             return {'error': 'No content found in draft tweet'}, 400
 
-        # Post the tweet
-        tweet_id = self.x_service.post_tweet(tweet_content)
+        # Post the tweet; retrying the same draft returns the tweet it already produced
+        tweet_id = self.x_service.post_tweet(tweet_content, idempotency_key=f"draft:{draft_tweet_record_id}")
 
-        # Update the Airtable record
+        # Queue the Airtable record update; it is written back in the background
         tweet_url = f"https://x.com/truth_terminal/status/{tweet_id}"
         updated_fields = {
             'tweet_url': tweet_url,
             'tweet_date': datetime.now().isoformat()
         }
-        self.airtable_service.update_record(
+        self.airtable_service.write_queue.enqueue(
             table_id=self.airtable_service.candidate_tweets_table_id,
             record_id=draft_tweet_record_id,
             fields=updated_fields
         )
+        self.airtable_service.drafts_cache.update_draft(draft_tweet_record_id, updated_fields)
 
         return {
             'success': True,
@@ -0,0 +1,95 @@
+# Tweet fields the reply tree and conversation fetch are built from
+THREAD_TWEET_FIELDS = ['conversation_id', 'created_at', 'referenced_tweets']
+
+def get_parent_tweet_id(tweet):
+    referenced_tweets = tweet.get('referenced_tweets', [])
+    replied_to = next((ref for ref in referenced_tweets if ref.get('type') == 'replied_to'), None)
+    return replied_to['id'] if replied_to else None
+
+class ConversationIndex:
+    """
+    Reply tree of a conversation thread, built in a single pass over the tweets.
+
+    All relationship queries are answered from the id -> tweet and parent -> children
+    maps, so nothing rescans the thread.
+    """
+
+    def __init__(self, thread):
+        self.tweets_by_id = {}
+        self.parent_ids = {}
+        self.children = {}
+        self.subtree_sizes = {}
+
+        for tweet in thread:
+            if tweet['id'] in self.tweets_by_id:
+                continue
+            self.tweets_by_id[tweet['id']] = tweet
+            parent_id = get_parent_tweet_id(tweet)
+            self.parent_ids[tweet['id']] = parent_id
+            if parent_id:
+                self.children.setdefault(parent_id, []).append(tweet)
+
+        for replies in self.children.values():
+            replies.sort(key=lambda x: x['created_at'])
+
+    def get(self, tweet_id):
+        return self.tweets_by_id.get(tweet_id)
+
+    def ancestors(self, tweet_id):
+        """Tweets from the oldest known ancestor down to the parent of tweet_id."""
+        chain = []
+        seen = {tweet_id}
+        parent_id = self.parent_ids.get(tweet_id)
+        while parent_id and parent_id in self.tweets_by_id and parent_id not in seen:
+            seen.add(parent_id)
+            chain.append(self.tweets_by_id[parent_id])
+            parent_id = self.parent_ids.get(parent_id)
+        chain.reverse()
+        return chain
+
+    def depth(self, tweet_id):
+        return len(self.ancestors(tweet_id))
+
+    def children_of(self, tweet_id):
+        return list(self.children.get(tweet_id, []))
+
+    def siblings(self, tweet_id):
+        parent_id = self.parent_ids.get(tweet_id)
+        if not parent_id:
+            return []  # No parent, so no siblings
+        return [t for t in self.children.get(parent_id, []) if t['id'] != tweet_id]
+
+    def subtree_size(self, tweet_id):
+        """Number of tweets in the reply subtree rooted at tweet_id, including itself."""
+        if tweet_id not in self.subtree_sizes:
+            # Iterative post-order walk so very deep reply chains cannot hit the recursion limit
+            stack = [(tweet_id, False)]
+            visited = set()
+            while stack:
+                current_id, expanded = stack.pop()
+                replies = self.children.get(current_id, [])
+                if expanded:
+                    self.subtree_sizes[current_id] = 1 + sum(
+                        self.subtree_sizes.get(reply['id'], 0) for reply in replies
+                    )
+                elif current_id not in visited and current_id not in self.subtree_sizes:
+                    visited.add(current_id)
+                    stack.append((current_id, True))
+                    stack.extend((reply['id'], False) for reply in replies)
+        return self.subtree_sizes[tweet_id]
+
+    def descendant_tree(self, tweet_id):
+        """Nested {'tweet', 'replies'} tree of every known descendant, replies oldest first."""
+        tree = {'tweet': self.tweets_by_id.get(tweet_id), 'replies': []}
+        stack = [(tweet_id, tree)]
+        visited = {tweet_id}
+        while stack:
+            current_id, node = stack.pop()
+            for reply in self.children.get(current_id, []):
+                if reply['id'] in visited:
+                    continue
+                visited.add(reply['id'])
+                child = {'tweet': reply, 'replies': []}
+                node['replies'].append(child)
+                stack.append((reply['id'], child))
+        return tree
@@ -0,0 +1,96 @@
+import hashlib
+import json
+import threading
+import time
+
+def snapshot_version(drafts):
+    content = json.dumps(drafts, sort_keys=True, default=str)
+    return hashlib.sha256(content.encode()).hexdigest()[:32]
+
+class DraftsCache:
+    """
+    Last good snapshot of the Airtable draft tweets, refreshed in the background.
+
+    Reads never wait on Airtable once a snapshot exists: a stale snapshot is served right
+    away while a refresh runs, and kept when Airtable fails. Records changed by this proxy
+    are patched into the snapshot so they show up before the next refresh.
+
+    version is a content hash of the snapshot, for conditional reads that skip serializing it.
+    """
+
+    def __init__(self, airtable_service, refresh_interval=60):
+        self.airtable_service = airtable_service
+        self.refresh_interval = refresh_interval
+        self.lock = threading.Lock()
+        self.refresh_lock = threading.Lock()
+        self.drafts = None
+        self.version = None
+        self.fetched_at = None
+        self.last_error = None
+        self.last_attempt_at = 0
+        self.refresh_thread = None
+
+    def refresh(self, only_if_empty=False):
+        with self.refresh_lock:
+            if only_if_empty and self.drafts is not None:
+                return True  # a refresh that was already running filled the snapshot
+            self.last_attempt_at = time.time()
+            try:
+                drafts = self.airtable_service.fetch_candidate_tweets()
+            except Exception as e:
+                print(f"Error refreshing drafts from Airtable: {e}")
+                with self.lock:
+                    self.last_error = str(e)
+                return False
+            version = snapshot_version(drafts)
+            with self.lock:
+                self.drafts = drafts
+                self.version = version
+                self.fetched_at = time.time()
+                self.last_error = None
+            return True
+
+    def refresh_in_background(self):
+        # One refresh at a time, and no more than one attempt per interval while Airtable is failing
+        if self.refresh_lock.locked() or time.time() - self.last_attempt_at < self.refresh_interval:
+            return
+        threading.Thread(target=self.refresh, daemon=True).start()
+
+    def get_drafts(self):
+        if self.drafts is None:
+            self.refresh(only_if_empty=True)  # nothing to serve yet, so the very first read waits
+
+        with self.lock:
+            drafts, fetched_at, last_error = self.drafts, self.fetched_at, self.last_error
+
+        snapshot_age = time.time() - fetched_at if fetched_at else None
+        stale = snapshot_age is None or snapshot_age > self.refresh_interval
+        if stale:
+            self.refresh_in_background()
+
+        return {
+            'drafts': drafts or [],
+            'snapshot_age': snapshot_age,
+            'stale': stale,
+            'refresh_error': last_error
+        }
+
+    def update_draft(self, record_id, fields):
+        """Merge fields written to a draft record into the snapshot without refetching it."""
+        with self.lock:
+            if self.drafts is None:
+                return
+            self.drafts = [
+                {'id': draft['id'], 'fields': {**draft['fields'], **fields}} if draft['id'] == record_id else draft
+                for draft in self.drafts
+            ]
+            self.version = snapshot_version(self.drafts)
+
+    def start(self):
+        def refresh_loop():
+            while True:
+                self.refresh()
+                time.sleep(self.refresh_interval)
+
+        self.refresh_thread = threading.Thread(target=refresh_loop, daemon=True)
+        self.refresh_thread.start()
@@ -0,0 +1,201 @@
+"""
+Client-selectable field projections for the read routes.
+
+A projection names the tweet fields, expansions and user fields a read needs. It is turned
+into the smallest X request that can fill it, and tweets and users are trimmed to the same
+keys on the way out, so a projected read also gets its answer from a cached full object.
+"""
+
+# What reads request by default, which is also the "full" preset
+TWEET_FIELDS = [
+    'author_id', 'note_tweet', 'public_metrics', 'referenced_tweets',
+    'conversation_id', 'created_at', 'attachments'
+]
+EXPANSIONS = [
+    'author_id', 'referenced_tweets.id', 'referenced_tweets.id.author_id',
+    'edit_history_tweet_ids', 'in_reply_to_user_id', 'attachments.media_keys',
+    'attachments.poll_ids', 'geo.place_id', 'entities.mentions.username'
+]
+USER_FIELDS = [
+    'created_at', 'description', 'entities', 'id', 'location',
+    'most_recent_tweet_id', 'name', 'pinned_tweet_id', 'profile_image_url',
+    'protected', 'public_metrics', 'url', 'username', 'verified',
+    'verified_type', 'withheld'
+]
+
+# X returns these whatever fields are requested
+DEFAULT_TWEET_KEYS = ['id', 'text', 'edit_history_tweet_ids']
+DEFAULT_USER_KEYS = ['id', 'name', 'username']
+
+# The tweet field each joined expansion needs: process_x_response joins through it
+EXPANSION_JOIN_FIELDS = {
+    'author_id': 'author_id',
+    'referenced_tweets.id': 'referenced_tweets',
+    'attachments.media_keys': 'attachments'
+}
+
+# Expanded tweets a user lookup can attach, each needing the user field of the same name
+USER_TWEET_EXPANSIONS = ['pinned_tweet_id', 'most_recent_tweet_id']
+
+def split_list(value):
+    return [item.strip() for item in value.split(',') if item.strip()]
+
+class Projection:
+    """A named set of tweet fields, expansions and user fields. Equal projections share coalesced reads."""
+
+    def __init__(self, name, tweet_fields=(), expansions=(), user_fields=()):
+        self.name = name
+        self.tweet_fields = list(dict.fromkeys(tweet_fields))
+        self.expansions = list(dict.fromkeys(expansions))
+        self.user_fields = list(dict.fromkeys(user_fields))
+        self.key = (tuple(sorted(self.tweet_fields)), tuple(sorted(self.expansions)), tuple(sorted(self.user_fields)))
+        self.tweet_keys = DEFAULT_TWEET_KEYS + [f for f in self.tweet_fields if f not in DEFAULT_TWEET_KEYS]
+        self.user_keys = DEFAULT_USER_KEYS + [f for f in self.user_fields if f not in DEFAULT_USER_KEYS]
+
+    def __eq__(self, other):
+        return isinstance(other, Projection) and self.key == other.key
+
+    def __hash__(self):
+        return hash(self.key)
+
+    def __repr__(self):
+        return f"Projection({self.name!r})"
+
+    def including(self, tweet_fields):
+        """This projection with extra tweet fields, for reads that need them internally."""
+        return Projection(self.name, self.tweet_fields + list(tweet_fields), self.expansions, self.user_fields)
+
+    def request_params(self):
+        """tweet_fields, expansions and user_fields for a tweepy tweet read. Empty lists are left out."""
+        tweet_fields = self.tweet_fields + [
+            EXPANSION_JOIN_FIELDS[expansion] for expansion in self.expansions if expansion in EXPANSION_JOIN_FIELDS
+        ]
+        return {
+            'tweet_fields': list(dict.fromkeys(tweet_fields)) or None,
+            'expansions': self.expansions or None,
+            # Only the author is kept from the expanded users
+            'user_fields': self.user_fields if 'author_id' in self.expansions and self.user_fields else None
+        }
+
+    def user_request_params(self):
+        """user_fields, expansions and tweet_fields for a tweepy user lookup."""
+        expansions = [expansion for expansion in USER_TWEET_EXPANSIONS if expansion in self.user_fields]
+        return {
+            'user_fields': self.user_fields or None,
+            'expansions': expansions or None,
+            'tweet_fields': self.tweet_fields if expansions and self.tweet_fields else None
+        }
+
+    def project_tweet(self, tweet):
+        """A new dict with only this projection's keys of a tweet shaped by process_x_response."""
+        if tweet is None:
+            return None
+        projected = {key: tweet[key] for key in self.tweet_keys if key in tweet}
+        if 'author_id' in self.expansions and 'author' in tweet:
+            projected['author'] = self.project_user(tweet['author'])
+        if 'referenced_tweets' in tweet:
+            # process_x_response appends the expanded tweets after the {type, id} references
+            references = []
+            for ref in tweet['referenced_tweets']:
+                if 'text' in ref:
+                    if 'referenced_tweets.id' in self.expansions:
+                        references.append(self.project_fields(ref))
+                elif 'referenced_tweets' in self.tweet_fields:
+                    references.append(ref)
+            if references:
+                projected['referenced_tweets'] = references
+            else:
+                projected.pop('referenced_tweets', None)
+        if 'attachments.media_keys' in self.expansions and 'media' in tweet:
+            projected['media'] = tweet['media']
+        return projected
+
+    def project_tweets(self, tweets):
+        if tweets is None:
+            return None
+        return [self.project_tweet(tweet) for tweet in tweets]
+
+    def project_fields(self, tweet):
+        return {key: tweet[key] for key in self.tweet_keys if key in tweet}
+
+    def project_user(self, user):
+        """A new dict with only this projection's keys of a user, plus expanded tweets it asked for."""
+        if user is None:
+            return None
+        projected = {key: user[key] for key in self.user_keys if key in user}
+        for expansion, key in (('pinned_tweet_id', 'pinned_tweet'), ('most_recent_tweet_id', 'most_recent_tweet')):
+            if expansion in self.user_fields and key in user:
+                projected[key] = self.project_fields(user[key])
+        return projected
+
+FULL = Projection('full', TWEET_FIELDS, EXPANSIONS, USER_FIELDS)
+
+PRESETS = {
+    # Ids and text only
+    'minimal': Projection('minimal'),
+    # What a timeline needs: author, timestamps, metrics and what a tweet replies to or quotes
+    'standard': Projection(
+        'standard',
+        tweet_fields=['author_id', 'conversation_id', 'created_at', 'public_metrics', 'referenced_tweets'],
+        expansions=['author_id'],
+        user_fields=['profile_image_url', 'verified']
+    ),
+    'full': FULL
+}
+
+def project_tweet(tweet, projection):
+    """The tweet trimmed to a projection, or unchanged without one."""
+    return projection.project_tweet(tweet) if projection else tweet
+
+def project_tweets(tweets, projection):
+    return projection.project_tweets(tweets) if projection else tweets
+
+def project_user(user, projection):
+    return projection.project_user(user) if projection else user
+
+def parse_projection(fields=None, expansions=None):
+    """
+    Projection for the fields= and expansions= query parameters, or None when they ask for the
+    default full read.
+
+    fields is a preset name or a comma-separated list of tweet fields, with user fields
+    prefixed "user.". Fields X always returns, such as text or user.name, are accepted and left
+    out of the request. expansions is a preset name or a comma-separated list and replaces the
+    expansions of the fields preset; a custom field list expands the author only when it asks
+    for user fields. Raises ValueError for unknown names.
+    """
+    if not fields and not expansions:
+        return None
+
+    if not fields or fields in PRESETS:
+        base = PRESETS[fields or 'full']
+        name, tweet_fields, user_fields, default_expansions = base.name, base.tweet_fields, base.user_fields, base.expansions
+    else:
+        name, tweet_fields, user_fields = 'custom', [], []
+        for field in split_list(fields):
+            if field.startswith('user.'):
+                user_fields.append(field[len('user.'):])
+            else:
+                tweet_fields.append(field)
+        default_expansions = ['author_id'] if user_fields else []
+
+    if expansions:
+        name = 'custom'
+        expansions = PRESETS[expansions].expansions if expansions in PRESETS else split_list(expansions)
+    else:
+        expansions = default_expansions
+
+    if name == 'full':
+        return None  # The default request and response
+    tweet_field_names = DEFAULT_TWEET_KEYS + TWEET_FIELDS
+    user_field_names = USER_FIELDS + [key for key in DEFAULT_USER_KEYS if key not in USER_FIELDS]
+    for kind, values, allowed in (('tweet field', tweet_fields, tweet_field_names), ('expansion', expansions, EXPANSIONS),
+                                  ('user field', user_fields, user_field_names)):
+        unknown = [value for value in values if value not in allowed]
+        if unknown:
+            raise ValueError(f"Unknown {kind} '{unknown[0]}'. Allowed: {', '.join(allowed)} or a preset: {', '.join(PRESETS)}")
+
+    # Always returned, so asking X for them only lengthens the request
+    tweet_fields = [field for field in tweet_fields if field not in DEFAULT_TWEET_KEYS]
+    user_fields = [field for field in user_fields if field not in DEFAULT_USER_KEYS]
+    return Projection(name, tweet_fields, expansions, user_fields)
@@ -0,0 +1,46 @@
+from .object_cache import ObjectCache
+from .singleflight import SingleFlight
+
+class IdempotencyKeyReused(Exception):
+    """An idempotency key was sent again with a different request."""
+
+class IdempotencyStore:
+    """
+    Runs an operation at most once per idempotency key within ttl seconds.
+
+    The first successful result is kept in a bounded TTL cache and replayed for later calls
+    with the same key; concurrent calls with the same key wait for the attempt in flight.
+    Failures are not stored, so a retry after an error runs the operation again.
+
+    Results are stored with a fingerprint of the request that produced them. A later call
+    with the same key and a different fingerprint is refused rather than given a result
+    that does not belong to it.
+    """
+
+    def __init__(self, ttl=24 * 3600, max_entries=10000):
+        self.results = ObjectCache(ttls={'result': ttl}, max_entries=max_entries)
+        self.singleflight = SingleFlight()
+
+    def run(self, key, func, fingerprint=None):
+        """Returns (result, replayed). Raises IdempotencyKeyReused when the key ran with another fingerprint."""
+        executed = False
+
+        def run_once():
+            nonlocal executed
+            # Checked again inside the flight, in case the previous attempt finished since the caller looked
+            entry = self.results.get('result', key)
+            if entry is None:
+                executed = True
+                entry = (fingerprint, func())
+                if entry[1] is not None:
+                    self.results.set('result', key, entry)
+            return entry
+
+        entry = self.results.get('result', key)
+        if entry is None:
+            # Concurrent calls share the attempt in flight, so they are checked against its fingerprint too
+            entry = self.singleflight.do(key, run_once)
+        stored_fingerprint, result = entry
+        if stored_fingerprint != fingerprint:
+            raise IdempotencyKeyReused("The idempotency key was already used for a different request")
+        return result, not executed
@@ -1,27 +1,184 @@
+import hashlib
+import mimetypes
 import requests
 import tempfile
 import os
+import threading
+import time
+from concurrent.futures import Future
+from urllib.parse import urlparse
+from config import Config
+from .media_status_poller import MediaStatusPoller
+from .object_cache import ObjectCache
+from .request_timing import ContextThreadPoolExecutor
+
+DEFAULT_MEDIA_EXPIRY = 24 * 3600  # X keeps uploaded media usable for about a day
+MEDIA_EXPIRY_MARGIN = 15 * 60  # stop reusing a media id well before X expires it
+MAX_MEDIA_PER_TWEET = 4
+MAX_SIMPLE_UPLOAD_BYTES = 5 * 1024 * 1024  # larger media must use the chunked upload
+MAX_CHUNK_BYTES = 5 * 1024 * 1024
+MAX_CHUNKS = 1000
 
 class MediaService:
     def __init__(self, oauth1_api):
         self.api = oauth1_api
+        # Uploaded media ids by URL hash and by content hash, each living as long as X keeps the media
+        self.media_id_cache = ObjectCache(ttls={}, max_entries=Config.MEDIA_ID_CACHE_MAX_ENTRIES)
+        # Downloads, INIT and FINALIZE run on one pool and APPENDs on another, so an upload never waits on its own pool
+        self.upload_executor = ContextThreadPoolExecutor(max_workers=Config.UPSTREAM_MAX_WORKERS)
+        self.append_executor = ContextThreadPoolExecutor(max_workers=Config.MEDIA_UPLOAD_CONCURRENCY)
+        self.status_poller = MediaStatusPoller(self.get_upload_status, timeout=Config.MEDIA_PROCESSING_TIMEOUT)
+
+    def get_media_id(self, media_url):
+        return self.start_media_upload(media_url).result()
+
+    def start_media_upload(self, media_url):
+        """
+        Start getting media_url onto X in the background. Returns a Future for the media id, set
+        once the media can be attached to a tweet, or to None when the download fails and the
+        media is skipped. Upload and processing errors are raised from the Future, so the post
+        that asked for the media fails instead of going out without it.
+        """
+        media_future = Future()
+
+        def upload():
+            try:
+                self.upload_from_url(media_url, media_future)
+            except Exception as e:
+                print(f"Error uploading media: {e}")
+                media_future.set_exception(e)
+
+        self.upload_executor.submit(upload)
+        return media_future
+
+    def upload_from_url(self, media_url, media_future):
+        # Neither transfer happens when the URL or the downloaded content was uploaded within X's expiry window
+        url_key = ('media_url', hashlib.sha256(media_url.encode()).hexdigest())
+        media = self.media_id_cache.get(*url_key)
+        if media:
+            media_future.set_result(media['media_id'])
+            return
+
+        download = self.download_media(media_url)
+        if not download:
+            media_future.set_result(None)
+            return
+        media_file, content_hash, media_type = download
+
+        content_key = ('media_content', content_hash)
+        with media_file:
+            media = self.media_id_cache.get(*content_key)
+            if media:
+                self.media_ready(media, [url_key], media_future)
+                return
+            uploaded = self.upload_media(media_file, self._get_filename(media_url), media_type)
+
+        expires_after = getattr(uploaded, 'expires_after_secs', None) or DEFAULT_MEDIA_EXPIRY
+        media = {
+            'media_id': str(uploaded.media_id),
+            'expires_at': time.time() + expires_after - MEDIA_EXPIRY_MARGIN
+        }
+        processing_info = getattr(uploaded, 'processing_info', None)
+        if not processing_info or processing_info.get('state') == 'succeeded':
+            self.media_ready(media, [url_key, content_key], media_future)
+            return
+
+        def on_processed(error):
+            if error:
+                print(f"Error processing media: {error}")
+                media_future.set_exception(error)
+            else:
+                self.media_ready(media, [url_key, content_key], media_future)
 
-    def upload_media(self, media_file):
-        upload_response = self.api.media_upload(filename=media_file)
-        return upload_response.media_id
+        self.status_poller.watch(media['media_id'], processing_info, on_processed)
+
+    def media_ready(self, media, cache_keys, media_future):
+        for cache_key in cache_keys:
+            # Entries expire together with the media on X, however late they were added
+            self.media_id_cache.set(*cache_key, media, ttl=media['expires_at'] - time.time())
+        media_future.set_result(media['media_id'])
+
+    def upload_media(self, media_file, filename, media_type=None):
+        """Upload an open file, chunked for videos, GIFs and anything over the simple upload limit."""
+        media_file.seek(0, os.SEEK_END)
+        size = media_file.tell()
+        media_file.seek(0)
+
+        if not media_type or media_type == 'application/octet-stream':
+            media_type = mimetypes.guess_type(filename)[0] or ''
+        if media_type.startswith('video/') or media_type == 'image/gif' or size > MAX_SIMPLE_UPLOAD_BYTES:
+            return self.chunked_upload(media_file, filename, media_type, size)
+        return self.api.simple_upload(filename=filename, file=media_file)
+
+    def chunked_upload(self, media_file, filename, media_type, size):
+        """INIT, then up to MEDIA_UPLOAD_CONCURRENCY APPENDs in flight at once, then FINALIZE."""
+        if media_type == 'image/gif':
+            media_category = 'tweet_gif'
+        elif media_type.startswith('video/'):
+            media_category = 'tweet_video'
+        else:
+            media_category = 'tweet_image'
+        media_id = self.api.chunked_upload_init(size, media_type, media_category=media_category).media_id
+
+        # X accepts at most 1000 segments of at most 5 MB each
+        chunk_size = min(max(Config.MEDIA_CHUNK_SIZE, -(-size // MAX_CHUNKS)), MAX_CHUNK_BYTES)
+        in_flight = threading.BoundedSemaphore(Config.MEDIA_UPLOAD_CONCURRENCY)
+        appends = []
+        segment_index = 0
+        while True:
+            chunk = media_file.read(chunk_size)
+            if not chunk:
+                break
+            # Bounds both the concurrent APPENDs and the chunks held in memory
+            in_flight.acquire()
+            append = self.append_executor.submit(
+                self.api.chunked_upload_append, media_id, (filename, chunk), segment_index
+            )
+            append.add_done_callback(lambda _: in_flight.release())
+            appends.append(append)
+            segment_index += 1
+
+        for append in appends:
+            append.result()
+        return self.api.chunked_upload_finalize(media_id)
+
+    def get_upload_status(self, media_id):
+        return self.api.get_media_upload_status(media_id)
 
     def download_media(self, media_url):
+        """
+        Stream media_url into a spooled temp file that only spills to disk past MEDIA_SPOOL_MAX_BYTES.
+        Returns (file rewound to the start, sha256 of the content, content type), or None when the download fails.
+        """
+        deadline = time.monotonic() + Config.MEDIA_DOWNLOAD_TIMEOUT
+        media_file = tempfile.SpooledTemporaryFile(max_size=Config.MEDIA_SPOOL_MAX_BYTES)
         try:
-            response = requests.get(media_url, stream=True)
-            response.raise_for_status()
-
-            with tempfile.NamedTemporaryFile(delete=False, suffix=self._get_file_extension(media_url)) as temp_file:
-                for chunk in response.iter_content(chunk_size=8192):
-                    temp_file.write(chunk)
-                return temp_file.name
-        except requests.RequestException as e:
+            with requests.get(media_url, stream=True, timeout=Config.MEDIA_DOWNLOAD_TIMEOUT) as response:
+                response.raise_for_status()
+
+                content_length = int(response.headers.get('Content-Length') or 0)
+                if content_length > Config.MEDIA_MAX_BYTES:
+                    raise ValueError(f"Media is {content_length} bytes, the limit is {Config.MEDIA_MAX_BYTES}")
+
+                content_hash = hashlib.sha256()
+                size = 0
+                for chunk in response.iter_content(chunk_size=64 * 1024):
+                    size += len(chunk)
+                    if size > Config.MEDIA_MAX_BYTES:
+                        raise ValueError(f"Media exceeds the limit of {Config.MEDIA_MAX_BYTES} bytes")
+                    if time.monotonic() > deadline:
+                        raise TimeoutError(f"Media download took longer than {Config.MEDIA_DOWNLOAD_TIMEOUT} seconds")
+                    content_hash.update(chunk)
+                    media_file.write(chunk)
+                content_type = response.headers.get('Content-Type', '').split(';')[0].strip()
+
+            media_file.seek(0)
+            return media_file, content_hash.hexdigest(), content_type
+        except (requests.RequestException, ValueError, TimeoutError) as e:
+            media_file.close()
             print(f"Error downloading media: {e}")
             return None
 
-    def _get_file_extension(self, url):
-        return os.path.splitext(url)[1]
\ No newline at end of file
+    def _get_filename(self, url):
+        # The media type comes from the download's Content-Type, falling back to the file extension
+        return os.path.basename(urlparse(url).path) or 'media'
@@ -0,0 +1,60 @@
+import heapq
+import itertools
+import threading
+import time
+
+class MediaStatusPoller:
+    """
+    Polls X for the processing state of uploaded videos and GIFs from one background thread,
+    so media waiting on processing never parks a thread of its own in time.sleep.
+
+    watch() calls on_done(None) once the media can be attached to a tweet, or on_done(error)
+    when processing fails, the status check fails or timeout seconds pass.
+    """
+
+    def __init__(self, get_status, timeout=300):
+        self.get_status = get_status
+        self.timeout = timeout
+        self.pending = []  # heap of (due, seq, media_id, deadline, on_done)
+        self.sequence = itertools.count()
+        self.condition = threading.Condition()
+        self.poll_thread = None
+
+    def watch(self, media_id, processing_info, on_done):
+        with self.condition:
+            if self.poll_thread is None:
+                self.poll_thread = threading.Thread(target=self.poll_loop, daemon=True)
+                self.poll_thread.start()
+        self.schedule(media_id, processing_info, time.monotonic() + self.timeout, on_done)
+
+    def schedule(self, media_id, processing_info, deadline, on_done):
+        due = time.monotonic() + processing_info.get('check_after_secs', 1)
+        with self.condition:
+            heapq.heappush(self.pending, (due, next(self.sequence), media_id, deadline, on_done))
+            self.condition.notify()
+
+    def poll_loop(self):
+        while True:
+            with self.condition:
+                while not self.pending or self.pending[0][0] > time.monotonic():
+                    self.condition.wait(self.pending[0][0] - time.monotonic() if self.pending else None)
+                _, _, media_id, deadline, on_done = heapq.heappop(self.pending)
+            self.poll(media_id, deadline, on_done)
+
+    def poll(self, media_id, deadline, on_done):
+        try:
+            processing_info = getattr(self.get_status(media_id), 'processing_info', None) or {'state': 'succeeded'}
+        except Exception as e:
+            on_done(e)
+            return
+
+        state = processing_info.get('state')
+        if state == 'succeeded':
+            on_done(None)
+        elif state == 'failed':
+            message = processing_info.get('error', {}).get('message', 'unknown error')
+            on_done(RuntimeError(f"Processing of media {media_id} failed: {message}"))
+        elif time.monotonic() > deadline:
+            on_done(TimeoutError(f"Media {media_id} was still processing after {self.timeout} seconds"))
+        else:
+            self.schedule(media_id, processing_info, deadline, on_done)
@@ -0,0 +1,143 @@
+import hashlib
+import json
+import os
+import threading
+import time
+from tweepy.errors import BadRequest
+from .rate_limit_handler import RateLimitExceeded
+
+class MentionsIngester:
+    """
+    Polls mentions in the background from a persisted since_id checkpoint and keeps the
+    most recent ones in a bounded local store, so reads never call X.
+
+    A backlog longer than max_pages is drained over several syncs: the checkpoint only moves
+    once X has no older pages left, and the pagination token in between is persisted too.
+    """
+
+    def __init__(self, tweet_service, store_path, poll_interval=60, max_stored=1000, max_pages=10):
+        self.tweet_service = tweet_service
+        self.store_path = store_path
+        self.poll_interval = poll_interval
+        self.max_stored = max_stored
+        self.max_pages = max_pages
+        self.lock = threading.Lock()
+        self.sync_lock = threading.Lock()
+        self.since_id = None
+        self.pagination_token = None  # set while a backlog is being drained
+        self.mentions = []  # newest first
+        self.version = None  # changes whenever the stored mentions do
+        self.last_synced_at = None
+        self.ingest_thread = None
+        self.load()
+
+    def load(self):
+        if not os.path.exists(self.store_path):
+            return
+        try:
+            with open(self.store_path, 'r') as f:
+                store = json.load(f)
+            self.since_id = store.get('since_id')
+            self.pagination_token = store.get('pagination_token')
+            self.mentions = store.get('mentions', [])[:self.max_stored]
+            self.version = self.get_version(self.mentions)
+            print(f"Loaded {len(self.mentions)} stored mentions from file.")
+        except (OSError, ValueError) as e:
+            print(f"Error loading mentions store: {e}")
+
+    def save(self):
+        with self.lock:
+            store = {'since_id': self.since_id, 'pagination_token': self.pagination_token, 'mentions': self.mentions}
+        temp_path = f"{self.store_path}.tmp"
+        with open(temp_path, 'w') as f:
+            json.dump(store, f)
+        os.replace(temp_path, self.store_path)
+
+    def sync(self):
+        with self.sync_lock:
+            new_mentions = []
+            # Resumes a backlog the previous sync left unfinished
+            pagination_token = self.pagination_token
+            caught_up = False
+            # With a since_id X pages back only as far as the checkpoint, so this ends once caught up
+            for _ in range(self.max_pages):
+                try:
+                    page, meta = self.tweet_service.get_mentions_page(
+                        since_id=self.since_id,
+                        pagination_token=pagination_token
+                    )
+                except BadRequest:
+                    if not pagination_token:
+                        raise
+                    # An expired token: page again from the checkpoint, stored mentions are deduplicated
+                    print("Mentions pagination token rejected, paging again from the checkpoint.")
+                    pagination_token = None
+                    continue
+                new_mentions.extend(page)
+                pagination_token = meta.get('next_token')
+                if not pagination_token:
+                    caught_up = True
+                    break
+
+            checkpoint = (self.since_id, self.pagination_token)
+            if new_mentions:
+                self.add_mentions(new_mentions)
+            # Older pages left unfetched keep the checkpoint where it is, or they would never be fetched
+            self.pagination_token = pagination_token
+            if caught_up and self.mentions:
+                self.since_id = self.mentions[0]['id']
+            if new_mentions or (self.since_id, self.pagination_token) != checkpoint:
+                self.save()
+            self.last_synced_at = time.time()
+            return len(new_mentions)
+
+    def add_mentions(self, new_mentions):
+        with self.lock:
+            mentions_by_id = {mention['id']: mention for mention in self.mentions}
+            mentions_by_id.update((mention['id'], mention) for mention in new_mentions)
+            self.mentions = sorted(mentions_by_id.values(), key=lambda m: int(m['id']), reverse=True)[:self.max_stored]
+            self.version = self.get_version(self.mentions)
+
+    @staticmethod
+    def get_version(mentions):
+        ids = ','.join(str(mention['id']) for mention in mentions)
+        return hashlib.sha256(ids.encode()).hexdigest()[:32]
+
+    def get_mentions(self, since=None, limit=10):
+        """
+        Mentions newest first. Without since, the latest `limit` mentions; with since, the
+        `limit` mentions directly after that id, so a client can advance its cursor without gaps.
+        """
+        if self.last_synced_at is None:
+            self.sync()
+
+        with self.lock:
+            mentions = self.mentions
+        if since:
+            mentions = [mention for mention in mentions if int(mention['id']) > int(since)]
+            page = mentions[-limit:]
+        else:
+            page = mentions[:limit]
+
+        return {
+            'mentions': page,
+            'newest_id': page[0]['id'] if page else since,
+            'has_more': len(page) < len(mentions),
+            'synced_at': self.last_synced_at
+        }
+
+    def start(self):
+        def ingest_loop():
+            while True:
+                sleep_time = self.poll_interval
+                try:
+                    self.sync()
+                except RateLimitExceeded as e:
+                    sleep_time = max(int(e.retry_after), self.poll_interval)
+                    print(f"Mentions ingestion rate limited, retrying in {sleep_time} seconds.")
+                except Exception as e:
+                    print(f"Error ingesting mentions: {e}")
+                time.sleep(sleep_time)
+
+        self.ingest_thread = threading.Thread(target=ingest_loop, daemon=True)
+        self.ingest_thread.start()
@@ -0,0 +1,140 @@
+from bisect import bisect_left
+from contextlib import contextmanager
+import threading
+import time
+from .request_timing import span
+
+# Upper bounds of the latency histogram buckets, in seconds
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30)
+
+def escape_label_value(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+def format_labels(labels):
+    if not labels:
+        return ''
+    return '{' + ','.join(f'{name}="{escape_label_value(value)}"' for name, value in labels) + '}'
+
+def format_value(value):
+    if value == float('inf'):
+        return '+Inf'
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+class MetricsRegistry:
+    """
+    In-process counters and latency histograms, rendered in the Prometheus text format.
+
+    Recording is a dict update under one lock, so it is cheap enough for every request and
+    upstream call. Values that services already track (cache stats, queue sizes, rate limit
+    budgets) are not copied in here; collectors read them when /metrics is scraped.
+    """
+
+    def __init__(self, buckets=LATENCY_BUCKETS):
+        self.buckets = buckets
+        self.lock = threading.Lock()
+        self.help = {}
+        self.counters = {}
+        self.histograms = {}
+
+    def describe(self, name, metric_type, help_text):
+        self.help[name] = (metric_type, help_text)
+
+    def inc(self, name, labels=(), value=1):
+        key = (name, tuple(labels))
+        with self.lock:
+            self.counters[key] = self.counters.get(key, 0) + value
+
+    def observe(self, name, value, labels=()):
+        key = (name, tuple(labels))
+        index = bisect_left(self.buckets, value)
+        with self.lock:
+            histogram = self.histograms.get(key)
+            if histogram is None:
+                histogram = self.histograms[key] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+            histogram[0][index] += 1
+            histogram[1] += value
+            histogram[2] += 1
+
+    @contextmanager
+    def time_upstream(self, service, endpoint):
+        """Count and time one upstream call, labelled with its outcome. Also a span of the current request."""
+        started = time.perf_counter()
+        outcome = 'error'
+        try:
+            with span(service, endpoint):
+                yield
+            outcome = 'ok'
+        except Exception as e:
+            response = getattr(e, 'response', None)
+            outcome = str(getattr(response, 'status_code', None) or getattr(response, 'status', None) or 'error')
+            raise
+        finally:
+            labels = (('service', service), ('endpoint', endpoint))
+            self.observe('xproxy_upstream_request_duration_seconds', time.perf_counter() - started, labels)
+            self.inc('xproxy_upstream_requests_total', labels + (('outcome', outcome),))
+
+    def render(self, samples=()):
+        """
+        Prometheus text exposition of everything recorded, plus samples given as
+        (name, labels, value) tuples, e.g. gauges read from the services at scrape time.
+        """
+        with self.lock:
+            counters = sorted(self.counters.items())
+            histograms = sorted((key, (list(counts), total, count)) for key, (counts, total, count) in self.histograms.items())
+
+        lines_by_name = {}
+        for (name, labels), value in counters:
+            lines_by_name.setdefault(name, []).append(f'{name}{format_labels(labels)} {format_value(value)}')
+        for (name, labels), (counts, total, count) in histograms:
+            lines = lines_by_name.setdefault(name, [])
+            cumulative = 0
+            for bound, bucket_count in zip(self.buckets + (float('inf'),), counts):
+                cumulative += bucket_count
+                bucket_labels = labels + (('le', format_value(bound)),)
+                lines.append(f'{name}_bucket{format_labels(bucket_labels)} {cumulative}')
+            lines.append(f'{name}_sum{format_labels(labels)} {format_value(total)}')
+            lines.append(f'{name}_count{format_labels(labels)} {count}')
+        for name, labels, value in samples:
+            if value is not None:
+                lines_by_name.setdefault(name, []).append(f'{name}{format_labels(labels)} {format_value(value)}')
+
+        output = []
+        for name, lines in lines_by_name.items():
+            if name in self.help:
+                metric_type, help_text = self.help[name]
+                output.append(f'# HELP {name} {help_text}')
+                output.append(f'# TYPE {name} {metric_type}')
+            output.extend(lines)
+        return '\n'.join(output) + '\n'
+
+# The registry every service records into
+metrics = MetricsRegistry()
+
+metrics.describe('xproxy_http_request_duration_seconds', 'histogram', 'Time spent serving API requests, by route.')
+metrics.describe('xproxy_http_requests_total', 'counter', 'API requests served, by route and status code.')
+metrics.describe('xproxy_upstream_request_duration_seconds', 'histogram', 'Latency of calls to X and Airtable, by endpoint.')
+metrics.describe('xproxy_upstream_requests_total', 'counter', 'Calls to X and Airtable, by endpoint and outcome.')
+metrics.describe('xproxy_rate_limit_retries_total', 'counter', 'Retries after a 429, by service method.')
+metrics.describe('xproxy_rate_limit_sleep_seconds_total', 'counter', 'Seconds slept backing off from 429s, by service method.')
+metrics.describe('xproxy_rate_limit_exhausted_total', 'counter', 'Calls that gave up with RateLimitExceeded, by service method.')
+metrics.describe('xproxy_rate_limit_rejections_total', 'counter', 'Calls rejected locally because the endpoint budget is exhausted.')
+metrics.describe('xproxy_rate_limit_remaining', 'gauge', 'Requests left in the current X rate limit window, by endpoint.')
+metrics.describe('xproxy_rate_limit_limit', 'gauge', 'Size of the X rate limit window, by endpoint.')
+metrics.describe('xproxy_rate_limit_reset_seconds', 'gauge', 'Seconds until the X rate limit window resets, by endpoint.')
+metrics.describe('xproxy_token_refreshes_total', 'counter', 'OAuth2 token refresh attempts, by outcome.')
+metrics.describe('xproxy_token_expires_in_seconds', 'gauge', 'Seconds until the current OAuth2 access token expires.')
+metrics.describe('xproxy_cache_entries', 'gauge', 'Entries held by each in-process cache.')
+metrics.describe('xproxy_cache_hits_total', 'counter', 'Cache lookups that found a live entry.')
+metrics.describe('xproxy_cache_misses_total', 'counter', 'Cache lookups that found nothing or an expired entry.')
+metrics.describe('xproxy_cache_evictions_total', 'counter', 'Entries evicted to stay within the cache size.')
+metrics.describe('xproxy_cache_hit_ratio', 'gauge', 'Share of cache lookups that were hits.')
+metrics.describe('xproxy_coalesced_calls_total', 'counter', 'Calls that went through request coalescing.')
+metrics.describe('xproxy_coalesced_saved_calls_total', 'counter', 'Calls that shared the result of an identical call in flight.')
+metrics.describe('xproxy_coalesced_in_flight', 'gauge', 'Coalesced calls currently in flight.')
+metrics.describe('xproxy_prefetch_hits_total', 'counter', 'Timeline pages served from a prefetch.')
+metrics.describe('xproxy_prefetch_misses_total', 'counter', 'Timeline pages that had to be fetched live.')
+metrics.describe('xproxy_drafts_snapshot_age_seconds', 'gauge', 'Age of the Airtable drafts snapshot.')
+metrics.describe('xproxy_airtable_writes', 'gauge', 'Queued Airtable write-backs, by status.')
+metrics.describe('xproxy_write_jobs', 'gauge', 'Write jobs, by status.')
+metrics.describe('xproxy_compressed_responses_total', 'counter', 'Responses sent compressed, by content coding.')
+metrics.describe('xproxy_compression_saved_bytes_total', 'counter', 'Response bytes saved by compression, by content coding.')
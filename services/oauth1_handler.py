@@ -1,17 +1,29 @@
 import tweepy
+from services.metrics import metrics
+from services.oauth2_handler import X_API_URL, XApiSession
+
+class MeteredAPI(tweepy.API):
+    """tweepy.API (v1.1, used for media uploads) that records every call in the metrics registry."""
+
+    def request(self, method, endpoint, *args, **kwargs):
+        with metrics.time_upstream('x', f"{method} /1.1/{endpoint}"):
+            return super().request(method, endpoint, *args, **kwargs)
 
 class OAuth1Handler:
-    def __init__(self, consumer_key, consumer_secret, access_token, access_token_secret):
+    def __init__(self, consumer_key, consumer_secret, access_token, access_token_secret, api_base_url=X_API_URL):
         self.consumer_key = consumer_key
         self.consumer_secret = consumer_secret
         self.access_token = access_token
         self.access_token_secret = access_token_secret
+        self.api_base_url = api_base_url
         self.api = None
 
     def initialize(self):
         auth = tweepy.OAuthHandler(self.consumer_key, self.consumer_secret)
         auth.set_access_token(self.access_token, self.access_token_secret)
-        self.api = tweepy.API(auth)
+        self.api = MeteredAPI(auth)
+        if self.api_base_url != X_API_URL:
+            self.api.session = XApiSession(self.api_base_url)
 
     def validate_credentials(self):
         try:
@@ -1,9 +1,42 @@
 import tweepy
 import json
+import requests
+from requests.adapters import HTTPAdapter
 import os
 import time
 import webbrowser
 import threading
+from services.metrics import metrics
+from services.request_timing import timed
+from services.rate_limit_handler import RateLimitedClient, RateLimitTracker
+
+X_API_URL = 'https://api.twitter.com'  # the host tweepy hard-codes for API v2
+X_UPLOAD_API_URL = 'https://upload.twitter.com'  # the host tweepy hard-codes for v1.1 media uploads
+HTTP_POOL_CONNECTIONS = 4  # distinct hosts kept alive (api.twitter.com, upload.twitter.com, ...)
+HTTP_POOL_MAXSIZE = 32  # concurrent keep-alive connections per host
+TOKEN_REFRESH_MARGIN = 600  # seconds before expiry a token is refreshed
+
+class XApiSession(requests.Session):
+    """requests.Session that can send tweepy's X API (and media upload) requests to another base URL, e.g. a local stub."""
+
+    def __init__(self, base_url=X_API_URL):
+        super().__init__()
+        self.base_url = base_url.rstrip('/')
+
+    def request(self, method, url, *args, **kwargs):
+        if self.base_url != X_API_URL:
+            for x_url in (X_API_URL, X_UPLOAD_API_URL):
+                if url.startswith(x_url):
+                    url = self.base_url + url[len(x_url):]
+                    break
+        return super().request(method, url, *args, **kwargs)
+
+def build_http_session(pool_connections=HTTP_POOL_CONNECTIONS, pool_maxsize=HTTP_POOL_MAXSIZE, base_url=X_API_URL):
+    session = XApiSession(base_url)
+    adapter = HTTPAdapter(pool_connections=pool_connections, pool_maxsize=pool_maxsize)
+    session.mount('https://', adapter)
+    session.mount('http://', adapter)
+    return session
 
 class MyOAuth2UserHandler(tweepy.OAuth2UserHandler):
     def refresh_token(self, refresh_token):
@@ -15,14 +48,20 @@ class MyOAuth2UserHandler(tweepy.OAuth2UserHandler):
         return new_token
 
 class OAuth2Handler:
-    def __init__(self, client_id, client_secret, redirect_uri):
+    def __init__(self, client_id, client_secret, redirect_uri, api_base_url=X_API_URL):
         self.client_id = client_id
         self.client_secret = client_secret
         self.redirect_uri = redirect_uri
+        self.api_base_url = api_base_url
         self.oauth2_token = None
         self.setup_oauth2_handler()
         self.refresh_lock = threading.Lock()
         self.refresh_thread = None
+        self.rate_limit_tracker = RateLimitTracker()
+        # One keep-alive session shared by every client, so connections survive token rotation
+        self.session = build_http_session(base_url=api_base_url)
+        self.client = None
+        self.client_lock = threading.Lock()
 
     def setup_oauth2_handler(self):
         # os.environ['OAUTHLIB_INSECURE_TRANSPORT'] = '1'  # Allow OAuth2 over HTTP for development
@@ -76,12 +115,20 @@ class OAuth2Handler:
                 self.oauth2_token.update(new_token)
                 self.oauth2_token['expires_at'] = time.time() + new_token['expires_in'] - 300
                 self.save_oauth2_token()
+                self.client = self.build_client(self.oauth2_token['access_token'])
                 print("OAuth2 token has been successfully refreshed and updated.")
+                metrics.inc('xproxy_token_refreshes_total', (('outcome', 'success'),))
                 return True
             except Exception as e:
                 print(f"Error refreshing token: {e}")
+                metrics.inc('xproxy_token_refreshes_total', (('outcome', 'failure'),))
                 return False
 
+    def token_needs_refresh(self):
+        """Whether ensure_oauth2_token has work to do, which means blocking HTTP calls and maybe a prompt."""
+        return not self.oauth2_token or self.oauth2_token.get('expires_at', 0) - time.time() < TOKEN_REFRESH_MARGIN
+
+    @timed('oauth_token')
     def ensure_oauth2_token(self):
         if not self.oauth2_token:
             if not self.load_oauth2_token():
@@ -90,7 +137,7 @@ class OAuth2Handler:
                 return
 
         current_time = time.time()
-        if self.oauth2_token.get('expires_at', 0) - current_time < 600:  # Less than 10 minutes until expiry
+        if self.oauth2_token.get('expires_at', 0) - current_time < TOKEN_REFRESH_MARGIN:
             print("Token close to expiry, attempting to refresh...")
             if not self.refresh_token():
                 print("Token refresh failed. Running initial OAuth2 setup again.")
@@ -101,12 +148,26 @@ class OAuth2Handler:
             while True:
                 self.ensure_oauth2_token()
                 time_to_expiry = self.oauth2_token.get('expires_at', 0) - time.time()
-                sleep_time = min(time_to_expiry - 600, 3600)  # Sleep until 10 mins before expiry or for 1 hour, whichever is shorter
+                sleep_time = min(time_to_expiry - TOKEN_REFRESH_MARGIN, 3600)  # Sleep until 10 mins before expiry or for 1 hour, whichever is shorter
                 time.sleep(max(sleep_time, 60))  # Ensure we sleep for at least 1 minute
 
         self.refresh_thread = threading.Thread(target=refresh_loop, daemon=True)
         self.refresh_thread.start()
 
+    def build_client(self, access_token):
+        return RateLimitedClient(
+            access_token,
+            rate_limit_tracker=self.rate_limit_tracker,
+            session=self.session
+        )
+
     def get_client(self):
         self.ensure_oauth2_token()
-        return tweepy.Client(self.oauth2_token['access_token'])
\ No newline at end of file
+        access_token = self.oauth2_token['access_token']
+        client = self.client
+        if client is None or client.bearer_token != access_token:
+            with self.client_lock:
+                if self.client is None or self.client.bearer_token != access_token:
+                    self.client = self.build_client(access_token)
+                client = self.client
+        return client
\ No newline at end of file
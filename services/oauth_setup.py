@@ -1,19 +1,22 @@
 from services.oauth2_handler import OAuth2Handler
 from services.oauth1_handler import OAuth1Handler
 import sys
+import time
 
 def initialize_oauth_handlers(config):
     oauth2_handler = OAuth2Handler(
         client_id=config['CLIENT_ID'],
         client_secret=config['CLIENT_SECRET'],
-        redirect_uri=config['REDIRECT_URI']
+        redirect_uri=config['REDIRECT_URI'],
+        api_base_url=config['X_API_BASE_URL']
     )
 
     oauth1_handler = OAuth1Handler(
         consumer_key=config['CONSUMER_KEY'],
         consumer_secret=config['CONSUMER_SECRET'],
         access_token=config['ACCESS_TOKEN'],
-        access_token_secret=config['ACCESS_TOKEN_SECRET']
+        access_token_secret=config['ACCESS_TOKEN_SECRET'],
+        api_base_url=config['X_API_BASE_URL']
     )
 
     return oauth2_handler, oauth1_handler
@@ -37,4 +40,15 @@ def validate_oauth(oauth2_handler, oauth1_handler):
 def setup_and_validate_oauth(config):
     oauth2_handler, oauth1_handler = initialize_oauth_handlers(config)
     validate_oauth(oauth2_handler, oauth1_handler)
-    return oauth2_handler, oauth1_handler
\ No newline at end of file
+    return oauth2_handler, oauth1_handler
+
+def setup_offline_oauth(config):
+    """Handlers for offline mode: a placeholder OAuth2 token and no validation, for use against the local stub."""
+    oauth2_handler, oauth1_handler = initialize_oauth_handlers(config)
+    oauth2_handler.oauth2_token = {
+        'access_token': 'offline-access-token',
+        'refresh_token': 'offline-refresh-token',
+        'expires_at': time.time() + 365 * 24 * 3600
+    }
+    oauth1_handler.initialize()
+    return oauth2_handler, oauth1_handler
@@ -0,0 +1,70 @@
+from collections import OrderedDict
+import threading
+import time
+
+class ObjectCache:
+    """
+    Bounded in-process LRU cache for X objects with a TTL per object type.
+
+    Keys are (object_type, key) pairs, e.g. ('tweet', '123') or ('username', 'jack').
+    Cached values are shared between callers and must not be mutated.
+    """
+
+    def __init__(self, ttls, max_entries=1000):
+        self.ttls = ttls
+        self.max_entries = max_entries
+        self.entries = OrderedDict()
+        self.lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, object_type, key):
+        cache_key = (object_type, str(key))
+        with self.lock:
+            entry = self.entries.get(cache_key)
+            if entry is None:
+                self.misses += 1
+                return None
+            value, expires_at = entry
+            if expires_at <= time.monotonic():
+                del self.entries[cache_key]
+                self.misses += 1
+                return None
+            self.entries.move_to_end(cache_key)
+            self.hits += 1
+            return value
+
+    def set(self, object_type, key, value, ttl=None):
+        """Cache value under its type's TTL, or under ttl seconds when the object carries its own expiry."""
+        if ttl is None:
+            ttl = self.ttls.get(object_type, 0)
+        if value is None or ttl <= 0:
+            return
+        cache_key = (object_type, str(key))
+        with self.lock:
+            self.entries[cache_key] = (value, time.monotonic() + ttl)
+            self.entries.move_to_end(cache_key)
+            while len(self.entries) > self.max_entries:
+                self.entries.popitem(last=False)
+                self.evictions += 1
+
+    def invalidate(self, object_type, key):
+        with self.lock:
+            self.entries.pop((object_type, str(key)), None)
+
+    def clear(self):
+        with self.lock:
+            self.entries.clear()
+
+    def stats(self):
+        with self.lock:
+            lookups = self.hits + self.misses
+            return {
+                'entries': len(self.entries),
+                'max_entries': self.max_entries,
+                'hits': self.hits,
+                'misses': self.misses,
+                'evictions': self.evictions,
+                'hit_ratio': self.hits / lookups if lookups else 0.0
+            }
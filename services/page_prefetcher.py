@@ -0,0 +1,68 @@
+from collections import OrderedDict
+import threading
+import time
+
+class PagePrefetcher:
+    """
+    Serves paginated reads while fetching the following page in the background.
+
+    fetch_page(page_size, pagination_token, variant) must return (items, next_token). When
+    page N is returned, page N+1 is already being fetched under its pagination token, so a
+    client walking the pages only waits for whatever is left of that round trip. The variant
+    (e.g. a field projection) is passed through and keeps differently shaped pages apart.
+    A caller that knows a page is its last passes prefetch_next=False, so no quota is spent
+    on a page nobody will read.
+    """
+
+    def __init__(self, fetch_page, executor, ttl=60, max_pages=16):
+        self.fetch_page = fetch_page
+        self.executor = executor
+        self.ttl = ttl
+        self.max_pages = max_pages
+        self.pages = OrderedDict()
+        self.lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get_page(self, page_size, pagination_token=None, variant=None, prefetch_next=True):
+        key = (page_size, pagination_token, variant)
+        with self.lock:
+            entry = self.pages.pop(key, None)
+
+        page = None
+        if entry is not None:
+            future, fetched_at = entry
+            if time.monotonic() - fetched_at < self.ttl:
+                try:
+                    page = future.result()
+                except Exception:
+                    page = None  # Fall back to a live fetch, which surfaces the error properly
+
+        with self.lock:
+            if page is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+
+        if page is None:
+            page = self.fetch_page(page_size, pagination_token, variant)
+
+        next_token = page[1]
+        if next_token and prefetch_next:
+            self.prefetch(page_size, next_token, variant)
+        return page
+
+    def prefetch(self, page_size, pagination_token, variant=None):
+        key = (page_size, pagination_token, variant)
+        with self.lock:
+            if key in self.pages:
+                return
+            self.pages[key] = (
+                self.executor.submit(self.fetch_page, page_size, pagination_token, variant), time.monotonic()
+            )
+            while len(self.pages) > self.max_pages:
+                self.pages.popitem(last=False)
+
+    def stats(self):
+        with self.lock:
+            return {'hits': self.hits, 'misses': self.misses, 'pending': len(self.pages)}
@@ -1,3 +1,13 @@
+from .request_timing import timed
+
+def index_includes(items, key):
+    # First occurrence wins, matching the previous linear scans
+    index = {}
+    for item in items or []:
+        index.setdefault(getattr(item, key), item)
+    return index
+
+@timed('process_x_response')
 def process_x_response(response):
     if not response or not response.data:
         return None
@@ -7,30 +17,39 @@ def process_x_response(response):
 
     includes = response.includes
 
+    # Index the includes once per response so every join below is a dict lookup
+    users_by_id = index_includes(includes.get('users'), 'id')
+    tweets_by_id = index_includes(includes.get('tweets'), 'id')
+    media_by_key = index_includes(includes.get('media'), 'media_key')
+
     def process_single_tweet(tweet):
         if not tweet or not hasattr(tweet, 'data'):
             return None
 
-        processed_tweet = tweet.data.copy()
+        # The tweepy response is discarded after shaping, so enrich its dict in place
+        processed_tweet = tweet.data
 
         # Add author information
-        if 'users' in includes:
-            author = next((user for user in includes['users'] if user.id == tweet.author_id), None)
-            if author:
-                processed_tweet['author'] = author.data
+        author = users_by_id.get(tweet.author_id)
+        if author:
+            processed_tweet['author'] = author.data
 
         # Add referenced tweets
-        if 'tweets' in includes and 'referenced_tweets' in tweet.data:
-            for ref in tweet.data['referenced_tweets']:
-                referenced_tweet = next((t for t in includes['tweets'] if t.id == ref['id']), None)
+        if tweets_by_id and 'referenced_tweets' in processed_tweet:
+            referenced_tweets = processed_tweet['referenced_tweets']
+            for ref in list(referenced_tweets):
+                # References keep X's string ids while tweepy parses Tweet.id to an int
+                referenced_tweet = tweets_by_id.get(int(ref['id']))
                 if referenced_tweet:
-                    if 'referenced_tweets' not in processed_tweet:
-                        processed_tweet['referenced_tweets'] = []
-                    processed_tweet['referenced_tweets'].append(referenced_tweet.data)
+                    referenced_tweets.append(referenced_tweet.data)
 
         # Add media attachments
-        if 'media' in includes and 'attachments' in tweet.data and 'media_keys' in tweet.data['attachments']:
-            media_items = [m.data for m in includes['media'] if m.media_key in tweet.data['attachments']['media_keys']]
+        if media_by_key and 'attachments' in processed_tweet and 'media_keys' in processed_tweet['attachments']:
+            media_items = [
+                media_by_key[media_key].data
+                for media_key in processed_tweet['attachments']['media_keys']
+                if media_key in media_by_key
+            ]
             if media_items:
                 processed_tweet['media'] = media_items
 
@@ -40,4 +59,4 @@ def process_x_response(response):
     if isinstance(response.data, list):
         return [process_single_tweet(tweet) for tweet in response.data if tweet]
     else:
-        return process_single_tweet(response.data)
\ No newline at end of file
+        return process_single_tweet(response.data)
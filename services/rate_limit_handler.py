@@ -1,15 +1,135 @@
 from functools import wraps
-from tweepy.errors import TooManyRequests
+from tweepy.errors import HTTPException, TooManyRequests
+import asyncio
+import math
+import threading
 import time
+import tweepy
+from .metrics import metrics
 
 MAX_RETRIES = 3
 INITIAL_RETRY_DELAY = 5  # seconds
+ASYNC_ATTEMPT_TIMEOUT = 60  # seconds
 
 class RateLimitExceeded(Exception):
     def __init__(self, message, retry_after):
         super().__init__(message)
         self.retry_after = retry_after
 
+class RateLimitTracker:
+    """
+    Tracks the remaining X API budget per endpoint from the x-rate-limit-* headers
+    of every response, so an exhausted endpoint can be rejected locally until it resets.
+    """
+
+    def __init__(self):
+        self.buckets = {}
+        self.lock = threading.Lock()
+
+    @staticmethod
+    def endpoint_key(method, route):
+        # Rate limits apply per endpoint template, e.g. GET /2/tweets/:id
+        segments = route.split('?')[0].split('/')
+        for i, segment in enumerate(segments[2:], start=2):
+            if segment.isdigit():
+                segments[i] = ':id'
+            elif segments[i - 1] == 'username':
+                segments[i] = ':username'
+        return f"{method.upper()} {'/'.join(segments)}"
+
+    def update(self, method, route, headers):
+        remaining = headers.get('x-rate-limit-remaining')
+        reset = headers.get('x-rate-limit-reset')
+        if remaining is None or reset is None:
+            return
+        with self.lock:
+            self.buckets[self.endpoint_key(method, route)] = {
+                'limit': int(headers.get('x-rate-limit-limit', 0)) or None,
+                'remaining': int(remaining),
+                'reset': int(reset)
+            }
+
+    def retry_after(self, method, route):
+        key = self.endpoint_key(method, route)
+        with self.lock:
+            bucket = self.buckets.get(key)
+            if not bucket or bucket['remaining'] > 0:
+                return None
+            wait = bucket['reset'] - time.time()
+            if wait <= 0:
+                # The window has reset; forget the exhausted bucket until new headers arrive
+                del self.buckets[key]
+                return None
+        return math.ceil(wait)
+
+    def check(self, method, route):
+        retry_after = self.retry_after(method, route)
+        if retry_after is not None:
+            metrics.inc('xproxy_rate_limit_rejections_total', (('endpoint', self.endpoint_key(method, route)),))
+            raise RateLimitExceeded(
+                f'Rate limit budget for {self.endpoint_key(method, route)} is exhausted. '
+                f'Please try again in {retry_after} seconds.',
+                retry_after=retry_after
+            )
+
+    def snapshot(self):
+        with self.lock:
+            return {key: dict(bucket) for key, bucket in self.buckets.items()}
+
+class RateLimitedClient(tweepy.Client):
+    """tweepy.Client that feeds every response into a RateLimitTracker and fails fast on empty buckets."""
+
+    def __init__(self, *args, rate_limit_tracker=None, session=None, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.rate_limit_tracker = rate_limit_tracker or RateLimitTracker()
+        if session is not None:
+            self.session = session
+        self.authenticating_user_ids = {}
+
+    def _get_oauth_2_authenticating_user_id(self, access_token):
+        # tweepy's lookup sets return_type = dict on the client for the call, which hands raw
+        # dicts to requests running concurrently on other threads; read the id without that
+        if access_token not in self.authenticating_user_ids:
+            response = self.request('GET', '/2/users/me')
+            self.authenticating_user_ids[access_token] = response.json()['data']['id']
+        return self.authenticating_user_ids[access_token]
+
+    def request(self, method, route, params=None, json=None, user_auth=False):
+        self.rate_limit_tracker.check(method, route)
+        try:
+            with metrics.time_upstream('x', self.rate_limit_tracker.endpoint_key(method, route)):
+                response = super().request(method, route, params=params, json=json, user_auth=user_auth)
+        except HTTPException as e:
+            self.rate_limit_tracker.update(method, route, e.response.headers)
+            raise
+        self.rate_limit_tracker.update(method, route, response.headers)
+        return response
+
+def get_retry_after(response):
+    reset = response.headers.get('x-rate-limit-reset')
+    if reset is not None:
+        return max(math.ceil(int(reset) - time.time()), 1)
+    retry_after = response.headers.get('Retry-After')
+    if retry_after is not None and retry_after.isdigit():
+        return int(retry_after)
+    return None
+
+def get_retry_delay(error, retries, func_name=None):
+    """Seconds to back off after a 429, or RateLimitExceeded when we should give up right away."""
+    labels = (('method', func_name),) if func_name else ()
+    retry_after = get_retry_after(error.response)
+    # When X tells us when the window resets, fail fast instead of parking the worker
+    if retry_after is not None or retries == MAX_RETRIES:
+        metrics.inc('xproxy_rate_limit_exhausted_total', labels)
+        raise RateLimitExceeded(
+            'Rate limit exceeded. Please try again later.',
+            retry_after=retry_after or INITIAL_RETRY_DELAY
+        )
+    delay = INITIAL_RETRY_DELAY * (2 ** (retries - 1))
+    metrics.inc('xproxy_rate_limit_retries_total', labels)
+    metrics.inc('xproxy_rate_limit_sleep_seconds_total', labels, delay)
+    return delay
+
 def handle_rate_limit(func):
     @wraps(func)
     def wrapper(*args, **kwargs):
@@ -19,11 +139,18 @@ def handle_rate_limit(func):
                 return func(*args, **kwargs)
             except TooManyRequests as e:
                 retries += 1
-                if retries == MAX_RETRIES:
-                    raise RateLimitExceeded(
-                        'Rate limit exceeded. Please try again later.',
-                        retry_after=e.response.headers.get('Retry-After', INITIAL_RETRY_DELAY)
-                    )
-                retry_delay = INITIAL_RETRY_DELAY * (2 ** (retries - 1))
-                time.sleep(retry_delay)
-    return wrapper
\ No newline at end of file
+                time.sleep(get_retry_delay(e, retries, func.__name__))
+    return wrapper
+
+def handle_rate_limit_async(func):
+    """handle_rate_limit for coroutines: backs off with asyncio.sleep and bounds each attempt with a timeout."""
+    @wraps(func)
+    async def wrapper(*args, **kwargs):
+        retries = 0
+        while retries < MAX_RETRIES:
+            try:
+                return await asyncio.wait_for(func(*args, **kwargs), timeout=ASYNC_ATTEMPT_TIMEOUT)
+            except TooManyRequests as e:
+                retries += 1
+                await asyncio.sleep(get_retry_delay(e, retries, func.__name__))
+    return wrapper
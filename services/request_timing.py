@@ -0,0 +1,135 @@
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from contextvars import ContextVar, copy_context
+from functools import wraps
+import threading
+import time
+
+MAX_HEADER_SPANS = 32  # spans listed one by one in Server-Timing; the rest are summed per name
+
+current_timer = ContextVar('current_timer', default=None)
+
+class RequestTimer:
+    """
+    Spans of one request, e.g. the token check, each upstream call and serialization.
+
+    Spans may be added from any thread working for the request; outside a request
+    (no timer in the context) recording is a no-op.
+    """
+
+    def __init__(self):
+        self.started_at = time.perf_counter()
+        self.lock = threading.Lock()
+        self.spans = []
+        self.samples = {}  # folded stack -> count, filled by the sampling profiler
+
+    def add_span(self, name, started_at, duration, description=None):
+        with self.lock:
+            self.spans.append((name, description, started_at - self.started_at, duration))
+
+    def add_sample(self, stack):
+        with self.lock:
+            self.samples[stack] = self.samples.get(stack, 0) + 1
+
+    def elapsed(self):
+        return time.perf_counter() - self.started_at
+
+    def server_timing(self):
+        """Value of the Server-Timing header, durations in milliseconds."""
+        with self.lock:
+            spans = sorted(self.spans, key=lambda span: span[2])
+        entries = []
+        for name, description, _, duration in spans[:MAX_HEADER_SPANS]:
+            entry = f'{name};dur={duration * 1000:.1f}'
+            if description:
+                entry += ';desc="' + description.replace('\\', '').replace('"', "'") + '"'
+            entries.append(entry)
+        totals = {}
+        for name, _, _, duration in spans[MAX_HEADER_SPANS:]:
+            count, total = totals.get(name, (0, 0.0))
+            totals[name] = (count + 1, total + duration)
+        for name, (count, total) in totals.items():
+            entries.append(f'{name};dur={total * 1000:.1f};desc="{count} more"')
+        entries.append(f'total;dur={self.elapsed() * 1000:.1f}')
+        return ', '.join(entries)
+
+    def to_dict(self):
+        with self.lock:
+            spans = sorted(self.spans, key=lambda span: span[2])
+        return {
+            'total_ms': round(self.elapsed() * 1000, 3),
+            'spans': [
+                {
+                    'name': name,
+                    'description': description,
+                    'start_ms': round(offset * 1000, 3),
+                    'duration_ms': round(duration * 1000, 3)
+                }
+                for name, description, offset, duration in spans
+            ]
+        }
+
+@contextmanager
+def span(name, description=None):
+    timer = current_timer.get()
+    if timer is None:
+        yield
+        return
+    started_at = time.perf_counter()
+    try:
+        yield
+    finally:
+        timer.add_span(name, started_at, time.perf_counter() - started_at, description)
+
+def timed(name):
+    """Decorator recording each call of the function as a span of the current request."""
+    def decorator(func):
+        @wraps(func)
+        def wrapper(*args, **kwargs):
+            with span(name):
+                return func(*args, **kwargs)
+        return wrapper
+    return decorator
+
+class ContextThreadPoolExecutor(ThreadPoolExecutor):
+    """ThreadPoolExecutor whose tasks run in the submitter's context, so their spans count toward its request."""
+
+    def submit(self, fn, /, *args, **kwargs):
+        context = copy_context()
+        timer = context.get(current_timer)
+        if timer is None:
+            return super().submit(context.run, fn, *args, **kwargs)
+
+        def run_for_request():
+            # Lets the sampling profiler attribute this thread to the request while the task runs
+            with request_thread(timer):
+                return fn(*args, **kwargs)
+
+        return super().submit(context.run, run_for_request)
+
+# Thread ident -> RequestTimer for threads currently working on a request, read by the sampling profiler
+active_threads = {}
+
+@contextmanager
+def request_thread(timer):
+    thread_id = threading.get_ident()
+    previous = active_threads.get(thread_id)
+    active_threads[thread_id] = timer
+    try:
+        yield
+    finally:
+        if previous is None:
+            active_threads.pop(thread_id, None)
+        else:
+            active_threads[thread_id] = previous
+
+def start_request():
+    """Start timing the request served by this thread. Returns its RequestTimer."""
+    timer = RequestTimer()
+    current_timer.set(timer)
+    active_threads[threading.get_ident()] = timer
+    return timer
+
+def end_request():
+    current_timer.set(None)
+    active_threads.pop(threading.get_ident(), None)
@@ -0,0 +1,105 @@
+from collections import deque
+import os
+import sys
+import threading
+import time
+import uuid
+from .request_timing import active_threads
+
+def fold_stack(frame):
+    """A thread's stack in the folded format of flame graph tools: root;...;leaf."""
+    names = []
+    while frame is not None:
+        code = frame.f_code
+        names.append(f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})")
+        frame = frame.f_back
+    return ';'.join(reversed(names))
+
+class SamplingProfiler:
+    """
+    Samples the stacks of threads serving requests every interval_ms while enabled.
+
+    Samples are kept per request, including pool threads doing work for it, and only
+    requests slower than slow_request_ms are kept afterwards, as folded stacks that
+    flamegraph.pl or speedscope can render. Costs nothing while disabled.
+    """
+
+    def __init__(self, enabled=False, interval_ms=10, slow_request_ms=1000, max_profiles=20):
+        self.enabled = enabled
+        self.interval_ms = interval_ms
+        self.slow_request_ms = slow_request_ms
+        self.lock = threading.Lock()
+        self.profiles = deque(maxlen=max_profiles)
+        self.wakeup = threading.Event()
+        self.sample_thread = None
+
+    def configure(self, enabled=None, interval_ms=None, slow_request_ms=None):
+        if interval_ms is not None:
+            self.interval_ms = interval_ms
+        if slow_request_ms is not None:
+            self.slow_request_ms = slow_request_ms
+        if enabled is not None:
+            self.enabled = enabled
+            if enabled:
+                self.wakeup.set()
+
+    def sample(self):
+        frames = sys._current_frames()
+        for thread_id, timer in list(active_threads.items()):
+            frame = frames.get(thread_id)
+            if frame is not None:
+                timer.add_sample(fold_stack(frame))
+
+    def finish_request(self, timer, method, path, status):
+        """Keep the samples of a finished request if it was slow enough."""
+        duration_ms = timer.elapsed() * 1000
+        if not self.enabled or duration_ms < self.slow_request_ms or not timer.samples:
+            return None
+        with timer.lock:
+            samples = dict(timer.samples)
+        profile = {
+            'id': uuid.uuid4().hex,
+            'method': method,
+            'path': path,
+            'status': status,
+            'duration_ms': round(duration_ms, 3),
+            'interval_ms': self.interval_ms,
+            'captured_at': time.time(),
+            'samples': samples
+        }
+        with self.lock:
+            self.profiles.append(profile)
+        return profile['id']
+
+    def get_profiles(self):
+        with self.lock:
+            profiles = list(self.profiles)
+        return [
+            {key: value for key, value in profile.items() if key != 'samples'} | {'sample_count': sum(profile['samples'].values())}
+            for profile in reversed(profiles)
+        ]
+
+    def get_profile(self, profile_id):
+        with self.lock:
+            return next((profile for profile in self.profiles if profile['id'] == profile_id), None)
+
+    def get_status(self):
+        return {
+            'enabled': self.enabled,
+            'interval_ms': self.interval_ms,
+            'slow_request_ms': self.slow_request_ms,
+            'profiles': self.get_profiles()
+        }
+
+    def start(self):
+        def sample_loop():
+            while True:
+                if not self.enabled:
+                    self.wakeup.clear()
+                    self.wakeup.wait()
+                    continue
+                self.sample()
+                time.sleep(self.interval_ms / 1000)
+
+        self.sample_thread = threading.Thread(target=sample_loop, daemon=True)
+        self.sample_thread.start()
@@ -0,0 +1,59 @@
+from concurrent.futures import Future
+from functools import wraps
+import threading
+
+class SingleFlight:
+    """
+    Coalesces identical concurrent calls: while a call for a key is in flight, other
+    callers with the same key wait for it and share its result or exception.
+    """
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.in_flight = {}
+        self.calls = 0
+        self.shared = 0
+
+    def do(self, key, func):
+        with self.lock:
+            self.calls += 1
+            future = self.in_flight.get(key)
+            if future is not None:
+                self.shared += 1
+                leader = False
+            else:
+                future = Future()
+                self.in_flight[key] = future
+                leader = True
+
+        if not leader:
+            return future.result()
+
+        try:
+            result = func()
+        except BaseException as e:
+            future.set_exception(e)
+            raise
+        else:
+            future.set_result(result)
+            return result
+        finally:
+            with self.lock:
+                del self.in_flight[key]
+
+    def stats(self):
+        with self.lock:
+            return {
+                'calls': self.calls,
+                'executed_calls': self.calls - self.shared,
+                'saved_calls': self.shared,
+                'in_flight': len(self.in_flight)
+            }
+
+def coalesce(func):
+    """Share one call among identical concurrent calls of a method, via the instance's SingleFlight."""
+    @wraps(func)
+    def wrapper(self, *args, **kwargs):
+        key = (func.__name__, args, tuple(sorted(kwargs.items())))
+        return self.singleflight.do(key, lambda: func(self, *args, **kwargs))
+    return wrapper
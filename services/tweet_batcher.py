@@ -0,0 +1,87 @@
+from concurrent.futures import Future
+import re
+import threading
+from tweepy.errors import BadRequest
+
+TWEET_ID_PATTERN = re.compile(r'\d{1,19}')
+
+class TweetBatcher:
+    """
+    Merges single-tweet lookups that arrive within window_ms of each other into one
+    multi-id lookup. fetch_batch(tweet_ids) must return {tweet_id: tweet}. Lookups are sent
+    from the batcher's own threads; get() waits on one and submit() returns its Future.
+
+    X rejects a whole lookup over one malformed id, so such ids are looked up on their own,
+    and a batch X rejects is split until only the lookups of the offending ids fail.
+    """
+
+    def __init__(self, fetch_batch, window_ms, max_batch_size=100):
+        self.fetch_batch = fetch_batch
+        self.window = window_ms / 1000
+        self.max_batch_size = max_batch_size
+        self.lock = threading.Lock()
+        self.pending = {}
+        self.timer = None
+
+    def get(self, tweet_id):
+        return self.submit(tweet_id).result()
+
+    def submit(self, tweet_id):
+        """Queue a lookup without waiting on it. Returns a Future of the tweet, None when it is not found."""
+        tweet_id = str(tweet_id)
+        if not TWEET_ID_PATTERN.fullmatch(tweet_id):
+            future = Future()
+            self.start_batch({tweet_id: future})
+            return future
+        batch = None
+        with self.lock:
+            future = self.pending.get(tweet_id)
+            if future is None:
+                future = Future()
+                self.pending[tweet_id] = future
+                if len(self.pending) >= self.max_batch_size:
+                    batch = self.take_batch()
+                elif self.timer is None:
+                    self.timer = threading.Timer(self.window, self.flush)
+                    self.timer.daemon = True
+                    self.timer.start()
+        if batch:
+            # A full batch is sent right away
+            self.start_batch(batch)
+        return future
+
+    def start_batch(self, batch):
+        # On a thread of its own, so submit never blocks, e.g. when called from an event loop
+        threading.Thread(target=self.run_batch, args=(batch,), daemon=True).start()
+
+    def take_batch(self):
+        batch, self.pending = self.pending, {}
+        if self.timer is not None:
+            self.timer.cancel()
+            self.timer = None
+        return batch
+
+    def flush(self):
+        with self.lock:
+            batch = self.take_batch()
+        if batch:
+            self.run_batch(batch)
+
+    def run_batch(self, batch):
+        try:
+            tweets = self.fetch_batch(list(batch))
+        except BadRequest as e:
+            if len(batch) > 1:
+                items = list(batch.items())
+                self.run_batch(dict(items[:len(items) // 2]))
+                self.run_batch(dict(items[len(items) // 2:]))
+                return
+            for future in batch.values():
+                future.set_exception(e)
+            return
+        except Exception as e:
+            for future in batch.values():
+                future.set_exception(e)
+            return
+        for tweet_id, future in batch.items():
+            future.set_result(tweets.get(tweet_id))
@@ -1,29 +1,84 @@
-import os
+import hashlib
+import json
 from config import Config
+from .field_projection import FULL, project_tweet, project_tweets, project_user
+from .idempotency_store import IdempotencyStore
+from .media_service import MAX_MEDIA_PER_TWEET
+from .object_cache import ObjectCache
+from .page_prefetcher import PagePrefetcher
 from .process_x_response import process_x_response
 from .rate_limit_handler import handle_rate_limit
+from .request_timing import ContextThreadPoolExecutor
+from .singleflight import SingleFlight, coalesce
+from .tweet_batcher import TweetBatcher
+from .user_id_index import UserIdIndex
+
+MAX_TWEETS_PER_LOOKUP = 100  # limit of the X multi-tweet lookup endpoint
+
+def get_post_content_hash(text, in_reply_to_tweet_id, media_urls):
+    content = json.dumps([text, str(in_reply_to_tweet_id or ''), media_urls])
+    return hashlib.sha256(content.encode()).hexdigest()
+
+def get_media_urls(media_url=None, media_urls=None):
+    urls = ([media_url] if media_url else []) + list(media_urls or [])
+    if len(urls) > MAX_MEDIA_PER_TWEET:
+        raise ValueError(f"A tweet can have at most {MAX_MEDIA_PER_TWEET} media items")
+    return urls
+
+# Request building and response shaping, shared with AsyncTweetService so only the transport differs
+
+def tweet_request_params(projection=None):
+    """Fields and expansions of a tweet read: the projection's, or everything."""
+    return (projection or FULL).request_params()
+
+def shape_tweets(response, projection=None):
+    return project_tweets(process_x_response(response), projection)
+
+def create_tweet_params(text, in_reply_to_tweet_id=None, media_ids=None):
+    # None ids are media whose download failed, which is skipped; upload errors have already raised
+    media_ids = [media_id for media_id in media_ids or [] if media_id]
+    return {'text': text, 'in_reply_to_tweet_id': in_reply_to_tweet_id, 'media_ids': media_ids or None, 'user_auth': False}
+
+def mentions_page_params(since_id=None, pagination_token=None, max_results=100):
+    return {
+        'id': Config.TWITTER_USER_ID,
+        'since_id': since_id,
+        'pagination_token': pagination_token,
+        'max_results': max_results,
+        **FULL.request_params()
+    }
+
+def shape_mentions_page(response):
+    return process_x_response(response) or [], response.meta
+
+def conversation_search_params(conversation_id, next_token=None, projection=None):
+    return {
+        'query': f"conversation_id:{conversation_id}",
+        'max_results': 100,
+        'next_token': next_token,
+        **tweet_request_params(projection)
+    }
+
+def home_timeline_params(max_results, pagination_token=None, projection=None):
+    return {'max_results': max_results, 'pagination_token': pagination_token, 'user_auth': False, **tweet_request_params(projection)}
+
+def shape_timeline_page(response, projection=None):
+    return shape_tweets(response, projection), response.meta.get('next_token')
+
+def shape_tweet_lookup(response, projection=None):
+    """{tweet_id: tweet} of a multi-id lookup; unknown ids are left out."""
+    return {tweet['id']: tweet for tweet in shape_tweets(response, projection) or []}
+
+def tweet_action_result(response):
+    if not response or not response.data:
+        return None
+    return response.data
 
 class TweetService:
-    # Common tweet fields to request
-    TWEET_FIELDS = [
-        'author_id', 'note_tweet', 'public_metrics', 'referenced_tweets',
-        'conversation_id', 'created_at', 'attachments'
-    ]
-
-    # Common expansions to request
-    EXPANSIONS = [
-        'author_id', 'referenced_tweets.id', 'referenced_tweets.id.author_id',
-        'edit_history_tweet_ids', 'in_reply_to_user_id', 'attachments.media_keys',
-        'attachments.poll_ids', 'geo.place_id', 'entities.mentions.username'
-    ]
-
-    # Common user fields to request
-    USER_FIELDS = [
-        'created_at', 'description', 'entities', 'id', 'location',
-        'most_recent_tweet_id', 'name', 'pinned_tweet_id', 'profile_image_url',
-        'protected', 'public_metrics', 'url', 'username', 'verified',
-        'verified_type', 'withheld'
-    ]
+    # Fields requested by default; services/field_projection.py has the narrower presets
+    TWEET_FIELDS = FULL.tweet_fields
+    EXPANSIONS = FULL.expansions
+    USER_FIELDS = FULL.user_fields
 
     # Fields specific to user lookup
     USER_EXPANSIONS = ['pinned_tweet_id', 'most_recent_tweet_id', 'affiliation.user_id']
@@ -31,68 +86,103 @@ class TweetService:
     def __init__(self, oauth2_handler, media_service):
         self.oauth2_handler = oauth2_handler
         self.media_service = media_service
+        self.object_cache = ObjectCache(
+            ttls={
+                'tweet': Config.TWEET_CACHE_TTL,
+                'user': Config.USER_CACHE_TTL,
+                'username': Config.USER_CACHE_TTL
+            },
+            max_entries=Config.OBJECT_CACHE_MAX_ENTRIES
+        )
+        self.user_id_index = UserIdIndex(
+            Config.USER_ID_INDEX_PATH,
+            self.lookup_user_ids,
+            max_age=Config.USER_ID_INDEX_MAX_AGE
+        )
+        # Shared pool for upstream calls that can run concurrently within one request
+        # Tasks carry the submitting request's context, so their upstream calls show in its timing
+        self.executor = ContextThreadPoolExecutor(max_workers=Config.UPSTREAM_MAX_WORKERS)
+        self.singleflight = SingleFlight()
+        self.idempotency_store = IdempotencyStore(
+            ttl=Config.IDEMPOTENCY_KEY_TTL, max_entries=Config.IDEMPOTENCY_MAX_KEYS
+        )
+        self.home_timeline_prefetcher = PagePrefetcher(
+            self.fetch_home_timeline_page, self.executor, ttl=Config.TIMELINE_PREFETCH_TTL
+        )
+        self.tweet_batcher = None
+        if Config.TWEET_BATCH_WINDOW_MS > 0:
+            self.tweet_batcher = TweetBatcher(
+                self.lookup_tweets, Config.TWEET_BATCH_WINDOW_MS, max_batch_size=MAX_TWEETS_PER_LOOKUP
+            )
+
+    def post_tweet(self, text, in_reply_to_tweet_id=None, media_url=None, media_urls=None, idempotency_key=None):
+        tweet_id, _ = self.post_tweet_once(text, in_reply_to_tweet_id, media_url, media_urls, idempotency_key)
+        return tweet_id
+
+    def post_tweet_once(self, text, in_reply_to_tweet_id=None, media_url=None, media_urls=None, idempotency_key=None):
+        """
+        Post the tweet unless the idempotency key already posted one. Without a key, one is derived
+        from the content when POST_TWEET_AUTO_IDEMPOTENCY is on. Returns (tweet_id, replayed).
+        Raises IdempotencyKeyReused when the key already posted different content.
+        """
+        if not idempotency_key and not Config.POST_TWEET_AUTO_IDEMPOTENCY:
+            return self.send_tweet(text, in_reply_to_tweet_id, media_url, media_urls), False
+
+        # A key reused for different content raises IdempotencyKeyReused instead of replaying the other tweet
+        content_hash = get_post_content_hash(text, in_reply_to_tweet_id, get_media_urls(media_url, media_urls))
+        key = f"key:{idempotency_key}" if idempotency_key else f"auto:{content_hash}"
+
+        # Sits outside send_tweet's rate limit retries, so neither client retries nor those repeat a post
+        return self.idempotency_store.run(
+            key, lambda: self.send_tweet(text, in_reply_to_tweet_id, media_url, media_urls), fingerprint=content_hash
+        )
 
     @handle_rate_limit
-    def post_tweet(self, text, in_reply_to_tweet_id=None, media_url=None):
+    def send_tweet(self, text, in_reply_to_tweet_id=None, media_url=None, media_urls=None):
+        # All media (up to 4) upload in parallel while the client, and possibly a token refresh, is obtained
+        media_futures = [
+            self.media_service.start_media_upload(url)
+            for url in get_media_urls(media_url, media_urls)
+        ]
         client = self.oauth2_handler.get_client()
-        media_ids = None
-
-        if media_url:
-            temp_file_path = self.media_service.download_media(media_url)
-            if temp_file_path:
-                try:
-                    media_id = self.media_service.upload_media(temp_file_path)
-                    if media_id:
-                        media_ids = [media_id]
-                finally:
-                    os.unlink(temp_file_path)
-
-        response = client.create_tweet(
-            text=text,
-            in_reply_to_tweet_id=in_reply_to_tweet_id,
-            media_ids=media_ids,
-            user_auth=False
-        )
+        media_ids = [future.result() for future in media_futures]
+
+        response = client.create_tweet(**create_tweet_params(text, in_reply_to_tweet_id, media_ids))
         return response.data['id']
 
     @handle_rate_limit
     def post_reply(self, tweet_id, text):
         client = self.oauth2_handler.get_client()
-        response = client.create_tweet(
-            text=text, in_reply_to_tweet_id=tweet_id)
+        response = client.create_tweet(**create_tweet_params(text, in_reply_to_tweet_id=tweet_id))
         return response.data['id']
 
     @handle_rate_limit
     def like_tweet(self, tweet_id):
         client = self.oauth2_handler.get_client()
         response = client.like(tweet_id=tweet_id, user_auth=False)
-        if not response or not response.data:
-            return None
-        return response.data
+        self.object_cache.invalidate('tweet', tweet_id)
+        return tweet_action_result(response)
 
     @handle_rate_limit
     def unlike_tweet(self, tweet_id):
         client = self.oauth2_handler.get_client()
         response = client.unlike(tweet_id=tweet_id, user_auth=False)
-        if not response or not response.data:
-            return None
-        return response.data
+        self.object_cache.invalidate('tweet', tweet_id)
+        return tweet_action_result(response)
 
     @handle_rate_limit
     def retweet(self, tweet_id):
         client = self.oauth2_handler.get_client()
         response = client.retweet(tweet_id=tweet_id, user_auth=False)
-        if not response or not response.data:
-            return None
-        return response.data
+        self.object_cache.invalidate('tweet', tweet_id)
+        return tweet_action_result(response)
 
     @handle_rate_limit
     def unretweet(self, source_tweet_id):
         client = self.oauth2_handler.get_client()
         response = client.unretweet(source_tweet_id=source_tweet_id, user_auth=False)
-        if not response or not response.data:
-            return None
-        return response.data
+        self.object_cache.invalidate('tweet', source_tweet_id)
+        return tweet_action_result(response)
         
     @handle_rate_limit
     def pull_mentions(self):
@@ -107,63 +197,113 @@ class TweetService:
             user_fields=self.USER_FIELDS
         )
         return process_x_response(response)
+
+    @handle_rate_limit
+    def get_mentions_page(self, since_id=None, pagination_token=None, max_results=100):
+        client = self.oauth2_handler.get_client()
+        response = client.get_users_mentions(**mentions_page_params(since_id, pagination_token, max_results))
+        return shape_mentions_page(response)
         
     @handle_rate_limit
-    def get_tweet(self, tweet_id):
+    @coalesce
+    def get_tweet(self, tweet_id, projection=None):
+        cached_tweet = self.cached_tweet(tweet_id, projection)
+        if cached_tweet:
+            return cached_tweet
+
+        if self.tweet_batcher and not projection:
+            # Merge with other single-tweet lookups arriving in the same batching window
+            return self.store_tweet(tweet_id, self.tweet_batcher.get(tweet_id))
+
         client = self.oauth2_handler.get_client()
-        response = client.get_tweet(
-            id=tweet_id,
-            expansions=self.EXPANSIONS,
-            tweet_fields=self.TWEET_FIELDS,
-            user_fields=self.USER_FIELDS
-        )
-        return process_x_response(response)
+        response = client.get_tweet(id=tweet_id, **tweet_request_params(projection))
+        return self.store_tweet(tweet_id, process_x_response(response), projection)
+
+    def cached_tweet(self, tweet_id, projection=None):
+        """A cached full tweet, which answers any projection, or None."""
+        cached_tweet = self.object_cache.get('tweet', tweet_id)
+        return project_tweet(cached_tweet, projection) if cached_tweet else None
+
+    def store_tweet(self, tweet_id, tweet, projection=None):
+        """Cache a full tweet, or trim it to the projection; projected reads are not cached themselves."""
+        if projection:
+            return project_tweet(tweet, projection)
+        self.object_cache.set('tweet', tweet_id, tweet)
+        return tweet
 
     @handle_rate_limit
-    def search_recent_tweets(self, query):
+    def get_tweets(self, tweet_ids, projection=None):
+        """Look up any number of tweets, fanning out into concurrent 100-id lookups. Keeps the requested order."""
+        tweet_ids, tweets, batches = self.plan_tweet_lookups(tweet_ids, projection)
+        fetched = self.executor.map(lambda batch: self.lookup_tweets(batch, projection), batches)
+        return self.merge_tweet_lookups(tweet_ids, tweets, fetched, projection)
+
+    def plan_tweet_lookups(self, tweet_ids, projection=None):
+        """(deduplicated ids, {tweet_id: tweet} of the cached ones, batches of up to 100 ids to look up)"""
+        tweet_ids = list(dict.fromkeys(str(tweet_id) for tweet_id in tweet_ids))
+        tweets = {}
+        missing_ids = []
+        for tweet_id in tweet_ids:
+            cached_tweet = self.cached_tweet(tweet_id, projection)
+            if cached_tweet:
+                tweets[tweet_id] = cached_tweet
+            else:
+                missing_ids.append(tweet_id)
+
+        batches = [
+            missing_ids[i:i + MAX_TWEETS_PER_LOOKUP]
+            for i in range(0, len(missing_ids), MAX_TWEETS_PER_LOOKUP)
+        ]
+        return tweet_ids, tweets, batches
+
+    def merge_tweet_lookups(self, tweet_ids, tweets, fetched_batches, projection=None):
+        """Cache the looked up tweets and return every found tweet in the requested order."""
+        for fetched in fetched_batches:
+            if not projection:
+                for tweet_id, tweet in fetched.items():
+                    self.object_cache.set('tweet', tweet_id, tweet)
+            tweets.update(fetched)
+        return [tweets[tweet_id] for tweet_id in tweet_ids if tweet_id in tweets]
+
+    def lookup_tweets(self, tweet_ids, projection=None):
+        """One multi-id lookup of up to 100 tweets. Returns {tweet_id: tweet}; unknown ids are left out."""
         client = self.oauth2_handler.get_client()
-        response = client.search_recent_tweets(
-            query,
-            expansions=self.EXPANSIONS,
-            tweet_fields=self.TWEET_FIELDS,
-            user_fields=self.USER_FIELDS
-        )
-        return process_x_response(response)
+        response = client.get_tweets(ids=tweet_ids, **tweet_request_params(projection))
+        return shape_tweet_lookup(response, projection)
 
     @handle_rate_limit
-    def get_conversation_thread(self, tweet_id):
+    @coalesce
+    def search_recent_tweets(self, query, projection=None):
         client = self.oauth2_handler.get_client()
+        response = client.search_recent_tweets(query, **tweet_request_params(projection))
+        return shape_tweets(response, projection)
 
+    @handle_rate_limit
+    def get_conversation_thread(self, tweet_id, projection=None):
         # Get the requested tweet
-        requested_tweet = self.get_tweet(tweet_id)
+        requested_tweet = self.get_tweet(tweet_id, projection=projection)
         if not requested_tweet:
             return None
 
         conversation_id = requested_tweet.get('conversation_id')
         if not conversation_id:
             # If there's no conversation_id, return just the requested tweet
-            return [requested_tweet]
-
-        # Get the root tweet of the conversation
-        root_tweet = self.get_tweet(conversation_id)
-        if not root_tweet:
-            # If we can't get the root tweet, return just the requested tweet
-            return [requested_tweet]
-
-        # Search for all tweets in the conversation
-        query = f"conversation_id:{conversation_id}"
-        response = client.search_recent_tweets(
-            query,
-            max_results=100,  # Adjust as needed
-            expansions=self.EXPANSIONS,
-            tweet_fields=self.TWEET_FIELDS,
-            user_fields=self.USER_FIELDS
-        )
-        thread = process_x_response(response)
+            return {'tweets': [requested_tweet], 'complete': True}
+
+        # Get the root tweet of the conversation while the conversation is being searched.
+        # A root tweet is its own conversation, so it never needs a second lookup.
+        root_future = None
+        if conversation_id != requested_tweet['id']:
+            root_future = self.executor.submit(self.get_tweet, conversation_id, projection=projection)
 
-        # If no tweets were found in the conversation, return just the requested tweet
-        if not thread:
-            return [requested_tweet]
+        thread, complete = self.search_conversation(conversation_id, projection)
+        root_tweet = root_future.result() if root_future else requested_tweet
+        return self.assemble_thread(requested_tweet, root_tweet, thread, complete)
+
+    def assemble_thread(self, requested_tweet, root_tweet, thread, complete):
+        # If we can't get the root tweet or no tweets were found in the conversation, return just the requested tweet
+        if not root_tweet or not thread:
+            return {'tweets': [requested_tweet], 'complete': complete}
 
         # Ensure both the requested tweet and root tweet are in the thread
         thread = self.add_tweet_if_missing(thread, requested_tweet)
@@ -172,51 +312,105 @@ class TweetService:
         # Sort the thread by created_at timestamp
         thread.sort(key=lambda x: x['created_at'])
 
-        return thread
+        return {'tweets': thread, 'complete': complete}
+
+    def search_conversation(self, conversation_id, projection=None):
+        """Follow search pages up to the configured page/tweet budget. Returns (tweets, complete)."""
+        client = self.oauth2_handler.get_client()
+        thread = []
+        next_token = None
+
+        for _ in range(Config.CONVERSATION_MAX_PAGES):
+            response = client.search_recent_tweets(**conversation_search_params(conversation_id, next_token, projection))
+            thread.extend(shape_tweets(response, projection) or [])
+            next_token = response.meta.get('next_token')
+            if not next_token or len(thread) >= Config.CONVERSATION_MAX_TWEETS:
+                break
+
+        return thread, next_token is None
 
     def add_tweet_if_missing(self, thread, tweet):
         if not any(t['id'] == tweet['id'] for t in thread):
             thread.append(tweet)
         return thread
 
+    def get_home_timeline(self, max_results=15, pagination_token=None, projection=None):
+        tweets, _ = self.get_home_timeline_page(max_results, pagination_token, projection=projection)
+        return tweets
+
+    def get_home_timeline_page(self, max_results=15, pagination_token=None, prefetch=False, projection=None,
+                               prefetch_next=True):
+        """One page of the home timeline as (tweets, next_token)."""
+        if prefetch:
+            # Page N+1 starts downloading in the background as page N is returned
+            return self.home_timeline_prefetcher.get_page(max_results, pagination_token, projection, prefetch_next)
+        return self.fetch_home_timeline_page(max_results, pagination_token, projection)
+
     @handle_rate_limit
-    def get_home_timeline(self, max_results=15, pagination_token=None):
+    @coalesce
+    def fetch_home_timeline_page(self, max_results, pagination_token, projection=None):
         client = self.oauth2_handler.get_client()
-        response = client.get_home_timeline(
-            max_results=max_results,
-            pagination_token=pagination_token,
-            expansions=self.EXPANSIONS,
-            tweet_fields=self.TWEET_FIELDS,
-            user_fields=self.USER_FIELDS,
-            user_auth=False
-        )
-        return process_x_response(response)
+        response = client.get_home_timeline(**home_timeline_params(max_results, pagination_token, projection))
+        return shape_timeline_page(response, projection)
 
     @handle_rate_limit
-    def get_user_by_username(self, username):
-        client = self.oauth2_handler.get_client()
+    def get_user_by_username(self, username, projection=None):
         # Remove @ symbol if present
         username = username.lstrip('@')
-        response = client.get_user(
-            username=username, 
-            user_fields=self.USER_FIELDS,
-            expansions=self.USER_EXPANSIONS,
-            tweet_fields=self.TWEET_FIELDS,
-            user_auth=False
-        )
-        return self.process_user_response(response)
+        cached_user = self.cached_user('username', username.lower(), projection)
+        if cached_user:
+            return cached_user
+
+        client = self.oauth2_handler.get_client()
+        response = client.get_user(username=username, user_auth=False, **self.user_request_params(projection))
+        return self.store_user_response(response, projection)
 
     @handle_rate_limit
-    def get_user_by_id(self, user_id):
+    def get_user_by_id(self, user_id, projection=None):
+        cached_user = self.cached_user('user', user_id, projection)
+        if cached_user:
+            return cached_user
+
         client = self.oauth2_handler.get_client()
-        response = client.get_user(
-            id=user_id, 
-            user_fields=self.USER_FIELDS,
-            expansions=self.USER_EXPANSIONS,
-            tweet_fields=self.TWEET_FIELDS,
-            user_auth=False
-        )
-        return self.process_user_response(response)
+        response = client.get_user(id=user_id, user_auth=False, **self.user_request_params(projection))
+        return self.store_user_response(response, projection)
+
+    def cached_user(self, object_type, key, projection=None):
+        cached_user = self.object_cache.get(object_type, key)
+        return project_user(cached_user, projection) if cached_user else None
+
+    def user_request_params(self, projection=None):
+        if projection:
+            return projection.user_request_params()
+        return {'user_fields': self.USER_FIELDS, 'expansions': self.USER_EXPANSIONS, 'tweet_fields': self.TWEET_FIELDS}
+
+    def store_user_response(self, response, projection=None):
+        """Shape a user lookup, caching full users and indexing the id of projected ones."""
+        user_data = self.process_user_response(response)
+        if not projection:
+            self.cache_user(user_data)
+            return user_data
+        if user_data:
+            self.user_id_index.store(user_data['username'], user_data['id'])
+        return project_user(user_data, projection)
+
+    @handle_rate_limit
+    def lookup_user_ids(self, usernames):
+        client = self.oauth2_handler.get_client()
+        # Default user fields (id, name, username) are all we need here
+        response = client.get_users(usernames=usernames, user_auth=False)
+        return {user.username.lower(): str(user.id) for user in response.data or []}
+
+    def cache_user(self, user_data):
+        if not user_data:
+            return
+        self.object_cache.set('user', user_data['id'], user_data)
+        self.object_cache.set('username', user_data['username'].lower(), user_data)
+        self.user_id_index.store(user_data['username'], user_data['id'])
+
+    def invalidate_user(self, user_id, username):
+        self.object_cache.invalidate('user', user_id)
+        self.object_cache.invalidate('username', username.lstrip('@').lower())
 
     def process_user_response(self, response):
         if not response.data:
@@ -258,23 +452,25 @@ class TweetService:
     @handle_rate_limit
     def follow_user(self, username):
         client = self.oauth2_handler.get_client()
-        # First, get the user ID from the username
-        user_data = self.get_user_by_username(username)
-        if not user_data:
+        # First, resolve the user ID from the local username index
+        user_id = self.user_id_index.resolve(username)
+        if not user_id:
             raise ValueError(f"User with username {username} not found")
 
         # Now follow the user using their ID
-        response = client.follow_user(user_data['id'], user_auth=False)
+        response = client.follow_user(user_id, user_auth=False)
+        self.invalidate_user(user_id, username)
         return response.data
 
     @handle_rate_limit
     def unfollow_user(self, username):
         client = self.oauth2_handler.get_client()
-        # First, get the user ID from the username
-        user_data = self.get_user_by_username(username)
-        if not user_data:
+        # First, resolve the user ID from the local username index
+        user_id = self.user_id_index.resolve(username)
+        if not user_id:
             raise ValueError(f"User with username {username} not found")
 
         # Now unfollow the user using their ID
-        response = client.unfollow_user(user_data['id'], user_auth=False)
+        response = client.unfollow_user(user_id, user_auth=False)
+        self.invalidate_user(user_id, username)
         return response.data
@@ -0,0 +1,105 @@
+import queue
+import sqlite3
+import threading
+import time
+
+MAX_USERNAMES_PER_LOOKUP = 100  # limit of the X multi-user lookup endpoint
+
+class UserIdIndex:
+    """
+    Durable username -> user id index backed by SQLite.
+
+    Misses are filled through the batched multi-user lookup, and entries older than
+    max_age are still served but queued for a background refresh.
+    """
+
+    def __init__(self, path, lookup_user_ids, max_age=7 * 24 * 3600):
+        # lookup_user_ids(usernames) must return {lowercased username: user id}
+        self.lookup_user_ids = lookup_user_ids
+        self.max_age = max_age
+        self.lock = threading.Lock()
+        self.connection = sqlite3.connect(path, check_same_thread=False)
+        with self.lock, self.connection:
+            self.connection.execute(
+                'CREATE TABLE IF NOT EXISTS user_ids ('
+                'username TEXT PRIMARY KEY, user_id TEXT NOT NULL, updated_at REAL NOT NULL)'
+            )
+        self.refresh_queue = queue.Queue()
+        self.refresh_pending = set()
+        self.refresh_thread = None
+
+    @staticmethod
+    def normalize(username):
+        return username.lstrip('@').lower()
+
+    def lookup(self, username):
+        username = self.normalize(username)
+        with self.lock:
+            row = self.connection.execute(
+                'SELECT user_id, updated_at FROM user_ids WHERE username = ?', (username,)
+            ).fetchone()
+        if not row:
+            return None
+        user_id, updated_at = row
+        if time.time() - updated_at > self.max_age:
+            self.schedule_refresh(username)
+        return user_id
+
+    def store(self, username, user_id):
+        self.store_many({username: user_id})
+
+    def store_many(self, user_ids):
+        now = time.time()
+        rows = [(self.normalize(username), str(user_id), now) for username, user_id in user_ids.items()]
+        with self.lock, self.connection:
+            self.connection.executemany(
+                'INSERT OR REPLACE INTO user_ids (username, user_id, updated_at) VALUES (?, ?, ?)', rows
+            )
+
+    def remove_many(self, usernames):
+        with self.lock, self.connection:
+            self.connection.executemany(
+                'DELETE FROM user_ids WHERE username = ?', [(self.normalize(u),) for u in usernames]
+            )
+
+    def fill(self, usernames):
+        usernames = list(dict.fromkeys(self.normalize(u) for u in usernames))
+        for i in range(0, len(usernames), MAX_USERNAMES_PER_LOOKUP):
+            batch = usernames[i:i + MAX_USERNAMES_PER_LOOKUP]
+            found = self.lookup_user_ids(batch)
+            self.store_many(found)
+            # Usernames that no longer resolve (renamed, suspended) must not keep a stale id
+            self.remove_many([u for u in batch if u not in found])
+
+    def resolve(self, username):
+        user_id = self.lookup(username)
+        if user_id:
+            return user_id
+        self.fill([username])
+        return self.lookup(username)
+
+    def schedule_refresh(self, username):
+        with self.lock:
+            if username in self.refresh_pending:
+                return
+            self.refresh_pending.add(username)
+            if self.refresh_thread is None:
+                self.refresh_thread = threading.Thread(target=self.refresh_loop, daemon=True)
+                self.refresh_thread.start()
+        self.refresh_queue.put(username)
+
+    def refresh_loop(self):
+        while True:
+            batch = [self.refresh_queue.get()]
+            while len(batch) < MAX_USERNAMES_PER_LOOKUP:
+                try:
+                    batch.append(self.refresh_queue.get_nowait())
+                except queue.Empty:
+                    break
+            try:
+                self.fill(batch)
+            except Exception as e:
+                print(f"Error refreshing user id index: {e}")
+            finally:
+                with self.lock:
+                    self.refresh_pending.difference_update(batch)
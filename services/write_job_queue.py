@@ -0,0 +1,163 @@
+import json
+import sqlite3
+import threading
+import time
+import uuid
+from .rate_limit_handler import RateLimitExceeded
+
+# Write operations that can run as jobs. Operations that are safe to repeat are retried after a
+# restart; a post that was running when the process died may already exist, so it is failed instead.
+WRITE_OPERATIONS = {
+    'post_tweet': False,
+    'post_reply': False,
+    'like_tweet': True,
+    'unlike_tweet': True,
+    'retweet': True,
+    'unretweet': True,
+    'follow_user': True,
+    'unfollow_user': True
+}
+
+class WriteJobQueue:
+    """
+    Durable queue of X write operations backed by SQLite, run by a bounded pool of worker threads.
+
+    A job that hits the rate limit goes back in the queue until the window resets, so the
+    workers never spend more than the write budget X reports.
+    """
+
+    def __init__(self, x_service, path, workers=4, retention=7 * 24 * 3600):
+        self.x_service = x_service
+        self.workers = workers
+        self.retention = retention
+        self.lock = threading.Lock()
+        self.wakeup = threading.Condition()
+        self.connection = sqlite3.connect(path, check_same_thread=False)
+        with self.lock, self.connection:
+            self.connection.execute(
+                'CREATE TABLE IF NOT EXISTS jobs ('
+                'id TEXT PRIMARY KEY, operation TEXT NOT NULL, params TEXT NOT NULL, status TEXT NOT NULL, '
+                'result TEXT, error TEXT, run_at REAL NOT NULL, created_at REAL NOT NULL, updated_at REAL NOT NULL)'
+            )
+        self.worker_threads = []
+
+    def enqueue(self, operation, **params):
+        if operation not in WRITE_OPERATIONS:
+            raise ValueError(f"Unknown write operation: {operation}")
+        job_id = uuid.uuid4().hex
+        now = time.time()
+        with self.lock, self.connection:
+            self.connection.execute(
+                'INSERT INTO jobs (id, operation, params, status, run_at, created_at, updated_at) '
+                "VALUES (?, ?, ?, 'queued', ?, ?, ?)",
+                (job_id, operation, json.dumps(params), now, now, now)
+            )
+        with self.wakeup:
+            self.wakeup.notify()
+        return job_id
+
+    def get_job(self, job_id):
+        with self.lock:
+            row = self.connection.execute(
+                'SELECT id, operation, params, status, result, error, run_at, created_at, updated_at '
+                'FROM jobs WHERE id = ?', (job_id,)
+            ).fetchone()
+        if not row:
+            return None
+        job_id, operation, params, status, result, error, run_at, created_at, updated_at = row
+        return {
+            'id': job_id,
+            'operation': operation,
+            'params': json.loads(params),
+            'status': status,
+            'result': json.loads(result) if result is not None else None,
+            'error': error,
+            'run_at': run_at,
+            'created_at': created_at,
+            'updated_at': updated_at
+        }
+
+    def claim_next(self):
+        """Mark the oldest due job as running. Returns (job_id, operation, params), or the seconds until the next job is due."""
+        now = time.time()
+        with self.lock, self.connection:
+            row = self.connection.execute(
+                "SELECT id, operation, params FROM jobs WHERE status = 'queued' AND run_at <= ? "
+                'ORDER BY created_at LIMIT 1', (now,)
+            ).fetchone()
+            if row:
+                self.connection.execute(
+                    "UPDATE jobs SET status = 'running', updated_at = ? WHERE id = ?", (now, row[0])
+                )
+                return row[0], row[1], json.loads(row[2])
+            next_run_at = self.connection.execute(
+                "SELECT MIN(run_at) FROM jobs WHERE status = 'queued'"
+            ).fetchone()[0]
+        return None if next_run_at is None else max(next_run_at - now, 0)
+
+    def finish(self, job_id, status, result=None, error=None, run_at=None):
+        now = time.time()
+        with self.lock, self.connection:
+            self.connection.execute(
+                'UPDATE jobs SET status = ?, result = ?, error = ?, run_at = COALESCE(?, run_at), updated_at = ? '
+                'WHERE id = ?',
+                (status, json.dumps(result) if result is not None else None, error, run_at, now, job_id)
+            )
+
+    def run_job(self, job_id, operation, params):
+        try:
+            result = getattr(self.x_service, operation)(**params)
+        except RateLimitExceeded as e:
+            # Back in the queue until the rate limit window resets
+            self.finish(job_id, 'queued', error=str(e), run_at=time.time() + e.retry_after)
+            with self.wakeup:
+                self.wakeup.notify_all()
+            return
+        except Exception as e:
+            print(f"Error running {operation} job {job_id}: {e}")
+            self.finish(job_id, 'failed', error=str(e))
+            return
+        self.finish(job_id, 'succeeded', result=result)
+
+    def recover(self):
+        """After a restart, requeue jobs that were interrupted and can safely run again, and prune old jobs."""
+        now = time.time()
+        with self.lock, self.connection:
+            rows = self.connection.execute("SELECT id, operation FROM jobs WHERE status = 'running'").fetchall()
+            for job_id, operation in rows:
+                if WRITE_OPERATIONS[operation]:
+                    self.connection.execute(
+                        "UPDATE jobs SET status = 'queued', updated_at = ? WHERE id = ?", (now, job_id)
+                    )
+                else:
+                    self.connection.execute(
+                        "UPDATE jobs SET status = 'failed', error = ?, updated_at = ? WHERE id = ?",
+                        ('Interrupted by a restart; the write may or may not have reached X', now, job_id)
+                    )
+            self.connection.execute(
+                "DELETE FROM jobs WHERE status IN ('succeeded', 'failed') AND updated_at < ?",
+                (now - self.retention,)
+            )
+
+    def count_by_status(self):
+        with self.lock:
+            return dict(self.connection.execute('SELECT status, COUNT(*) FROM jobs GROUP BY status').fetchall())
+
+    def start(self):
+        self.recover()
+
+        def worker_loop():
+            while True:
+                # Claiming under the condition means a job queued meanwhile always wakes a worker
+                with self.wakeup:
+                    claimed = self.claim_next()
+                    if not isinstance(claimed, tuple):
+                        # Sleep until the next job is due or a new job is queued
+                        self.wakeup.wait(claimed)
+                        continue
+                self.run_job(*claimed)
+
+        for _ in range(self.workers):
+            worker_thread = threading.Thread(target=worker_loop, daemon=True)
+            worker_thread.start()
+            self.worker_threads.append(worker_thread)
@@ -1,70 +1,87 @@
+from config import Config
 from .tweet_service import TweetService
 from .media_service import MediaService
+from .conversation_index import THREAD_TWEET_FIELDS, ConversationIndex
+from .mentions_ingester import MentionsIngester
+from .request_timing import span
+from .write_job_queue import WriteJobQueue
+
+def project_thread(result, projection):
+    """A copy of a get_tweet_with_thread result with every tweet trimmed to the projection."""
+    projected = dict(result)
+    for key in ('requested_tweet', 'root_tweet'):
+        projected[key] = projection.project_tweet(result[key])
+    for key in ('ancestor_chain', 'sibling_tweets', 'children_tweets'):
+        projected[key] = projection.project_tweets(result[key])
+    if 'descendant_tree' in result:
+        tree = {'tweet': projection.project_tweet(result['descendant_tree']['tweet']), 'replies': []}
+        # Iterative, like ConversationIndex.descendant_tree, so deep reply chains cannot hit the recursion limit
+        stack = [(result['descendant_tree'], tree)]
+        while stack:
+            node, projected_node = stack.pop()
+            for reply in node['replies']:
+                child = {'tweet': projection.project_tweet(reply['tweet']), 'replies': []}
+                projected_node['replies'].append(child)
+                stack.append((reply, child))
+        projected['descendant_tree'] = tree
+    return projected
 
 class XService:
-    def __init__(self, oauth2_handler, oauth1_api):
+    def __init__(self, oauth2_handler, oauth1_api, async_mode=False):
         self.media_service = MediaService(oauth1_api)
         self.tweet_service = TweetService(oauth2_handler, self.media_service)
-
-    def get_tweet_with_thread(self, tweet_id):
-        thread = self.tweet_service.get_conversation_thread(tweet_id)
-
-        if not thread:
-            return None
-
-        requested_tweet = next((tweet for tweet in thread if tweet['id'] == tweet_id), None)
-
-        if not requested_tweet:
+        if async_mode:
+            # Imported lazily so the default mode does not need aiohttp installed
+            from .async_bridge import BridgedTweetService
+            self.tweet_service = BridgedTweetService(self.tweet_service)
+        self.mentions_ingester = MentionsIngester(
+            self.tweet_service,
+            Config.MENTIONS_STORE_PATH,
+            poll_interval=Config.MENTIONS_POLL_INTERVAL,
+            max_stored=Config.MENTIONS_MAX_STORED
+        )
+        self.write_jobs = WriteJobQueue(
+            self,
+            Config.WRITE_JOB_QUEUE_PATH,
+            workers=Config.WRITE_JOB_WORKERS,
+            retention=Config.WRITE_JOB_RETENTION
+        )
+
+    def get_tweet_with_thread(self, tweet_id, include_descendants=False, projection=None):
+        # The thread is fetched with the fields the reply tree needs and trimmed once it is built
+        thread_projection = projection.including(THREAD_TWEET_FIELDS) if projection else None
+        conversation = self.tweet_service.get_conversation_thread(tweet_id, projection=thread_projection)
+
+        if not conversation:
             return None
 
-        ancestor_chain = self.build_ancestor_chain(requested_tweet, thread)
-        sibling_tweets = self.get_sibling_tweets(requested_tweet, thread)
-        children_tweets = self.get_children_tweets(requested_tweet, thread)
-
-        return {
-            'requested_tweet': requested_tweet,
-            'root_tweet': ancestor_chain[0] if ancestor_chain else requested_tweet,
-            'ancestor_chain': ancestor_chain,
-            'sibling_tweets': sibling_tweets,
-            'children_tweets': children_tweets
-        }
-
-    def build_ancestor_chain(self, tweet, thread):
-        chain = []
-        current_tweet = tweet
-
-        while True:
-            parent_id = self.get_parent_tweet_id(current_tweet)
-            if not parent_id:
-                break
-
-            parent_tweet = next((t for t in thread if t['id'] == parent_id), None)
-            if not parent_tweet:
-                break
-
-            chain.insert(0, parent_tweet)
-            current_tweet = parent_tweet
-
-        return chain
-
-    def get_sibling_tweets(self, tweet, thread):
-        parent_id = self.get_parent_tweet_id(tweet)
-        if not parent_id:
-            return []  # No parent, so no siblings
-
-        siblings = [t for t in thread if self.get_parent_tweet_id(t) == parent_id and t['id'] != tweet['id']]
-        siblings.sort(key=lambda x: x['created_at'])
-        return siblings
-
-    def get_children_tweets(self, tweet, thread):
-        children = [t for t in thread if self.get_parent_tweet_id(t) == tweet['id']]
-        children.sort(key=lambda x: x['created_at'])
-        return children
-
-    def get_parent_tweet_id(self, tweet):
-        referenced_tweets = tweet.get('referenced_tweets', [])
-        replied_to = next((ref for ref in referenced_tweets if ref['type'] == 'replied_to'), None)
-        return replied_to['id'] if replied_to else None
+        with span('thread_assembly'):
+            index = ConversationIndex(conversation['tweets'])
+            requested_tweet = index.get(tweet_id)
+
+            if not requested_tweet:
+                return None
+
+            ancestor_chain = index.ancestors(tweet_id)
+
+            result = {
+                'requested_tweet': requested_tweet,
+                'root_tweet': ancestor_chain[0] if ancestor_chain else requested_tweet,
+                'ancestor_chain': ancestor_chain,
+                'sibling_tweets': index.siblings(tweet_id),
+                'children_tweets': index.children_of(tweet_id),
+                'depth': len(ancestor_chain),
+                'subtree_size': index.subtree_size(tweet_id),
+                'thread_complete': conversation['complete']
+            }
+            if include_descendants:
+                result['descendant_tree'] = index.descendant_tree(tweet_id)
+        if projection:
+            result = project_thread(result, projection)
+        return result
+
+    def pull_mentions(self, since=None, limit=10):
+        return self.mentions_ingester.get_mentions(since=since, limit=limit)
 
     def __getattr__(self, name):
         return getattr(self.tweet_service, name)
\ No newline at end of file